@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+"""
+Benchmark del render de las plantillas de email de las campañas.
+
+Compara, para N destinatarios, las formas de personalizar la plantilla:
+los str.replace encadenados que hacía send_email.py (uno por marcador, cada
+uno recorriendo todo el HTML), una sustitución con expresión regular por
+mensaje y la plantilla compilada de email_templates (trozos fijos + huecos,
+un join por mensaje), en str y en bytes.
+
+Después compara el mensaje completo en bytes: EmailMultiAlternatives
+(árbol MIME, cabeceras y codificación del HTML en cada mensaje) frente al
+esqueleto MIME pre-codificado de la campaña (mime.py).
+
+Uso: python benchmark_email_render.py [--renders 10000] [--preset transparencia]
+"""
+
+import os
+import sys
+import django
+import time
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.template.loader import get_template
+
+from landing import campaigns, email_templates
+from landing.models import Campaign
+
+
+def chained_replace(source, context):
+    """Un str.replace por marcador, como send_email.py antes de send_campaign"""
+    html = source
+    for name, value in context.items():
+        html = html.replace('{{ ' + name + ' }}', str(value))
+    return html
+
+
+def regex_sub(source, context):
+    """Una pasada de expresión regular por mensaje"""
+    return email_templates.PLACEHOLDER_RE.sub(
+        lambda match: str(context.get(match.group(1), match.group(0))), source
+    )
+
+
+def compiled(source, context):
+    return email_templates.compile_template(source).render(context)
+
+
+def compiled_bytes(source, context):
+    return email_templates.compile_template(source).render_bytes(context)
+
+
+def django_message(campaign, name, address):
+    """El mensaje completo con EmailMultiAlternatives, como antes de mime.py"""
+    context = email_templates.recipient_context(name, address)
+    email = EmailMultiAlternatives(
+        campaign.subject,
+        email_templates.render(campaign.text_message, context),
+        settings.CAMPAIGN_FROM_EMAIL,
+        [address],
+    )
+    email.attach_alternative(email_templates.render(campaign.message, context), "text/html")
+    return email.message().as_bytes(linesep='\r\n')
+
+
+def skeleton_message(campaign, name, address):
+    return campaigns.build_email(campaign, name, address).data
+
+
+def measure(function, source, contexts):
+    start = time.perf_counter()
+    for context in contexts:
+        function(source, context)
+    return time.perf_counter() - start
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark del render de plantillas de email')
+    parser.add_argument('--renders', type=int, default=10000)
+    parser.add_argument('--preset', default='transparencia', choices=sorted(email_templates.PRESETS))
+    args = parser.parse_args()
+
+    # Plantilla sin sustituir: el mensaje completo se personaliza en cada render,
+    # como hacían los scripts antiguos
+    source = get_template(email_templates.PRESETS[args.preset].html).template.source
+    campaign_context = email_templates.campaign_context()
+    contexts = [
+        {**campaign_context, **email_templates.recipient_context(f'Usuario Número {i}', f'usuario{i}@example.com')}
+        for i in range(args.renders)
+    ]
+
+    expected = chained_replace(source, contexts[0])
+    for function in (regex_sub, compiled):
+        if function(source, contexts[0]) != expected:
+            print(f"❌ {function.__name__} no produce el mismo HTML")
+            sys.exit(1)
+    if compiled_bytes(source, contexts[0]) != expected.encode('utf-8'):
+        print("❌ compiled_bytes no produce el mismo HTML")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("BENCHMARK DEL RENDER DE EMAILS")
+    print("=" * 60)
+    print(f"Plantilla: {args.preset} ({len(source):,} caracteres, "
+          f"{len(email_templates.compile_template(source).slots)} marcadores) | Renders: {args.renders:,}")
+    print()
+    print(f"{'Modo':<28}{'Tiempo':>10}{'µs/render':>12}{'renders/s':>12}")
+    print("-" * 62)
+
+    scenarios = [
+        ('str.replace encadenados', chained_replace),
+        ('Regex por mensaje', regex_sub),
+        ('Compilada (str)', compiled),
+        ('Compilada (bytes)', compiled_bytes),
+    ]
+    for label, function in scenarios:
+        elapsed = measure(function, source, contexts)
+        print(f"{label:<28}{elapsed:>9.3f}s{elapsed / args.renders * 1e6:>12.1f}{args.renders / elapsed:>12,.0f}")
+
+    subject, html, text = email_templates.load_preset(args.preset)
+    campaign = Campaign(subject=subject, message=html, text_message=text)
+    recipients = [(f'Usuario Número {i}', f'usuario{i}@example.com') for i in range(args.renders)]
+
+    print()
+    print(f"{'Mensaje completo':<28}{'Tiempo':>10}{'µs/msg':>12}{'msg/s':>12}")
+    print("-" * 62)
+    for label, function in (('EmailMultiAlternatives', django_message), ('Esqueleto MIME', skeleton_message)):
+        start = time.perf_counter()
+        for name, address in recipients:
+            function(campaign, name, address)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<28}{elapsed:>9.3f}s{elapsed / args.renders * 1e6:>12.1f}{args.renders / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+Benchmark del envío de SMS contra el servidor local que imita a Twilio.
+
+Compara el envío en serie (un hilo, como hacía SendSMSView) con
+SmsDispatcher usando varios hilos y el token bucket.
+Uso: python benchmark_sms_dispatch.py [--messages 300] [--latency 0.1] [--mps 30]
+"""
+
+import os
+import sys
+import django
+import time
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from landing.sms import SmsDispatcher, TwilioRestClient
+from twilio_standin import start_standin
+
+
+def run(base_url, messages, workers, rate):
+    client = TwilioRestClient('ACbenchmark', 'token', base_url=base_url, pool_size=workers)
+    dispatcher = SmsDispatcher(client=client, rate=rate, workers=workers)
+    batch = [(i, f'+1787555{i:04d}', 'Renovar para Avanzar') for i in range(messages)]
+
+    start = time.perf_counter()
+    results = dispatcher.dispatch(batch)
+    elapsed = time.perf_counter() - start
+
+    ok = sum(1 for r in results if r.ok)
+    retries = sum(r.attempts - 1 for r in results)
+    return ok, len(results) - ok, retries, elapsed
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark de SmsDispatcher')
+    parser.add_argument('--messages', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.1, help='Latencia simulada por petición (s)')
+    parser.add_argument('--mps', type=int, default=30, help='Límite de mensajes/segundo del stand-in')
+    args = parser.parse_args()
+
+    server, base_url = start_standin(latency=args.latency, rate_limit=args.mps)
+
+    print("=" * 60)
+    print("BENCHMARK DE ENVÍO DE SMS")
+    print("=" * 60)
+    print(f"Mensajes: {args.messages} | Latencia: {args.latency}s | Límite: {args.mps} msg/s")
+    print()
+    print(f"{'Modo':<28}{'OK':>6}{'Fallos':>8}{'Reint.':>8}{'Tiempo':>9}{'msg/s':>8}")
+    print("-" * 67)
+
+    scenarios = [
+        ('Serie (1 hilo)', 1, args.mps),
+        ('Pool 4 hilos', 4, args.mps),
+        ('Pool 8 hilos', 8, args.mps),
+        ('Pool 16 hilos', 16, args.mps),
+        ('Pool 16 hilos sin bucket', 16, 10000),
+    ]
+    for name, workers, rate in scenarios:
+        ok, failed, retries, elapsed = run(base_url, args.messages, workers, rate)
+        print(f"{name:<28}{ok:>6}{failed:>8}{retries:>8}{elapsed:>8.1f}s{ok / elapsed:>8.1f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+"""
+Benchmark del transporte SMTP de las campañas contra un servidor SMTP local
+(aiosmtpd) que descarta los mensajes.
+
+Compara el envío antiguo (como EmailMultiAlternatives.send(): una conexión
+nueva por mensaje) con SmtpTransport y distintos tamaños de pool. El servidor
+simula la latencia de un proveedor real al abrir la conexión y en cada DATA,
+y puede responder 421 cada N mensajes para comprobar la reconexión.
+
+Con --provider-rate el servidor responde 421 cuando se supera esa tasa (como
+Gmail) y se añade una medición con el control de tasa AIMD de las campañas.
+
+Requiere aiosmtpd (pip install aiosmtpd).
+Uso: python benchmark_smtp_pool.py [--messages 500] [--latency 0.02] [--connect-latency 0.15] [--pipelining] [--provider-rate 40]
+"""
+
+import os
+import sys
+import django
+import asyncio
+import socket
+import time
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.conf import settings
+
+from landing import campaigns, email_templates
+from landing.models import Campaign
+from landing.ratelimit import AimdRateController
+from landing.transports import SendError, SmtpConnection, SmtpTransport, envelope
+
+
+class SinkHandler:
+    """Acepta y descarta los mensajes con la latencia configurada"""
+
+    def __init__(self, latency, connect_latency, drop_every, pipelining, provider_rate=0):
+        self.pipelining = pipelining
+        self.provider_rate = provider_rate
+        self.window = []
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.drop_every = drop_every
+        self.received = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        # Simula el coste de TCP + STARTTLS + AUTH de un proveedor remoto
+        await asyncio.sleep(self.connect_latency)
+        session.host_name = hostname
+        if self.pipelining:
+            # aiosmtpd lee los comandos línea a línea, así que admite que lleguen juntos
+            responses.insert(-1, '250-PIPELINING')
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.latency)
+        if self.provider_rate:
+            # Ventana deslizante de un segundo con los mensajes aceptados
+            now = time.monotonic()
+            self.window = [t for t in self.window if now - t < 1.0]
+            if len(self.window) >= self.provider_rate:
+                return '421 4.7.0 Try again later, rate limit exceeded'
+            self.window.append(now)
+        self.received += 1
+        if self.drop_every and self.received % self.drop_every == 0:
+            return '421 Demasiados mensajes, vuelva a conectar'
+        return '250 OK'
+
+
+def build_messages(count):
+    subject, html, text = email_templates.load_preset('encuesta')
+    campaign = Campaign(subject=subject, message=html, text_message=text)
+    return [
+        campaigns.build_email(campaign, f'Usuario {i}', f'usuario{i}@example.com')
+        for i in range(count)
+    ]
+
+
+def run_per_message(messages):
+    """Una conexión nueva por mensaje, como EmailMultiAlternatives.send() en los scripts antiguos"""
+    start = time.perf_counter()
+    failed = 0
+    for message in messages:
+        connection = SmtpConnection()
+        try:
+            connection.send(*envelope(message))
+        except SendError:
+            failed += 1
+        finally:
+            connection.close()
+    return len(messages) - failed, failed, time.perf_counter() - start, []
+
+
+def run_pool(messages, pool_size, controller=None):
+    transport = SmtpTransport(pool_size=pool_size)
+    transport.rate_controller = controller
+    start = time.perf_counter()
+    failed = 0
+    with transport:
+        for index, error in transport.send_many(messages):
+            if error is not None:
+                failed += 1
+    return len(messages) - failed, failed, time.perf_counter() - start, transport.stats()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark del pool SMTP')
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.02, help='Latencia del servidor por mensaje (s)')
+    parser.add_argument('--connect-latency', type=float, default=0.15, help='Latencia al abrir cada conexión (s)')
+    parser.add_argument('--drop-every', type=int, default=0, help='Responder 421 cada N mensajes (0 = nunca)')
+    parser.add_argument('--pipelining', action='store_true', help='Anunciar PIPELINING (RFC 2920) en el EHLO')
+    parser.add_argument('--provider-rate', type=int, default=0, help='Responder 421 por encima de N msg/s (0 = sin límite)')
+    parser.add_argument('--baseline', type=int, default=50, help='Mensajes para la medición con send() por mensaje')
+    args = parser.parse_args()
+
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        print("Este benchmark necesita aiosmtpd: pip install aiosmtpd")
+        sys.exit(1)
+
+    handler = SinkHandler(args.latency, args.connect_latency, args.drop_every, args.pipelining, args.provider_rate)
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    server = Controller(handler, hostname='127.0.0.1', port=port)
+    server.start()
+
+    settings.EMAIL_HOST = '127.0.0.1'
+    settings.EMAIL_PORT = port
+    settings.EMAIL_USE_TLS = False
+    settings.EMAIL_USE_SSL = False
+    settings.EMAIL_HOST_USER = ''
+    settings.EMAIL_HOST_PASSWORD = ''
+
+    messages = build_messages(args.messages)
+
+    print("=" * 72)
+    print("BENCHMARK DEL TRANSPORTE SMTP")
+    print("=" * 72)
+    print(f"Mensajes: {args.messages} | Latencia: {args.latency}s/mensaje, "
+          f"{args.connect_latency}s/conexión | 421 cada: {args.drop_every or '-'} | "
+          f"PIPELINING: {'sí' if args.pipelining else 'no'} | "
+          f"Límite del proveedor: {args.provider_rate or '-'} msg/s")
+    print()
+    print(f"{'Modo':<30}{'OK':>6}{'Fallos':>8}{'Tiempo':>9}{'msg/s':>8}{'msg/s/conexión':>17}")
+    print("-" * 78)
+
+    ok, failed, elapsed, stats = run_per_message(messages[:args.baseline])
+    print(f"{f'send() por mensaje ({args.baseline})':<30}{ok:>6}{failed:>8}{elapsed:>8.1f}s{ok / elapsed:>8.1f}{'':>17}")
+
+    for pool_size in (1, 2, 4, 8, 16):
+        ok, failed, elapsed, stats = run_pool(messages, pool_size)
+        per_connection = sum(s['rate'] for s in stats) / len(stats) if stats else 0
+        reconnects = sum(s['reconnects'] for s in stats)
+        label = f'Pool de {pool_size}' + (f' ({reconnects} reconex.)' if reconnects else '')
+        print(f"{label:<30}{ok:>6}{failed:>8}{elapsed:>8.1f}s{ok / elapsed:>8.1f}{per_connection:>17.1f}")
+
+    if args.provider_rate:
+        # Misma configuración que una campaña, empezando desde la tasa inicial
+        aimd = AimdRateController(
+            settings.CAMPAIGN_SEND_RATE_INITIAL,
+            min_rate=settings.CAMPAIGN_SEND_RATE_MIN,
+            max_rate=settings.CAMPAIGN_SEND_RATE_MAX,
+            increase=settings.CAMPAIGN_SEND_RATE_INCREASE,
+            decrease=settings.CAMPAIGN_SEND_RATE_DECREASE,
+        )
+        pool_size = settings.CAMPAIGN_SMTP_POOL_SIZE
+        ok, failed, elapsed, stats = run_pool(messages, pool_size, aimd)
+        label = f'AIMD, pool de {pool_size}'
+        print(f"{label:<30}{ok:>6}{failed:>8}{elapsed:>8.1f}s{ok / elapsed:>8.1f}")
+        print()
+        print(f"AIMD: tasa conseguida {aimd.achieved_rate:.1f} msg/s, tasa final {aimd.rate:.1f} msg/s, "
+              f"{aimd.throttles} avisos 421 (límite del proveedor: {args.provider_rate} msg/s)")
+
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+Benchmark de la sincronización incremental del log de mensajes de Twilio.
+
+Carga en el servidor local que imita a Twilio un log de mensajes (grabado con
+--fixture o generado), sincroniza con un corte a mitad de camino para probar
+la reanudación, y luego repite la sincronización para medir el caso
+incremental. Usa la base de datos configurada: ejecutar sobre una copia.
+Uso: python benchmark_twilio_sync.py [--messages 10000] [--fixture mensajes.json]
+"""
+
+import os
+import django
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from landing.models import SmsMessage, SyncCursor
+from landing.sms import TwilioRestClient
+from landing.sms_sync import CURSOR_NAME, sync_messages
+from twilio_standin import start_standin
+
+
+def fake_log(count):
+    """Log de `count` mensajes de un envío masivo reciente"""
+    start = datetime.now(timezone.utc) - timedelta(hours=2)
+    statuses = ['delivered'] * 18 + ['undelivered', 'failed']
+    return [{
+        'sid': 'SM' + uuid.uuid4().hex,
+        'to': f'+1787555{i % 10000:04d}',
+        'from': '+17870000000',
+        'status': statuses[i % len(statuses)],
+        'direction': 'outbound-api',
+        'date_sent': format_datetime(start + timedelta(seconds=i * 0.5)),
+        'error_code': 30003 if statuses[i % len(statuses)] != 'delivered' else None,
+        'error_message': None,
+    } for i in range(count)]
+
+
+def run(client, state, **kwargs):
+    before = state.list_requests
+    start = time.perf_counter()
+    pages, synced, finished = sync_messages(client=client, **kwargs)
+    return pages, synced, finished, state.list_requests - before, time.perf_counter() - start
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark de sync_twilio_messages')
+    parser.add_argument('--messages', type=int, default=10000)
+    parser.add_argument('--fixture', help='JSON con mensajes grabados (lista "messages" de Twilio)')
+    parser.add_argument('--latency', type=float, default=0.1, help='Latencia simulada por petición (s)')
+    args = parser.parse_args()
+
+    server, base_url = start_standin(latency=args.latency, fixture=args.fixture)
+    if not args.fixture:
+        server.state.messages.extend(fake_log(args.messages))
+    client = TwilioRestClient('ACbenchmark', 'token', base_url=base_url)
+    SyncCursor.objects.filter(name=CURSOR_NAME).delete()
+
+    print("=" * 60)
+    print("BENCHMARK DE SINCRONIZACIÓN DE MENSAJES")
+    print("=" * 60)
+    print(f"Mensajes en el log: {len(server.state.messages)} | Latencia: {args.latency}s")
+    print()
+    print(f"{'Paso':<30}{'Págs':>6}{'Mensajes':>10}{'GETs':>6}{'Tiempo':>9}")
+    print("-" * 61)
+
+    steps = [
+        ('Inicial, cortada a 3 páginas', {'full': True, 'max_pages': 3}),
+        ('Reanudación', {}),
+        ('Incremental (solo el margen)', {}),
+    ]
+    for name, kwargs in steps:
+        pages, synced, finished, requests, elapsed = run(client, server.state, **kwargs)
+        print(f"{name:<30}{pages:>6}{synced:>10}{requests:>6}{elapsed:>8.2f}s")
+
+    print()
+    print(f"SmsMessage en la base de datos: {SmsMessage.objects.count()}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,37 +5,39 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
-from django.conf import settings
-from twilio.rest import Client
+from django.db.models import Count
+
+from landing.models import SmsMessage
+from landing.sms import TwilioRestClient
+from landing.sms_sync import sync_messages
 
 print("=" * 70)
 print("VERIFICAR ESTADO DE MENSAJES SMS")
 print("=" * 70)
 
-client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+# Traer solo lo nuevo desde la última sincronización (ver sync_twilio_messages)
+pages, synced, finished = sync_messages()
+print(f"\nSincronizados {synced} mensajes en {pages} páginas")
+
+print("\nMensajes por estado:\n")
+for row in SmsMessage.objects.values('status').annotate(total=Count('id')).order_by('-total'):
+    print(f"  {row['status']:<12} {row['total']}")
 
-# Obtener los últimos 10 mensajes
 print("\nÚltimos mensajes enviados:\n")
 
-messages = client.messages.list(limit=10)
+messages = SmsMessage.objects.exclude(date_sent=None).order_by('-date_sent')[:10]
 
 for msg in messages:
     print("-" * 70)
     print(f"SID:        {msg.sid}")
     print(f"To:         {msg.to}")
-    print(f"From:       {msg.from_}")
+    print(f"From:       {msg.from_number}")
     print(f"Status:     {msg.status}")
-    print(f"Direction:  {msg.direction}")
-    print(f"Date:       {msg.date_created}")
-    print(f"Price:      {msg.price} {msg.price_unit}")
+    print(f"Date:       {msg.date_sent}")
     
     if msg.error_code:
         print(f"❌ ERROR:    {msg.error_code}")
         print(f"   Message:  {msg.error_message}")
-    
-    # Mostrar mensaje truncado
-    body_preview = msg.body[:50] + "..." if len(msg.body) > 50 else msg.body
-    print(f"Body:       {body_preview}")
 
 print("-" * 70)
 
@@ -44,12 +46,13 @@ print("\n" + "=" * 70)
 print("INFORMACIÓN DE LA CUENTA")
 print("=" * 70)
 
-account = client.api.accounts(settings.TWILIO_ACCOUNT_SID).fetch()
-print(f"Status:     {account.status}")
-print(f"Type:       {account.type}")
+client = TwilioRestClient()
+account = client.request('GET', f'{client.base_url}/2010-04-01/Accounts/{client.account_sid}.json')
+print(f"Status:     {account['status']}")
+print(f"Type:       {account['type']}")
 
 # Verificar si es cuenta de trial
-if account.type == 'Trial':
+if account['type'] == 'Trial':
     print("\n⚠️  CUENTA DE PRUEBA (TRIAL)")
     print("=" * 70)
     print("Con cuenta de prueba solo puedes enviar SMS a:")
@@ -69,12 +72,14 @@ print("NÚMEROS VERIFICADOS")
 print("=" * 70)
 
 try:
-    validated_numbers = client.validationRequests.list(limit=20)
+    validated_numbers = client.request(
+        'GET', client.url('OutgoingCallerIds.json'), params={'PageSize': 20}
+    )['outgoing_caller_ids']
     
     if validated_numbers:
         print("\nNúmeros que puedes usar para pruebas:")
         for vn in validated_numbers:
-            print(f"  ✓ {vn.phone_number}")
+            print(f"  ✓ {vn['phone_number']}")
     else:
         print("\n❌ No hay números verificados")
         print("\nPara verificar +19392570148:")
@@ -63,6 +63,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'landing.middleware.QueryProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -129,12 +130,101 @@ AUTH_PASSWORD_VALIDATORS = [
 TWILIO_ACCOUNT_SID = config('TWILIO_ACCOUNT_SID', default='')
 TWILIO_AUTH_TOKEN = config('TWILIO_AUTH_TOKEN', default='')
 TWILIO_PHONE_NUMBER = config('TWILIO_PHONE_NUMBER', default='')
+TWILIO_API_BASE_URL = config('TWILIO_API_BASE_URL', default='https://api.twilio.com')
+
+# Envío de SMS en segundo plano
+SMS_SEND_RATE = config('SMS_SEND_RATE', default=1, cast=float)  # Segmentos/segundo del remitente (1 = número local)
+SMS_WORKERS = 4  # Hilos con peticiones en curso a la vez
+SMS_MAX_RETRIES = 4  # Reintentos ante 429/5xx
+
+# StatusCallback: URL pública a la que Twilio envía los cambios de estado.
+# Debe coincidir exactamente con la URL firmada por Twilio.
+TWILIO_STATUS_CALLBACK_URL = config('TWILIO_STATUS_CALLBACK_URL', default=SITE_URL + '/api/twilio/status/')
+SMS_STATUS_BUFFER_SIZE = 500  # Eventos acumulados antes de escribir en la base de datos
+SMS_STATUS_FLUSH_SECONDS = 2  # Antigüedad máxima de un evento en el buffer
+
+# Sincronización del log de mensajes: python manage.py sync_twilio_messages
+TWILIO_SYNC_LOOKBACK_MINUTES = 10  # Se vuelven a pedir los mensajes enviados en este margen antes del watermark
 
 # ============================================
 # DASHBOARD CONFIGURATION
 # ============================================
 DASHBOARD_ITEMS_PER_PAGE = 25
 
+# Actualizaciones en vivo del dashboard (Server-Sent Events)
+LIVE_POLL_SECONDS = 5  # Consulta de respaldo para registros creados en otros procesos
+LIVE_KEEPALIVE_SECONDS = 15  # Comentario SSE para que proxies no cierren la conexión
+LIVE_RETRY_MS = 3000  # Espera del navegador antes de reconectar
+LIVE_QUEUE_SIZE = 10  # Eventos pendientes por pestaña
+LIVE_MAX_NEW = 20  # Registros nuevos incluidos en cada evento
+LIVE_ERROR_BACKOFF_SECONDS = 60  # Espera máxima entre consultas mientras la consulta falla
+# Cada pestaña con el dashboard abierto ocupa un worker síncrono (gunicorn sync)
+# mientras dura su stream. El stream se cierra a los LIVE_STREAM_SECONDS y el
+# navegador se reconecta tras LIVE_RETRY_MS; aun así, hay que dimensionar los
+# workers/hilos del servidor para el número de dashboards abiertos a la vez.
+LIVE_STREAM_SECONDS = 300
+
+# Perfilado de consultas para usuarios staff (cabecera Server-Timing y panel); por
+# defecto solo en desarrollo
+QUERY_PROFILING = config('QUERY_PROFILING', default=DEBUG, cast=bool)
+QUERY_PROFILING_SLOWEST = 5  # Consultas más lentas que se muestran
+QUERY_PROFILING_EXPLAIN = 3  # De ellas, cuántas llevan EXPLAIN
+
+# ============================================
+# WORKER / EXPORTACIONES EN SEGUNDO PLANO
+# ============================================
+# Worker local: python manage.py run_worker
+WORKER_POLL_INTERVAL = 2  # Segundos entre consultas cuando no hay trabajo
+
+# Horas que se conserva un CSV exportado en PRIVATE_MEDIA_ROOT/exports/
+EXPORT_JOB_TTL_HOURS = 24
+# Minutos sin avance (heartbeat_at) tras los que un trabajo en proceso se da por abandonado
+EXPORT_JOB_STALE_MINUTES = 30
+
+# Destinatarios que se leen de la base de datos en cada bloque del envío
+CAMPAIGN_EMAIL_CHUNK_SIZE = 100
+# Resultados de envío que se guardan juntos (un upsert por bloque); es lo
+# máximo que se repetiría si el proceso muere a mitad de un envío
+CAMPAIGN_EMAIL_STATE_BATCH = 20
+# Cola de reintentos por clase de fallo (SendError.kind): cuántas veces se reintenta un
+# destinatario y la espera antes de cada reintento (al azar entre 0 y base * 2^n segundos,
+# hasta cap); agotados los reintentos, o si el fallo es permanente, el destinatario queda
+# descartado. Los fallos de la cuenta ('provider', 'quota') no pasan por la cola: detienen
+# la campaña y los destinatarios siguen pendientes
+CAMPAIGN_RETRY_POLICY = {
+    'transient': {'retries': 5, 'base': 60, 'cap': 3600},  # 4xx de SMTP, throttling de SES
+    'connection': {'retries': 5, 'base': 30, 'cap': 1800},  # conexión cortada a mitad del envío
+    'permanent': {'retries': 0},  # 5xx de SMTP, mensaje rechazado por SES
+}
+
+# ============================================
+# CAMPAÑAS DE EMAIL: python manage.py send_campaign
+# ============================================
+CAMPAIGN_FROM_EMAIL = config('CAMPAIGN_FROM_EMAIL', default=f'Dr. Méndez Sexto - Renovar para Avanzar <{DEFAULT_FROM_EMAIL}>')
+CAMPAIGN_CONTACT_EMAIL = 'info@drmendezsexto.com'
+CAMPAIGN_SURVEY_URL = 'https://us10.list-manage.com/survey?u=32f93d7ae2a7bd70efbba97b6&id=e194374f1d&e=54e0690aa6'
+
+# Transporte 'smtp': conexiones abiertas en paralelo y mensajes por conexión antes de renovarla
+CAMPAIGN_SMTP_POOL_SIZE = config('CAMPAIGN_SMTP_POOL_SIZE', default=4, cast=int)
+CAMPAIGN_SMTP_MESSAGES_PER_CONNECTION = 100
+
+# Tasa de envío adaptativa (emails/segundo): empieza en la última aprendida para el
+# proveedor (o en la inicial), sube mientras no hay errores y se divide ante throttling
+CAMPAIGN_SEND_RATE_INITIAL = config('CAMPAIGN_SEND_RATE_INITIAL', default=5, cast=float)
+CAMPAIGN_SEND_RATE_MIN = 0.5
+CAMPAIGN_SEND_RATE_MAX = config('CAMPAIGN_SEND_RATE_MAX', default=50, cast=float)
+CAMPAIGN_SEND_RATE_INCREASE = 1  # emails/s que se suman por cada segundo enviando sin errores
+CAMPAIGN_SEND_RATE_DECREASE = 0.5  # factor que se aplica tras un 4xx/421/Throttling
+
+# Amazon SES (transportes 'ses' y 'ses_bulk'); las credenciales se leen del entorno de AWS
+AWS_SES_REGION = config('AWS_SES_REGION', default='us-east-1')
+# 'ses_bulk': destinatarios por llamada a SendBulkTemplatedEmail (máximo de SES: 50)
+# y reintentos de los destinatarios con fallos transitorios
+CAMPAIGN_SES_BULK_SIZE = 50
+CAMPAIGN_SES_BULK_RETRIES = 3
+# Máximo de hilos del transporte 'ses'; los que se usan salen del MaxSendRate de la cuenta
+CAMPAIGN_SES_MAX_WORKERS = 16
+
 
 # ============================================
 # ATH MÓVIL CONFIGURATION
@@ -184,6 +274,9 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 # Media files (si las necesitas en el futuro)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Archivos con datos personales (exportaciones CSV): fuera de MEDIA_ROOT, que se sirve
+# públicamente; solo se descargan a través de las vistas del dashboard
+PRIVATE_MEDIA_ROOT = os.path.join(BASE_DIR, 'private_media')
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -19,6 +19,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
 from landing.models import Registration
+from landing import segments, specialties
 from django.db.models import Max
 
 
@@ -139,6 +140,7 @@ class FastBulkImporter:
                     postal_address="Puerto Rico",
                     is_doctor=True,
                     specialty="Medicina General",
+                    canonical_specialty_id=specialties.resolve("Medicina General"),
                     years_practicing=1,
                     is_licensed=True,
                     service_location="Puerto Rico",
@@ -244,6 +246,9 @@ class FastBulkImporter:
 
                 print(f"[OK]")
 
+        # bulk_create no dispara señales: recalcular los segmentos guardados
+        segments.rebuild_all()
+
         # 8. Verificar resultado
         end_time = time.time()
         elapsed = end_time - start_time
@@ -17,6 +17,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
 from landing.models import Registration
+from landing import segments, specialties
 
 
 def generate_unique_id():
@@ -190,6 +191,7 @@ def import_emails_from_file(file_path, dry_run=False):
                 postal_address="Puerto Rico",
                 is_doctor=True,
                 specialty="Medicina General",
+                canonical_specialty_id=specialties.resolve("Medicina General"),
                 years_practicing=1,
                 is_licensed=True,
                 service_location="Puerto Rico",
@@ -222,6 +224,10 @@ def import_emails_from_file(file_path, dry_run=False):
             failed += len(registrations_to_create)
             errors.append(f"Error en lote final: {str(e)}")
 
+    # bulk_create no dispara señales: recalcular los segmentos guardados
+    if imported:
+        segments.rebuild_all()
+
     # Resumen final
     print()
     print("=" * 60)
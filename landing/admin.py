@@ -1,8 +1,11 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from django.http import HttpResponse
-from .models import Registration, PlanEstrategico
-import csv
+from django.db.models import Count
+from .models import (
+    Registration, PlanEstrategico, Campaign, CampaignRecipient, SendAttempt, SendRateState, SmsMessage,
+    SyncCursor, Segment, Specialty, SpecialtyAlias,
+)
+from . import exports, segments, specialties
 
 @admin.register(Registration)
 class RegistrationAdmin(admin.ModelAdmin):
@@ -26,6 +29,8 @@ class RegistrationAdmin(admin.ModelAdmin):
         'needs_voting_help',
         'accepts_terms',
         'accepts_promotions',
+        'municipality',
+        'canonical_specialty',
         'created_at'
     )
     
@@ -38,14 +43,14 @@ class RegistrationAdmin(admin.ModelAdmin):
         'postal_address'
     )
     
-    readonly_fields = ('unique_id', 'created_at', 'updated_at')
+    readonly_fields = ('unique_id', 'zip_code', 'municipality', 'canonical_specialty', 'created_at', 'updated_at')
     
     fieldsets = (
         ('Información Personal', {
-            'fields': ('name', 'last_name', 'postal_address', 'phone_number', 'email')
+            'fields': ('name', 'last_name', 'postal_address', 'zip_code', 'municipality', 'phone_number', 'email')
         }),
         ('Información Profesional', {
-            'fields': ('is_doctor', 'service_location', 'years_practicing', 'is_licensed')
+            'fields': ('is_doctor', 'specialty', 'canonical_specialty', 'service_location', 'years_practicing', 'is_licensed')
         }),
         ('Asistencia Electoral', {
             'fields': ('needs_voting_help',)
@@ -120,110 +125,25 @@ class RegistrationAdmin(admin.ModelAdmin):
     
     def export_to_csv(self, request, queryset):
         """Exportar registros seleccionados a CSV"""
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="registros_campana.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'Código', 'Nombre', 'Apellidos', 'Dirección', 'Teléfono', 
-            'Email', '¿Médico?', 'Lugar de Servicios', 'Años Ejerciendo', 
-            '¿Colegiado?', '¿Necesita Ayuda Voto?', 'Aceptó Términos', 
-            'Aceptó Promociones', 'Fecha Registro'
-        ])
-        
-        for reg in queryset:
-            writer.writerow([
-                reg.unique_id,
-                reg.name,
-                reg.last_name,
-                reg.postal_address,
-                reg.phone_number,
-                reg.email or '',
-                'Sí' if reg.is_doctor else 'No',
-                reg.service_location or '',
-                reg.years_practicing or '',
-                'Sí' if reg.is_licensed else 'No',
-                'Sí' if reg.needs_voting_help else 'No',
-                'Sí' if reg.accepts_terms else 'No',
-                'Sí' if reg.accepts_promotions else 'No',
-                reg.created_at.strftime('%d/%m/%Y %H:%M')
-            ])
-        
-        return response
+        return exports.stream_csv(queryset, exports.ADMIN_COLUMNS, 'registros_campana.csv')
     export_to_csv.short_description = "Exportar seleccionados a CSV"
     
     def export_doctors_only(self, request, queryset):
         """Exportar solo médicos a CSV"""
         doctors = queryset.filter(is_doctor=True)
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="medicos_registrados.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'Código', 'Nombre', 'Apellidos', 'Teléfono', 'Email',
-            'Lugar de Servicios', 'Años Ejerciendo', '¿Colegiado?'
-        ])
-        
-        for doc in doctors:
-            writer.writerow([
-                doc.unique_id,
-                doc.name,
-                doc.last_name,
-                doc.phone_number,
-                doc.email or '',
-                doc.service_location,
-                doc.years_practicing,
-                'Sí' if doc.is_licensed else 'No'
-            ])
-        
-        return response
+        return exports.stream_csv(doctors, exports.DOCTOR_COLUMNS, 'medicos_registrados.csv')
     export_doctors_only.short_description = "Exportar médicos a CSV"
     
     def export_voting_help(self, request, queryset):
         """Exportar personas que necesitan ayuda con voto adelantado"""
         need_help = queryset.filter(needs_voting_help=True)
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="ayuda_voto_adelantado.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'Código', 'Nombre', 'Apellidos', 'Dirección', 'Teléfono', 'Email'
-        ])
-        
-        for person in need_help:
-            writer.writerow([
-                person.unique_id,
-                person.name,
-                person.last_name,
-                person.postal_address,
-                person.phone_number,
-                person.email or ''
-            ])
-        
-        return response
+        return exports.stream_csv(need_help, exports.VOTING_HELP_COLUMNS, 'ayuda_voto_adelantado.csv')
     export_voting_help.short_description = "Exportar lista de ayuda voto adelantado"
     
     def export_promotions(self, request, queryset):
         """Exportar personas que aceptaron recibir promociones"""
         accepts_promos = queryset.filter(accepts_promotions=True)
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="lista_promociones.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'Código', 'Nombre', 'Apellidos', 'Email', 'Teléfono'
-        ])
-        
-        for person in accepts_promos:
-            writer.writerow([
-                person.unique_id,
-                person.name,
-                person.last_name,
-                person.email or '',
-                person.phone_number
-            ])
-        
-        return response
+        return exports.stream_csv(accepts_promos, exports.PROMOTIONS_COLUMNS, 'lista_promociones.csv')
     export_promotions.short_description = "Exportar lista de contactos para promociones"
     
     def changelist_view(self, request, extra_context=None):
@@ -264,4 +184,92 @@ class PlanEstrategicoAdmin(admin.ModelAdmin):
         ('Configuración', {
             'fields': ('activo',)
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(Campaign)
+class CampaignAdmin(admin.ModelAdmin):
+    list_display = ['id', 'channel', 'transport', 'subject', 'status', 'total', 'sent', 'failed', 'created_by', 'created_at']
+    list_filter = ['channel', 'transport', 'status']
+    readonly_fields = ['total', 'sent', 'failed', 'error', 'created_by', 'created_at', 'started_at', 'finished_at']
+
+
+class SendAttemptInline(admin.TabularInline):
+    model = SendAttempt
+    extra = 0
+    readonly_fields = ['number', 'transport', 'status', 'error', 'created_at']
+    can_delete = False
+
+
+@admin.register(CampaignRecipient)
+class CampaignRecipientAdmin(admin.ModelAdmin):
+    list_display = ['campaign', 'address', 'name', 'status', 'attempts', 'error', 'processed_at', 'next_attempt_at']
+    list_filter = ['status', 'campaign']
+    search_fields = ['address', 'name']
+    raw_id_fields = ['campaign', 'registration']
+    inlines = [SendAttemptInline]
+
+
+@admin.register(SendRateState)
+class SendRateStateAdmin(admin.ModelAdmin):
+    list_display = ['provider', 'rate', 'achieved_rate', 'throttles', 'updated_at']
+    readonly_fields = ['achieved_rate', 'throttles', 'updated_at']
+
+
+@admin.register(SmsMessage)
+class SmsMessageAdmin(admin.ModelAdmin):
+    list_display = ['sid', 'to', 'status', 'error_code', 'campaign', 'date_sent', 'updated_at']
+    list_filter = ['status', 'campaign']
+    search_fields = ['sid', 'to']
+    raw_id_fields = ['campaign', 'registration']
+
+
+@admin.register(SyncCursor)
+class SyncCursorAdmin(admin.ModelAdmin):
+    list_display = ['name', 'watermark', 'run_watermark', 'updated_at']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(Segment)
+class SegmentAdmin(admin.ModelAdmin):
+    list_display = ['name', 'member_count', 'refreshed_at', 'created_by', 'created_at']
+    search_fields = ['name']
+    readonly_fields = ['member_count', 'refreshed_at', 'created_by', 'created_at']
+    actions = ['rebuild_membership']
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        segments.rebuild_segment(obj)
+
+    def rebuild_membership(self, request, queryset):
+        for segment in queryset:
+            segments.rebuild_segment(segment)
+        self.message_user(request, f'{queryset.count()} segmento(s) recalculado(s).')
+    rebuild_membership.short_description = 'Recalcular membresía'
+
+
+class SpecialtyAliasInline(admin.TabularInline):
+    model = SpecialtyAlias
+    extra = 1
+
+
+@admin.register(Specialty)
+class SpecialtyAdmin(admin.ModelAdmin):
+    list_display = ['name', 'registration_count']
+    search_fields = ['name', 'aliases__key']
+    inlines = [SpecialtyAliasInline]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(total=Count('registrations'))
+
+    def registration_count(self, obj):
+        return obj.total
+    registration_count.short_description = 'Registros'
+    registration_count.admin_order_field = 'total'
+
+    def save_formset(self, request, form, formset, change):
+        # Guardar los alias normalizados para que coincidan con specialty_key()
+        for alias_form in formset.forms:
+            if alias_form.cleaned_data.get('key'):
+                alias_form.instance.key = specialties.specialty_key(alias_form.cleaned_data['key'])
+        super().save_formset(request, form, formset, change)
@@ -0,0 +1,42 @@
+"""
+Versión de los datos de registros para las claves de caché.
+
+Los agregados del dashboard se guardan en caché con la versión actual en la
+clave, así que nunca hace falta borrarlos: cuando cambian los datos cambia la
+clave. La versión es un contador en la base de datos (DataVersion),
+compartido por todos los procesos y que se lee con una sola consulta. Lo
+incrementan las señales al guardar o borrar registros y especialidades, y
+los recálculos de segmentos, que también cierran los cambios en bloque
+(imports, backfill_geo, normalize_specialties) que no disparan señales.
+"""
+
+from django.core.cache import cache
+from django.db.models import F
+
+from .filters import filter_key
+from .models import DataVersion
+
+VERSION_NAME = 'registrations'
+AGGREGATE_TIMEOUT = 60 * 60
+
+
+def registrations_version():
+    return DataVersion.objects.filter(name=VERSION_NAME).values_list('version', flat=True).first() or 0
+
+
+def bump_registrations_version():
+    if not DataVersion.objects.filter(name=VERSION_NAME).update(version=F('version') + 1):
+        DataVersion.objects.get_or_create(name=VERSION_NAME, defaults={'version': 1})
+
+
+def cached_aggregate(name, params, compute):
+    """
+    Resultado de `compute()` en caché por nombre, filtros normalizados y
+    versión de los datos.
+    """
+    key = f"landing:{name}:{registrations_version()}:{filter_key(params)}"
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(key, result, AGGREGATE_TIMEOUT)
+    return result
@@ -0,0 +1,614 @@
+"""
+Envíos masivos (email y SMS) del dashboard.
+
+La vista solo crea una Campaign con la audiencia serializada (los filtros de
+RegistrationFilter o una selección explícita de IDs) y devuelve su ID. El
+worker local resuelve los destinatarios en el servidor con una consulta en
+streaming y hace los envíos fuera de la petición HTTP, guardando el
+resultado de cada destinatario en CampaignRecipient.
+
+Las campañas de email usan el mismo motor desde el dashboard y desde
+`python manage.py send_campaign`: la audiencia se guarda como destinatarios
+pendientes, cada envío pasa por un transporte (transports.py) y queda
+registrado en SendAttempt, y la campaña se puede pausar y reanudar. Los
+envíos fallidos pasan a una cola de reintentos con espera exponencial según
+la clase del fallo (CAMPAIGN_RETRY_POLICY) que el worker vuelve a enviar
+sola (process_retries); los permanentes quedan descartados. Los fallos de
+la cuenta del proveedor (credenciales, cuenta pausada, cuota diaria) no
+son de ningún destinatario: detienen la campaña y los dejan pendientes.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q
+from django.http import QueryDict
+from django.utils import timezone
+
+from . import email_templates, mime
+from .filters import RegistrationFilter, normalize_filter_params
+from .models import Campaign, CampaignRecipient, Registration, SendAttempt, SendRateState, SmsMessage
+from .ratelimit import AimdRateController, backoff_delay
+from .sms import SmsDispatcher
+from .sms_encoding import personalize, template_segments
+from .transports import QuotaExhausted, SendError, TemplatedMessage, get_transport
+
+CHUNK_SIZE = 500
+
+# Espera de reintento si la clase de CAMPAIGN_RETRY_POLICY no trae base o cap
+RETRY_BASE_SECONDS = 60
+RETRY_CAP_SECONDS = 3600
+
+
+def parse_filters(filters):
+    """Acepta los filtros como querystring ('is_doctor=true&...') o como dict"""
+    if isinstance(filters, str):
+        filters = QueryDict(filters.lstrip('?'))
+    return normalize_filter_params(filters or {})
+
+
+def create_campaign(channel, message, subject='', recipient_ids=None, filters=None, user=None,
+                    text_message='', transport=Campaign.TRANSPORT_SMTP, status=Campaign.STATUS_PENDING,
+                    promotions_only=True):
+    """Crea la campaña; la audiencia se resuelve luego en el worker"""
+    return Campaign.objects.create(
+        channel=channel,
+        promotions_only=promotions_only,
+        transport=transport,
+        status=status,
+        subject=subject,
+        message=message,
+        text_message=text_message,
+        recipient_ids=[int(pk) for pk in recipient_ids] if recipient_ids else None,
+        filters=parse_filters(filters) if not recipient_ids else {},
+        created_by=user if user and user.is_authenticated else None,
+    )
+
+
+def audience(campaign):
+    """
+    Destinatarios de la campaña con contacto; si campaign.promotions_only,
+    solo los que aceptaron promociones (los envíos del dashboard)
+    """
+    registrations = Registration.objects.all()
+    if campaign.recipient_ids is not None:
+        registrations = registrations.filter(id__in=campaign.recipient_ids)
+    else:
+        registrations = RegistrationFilter(campaign.filters, queryset=registrations).qs
+
+    if campaign.promotions_only:
+        registrations = registrations.filter(accepts_promotions=True)
+    if campaign.channel == Campaign.CHANNEL_EMAIL:
+        registrations = registrations.filter(email__isnull=False).exclude(email='')
+    else:
+        registrations = registrations.filter(phone_number__isnull=False).exclude(phone_number='')
+    return registrations.order_by('id')
+
+
+def format_phone(phone):
+    """Número en formato internacional (+1 por defecto)"""
+    phone = phone.strip()
+    if not phone.startswith('+'):
+        phone = '+1' + phone.replace('(', '').replace(')', '').replace('-', '').replace(' ', '')
+    return phone
+
+
+def keyset_chunks(queryset, fields, size=CHUNK_SIZE, upper_bound=None):
+    """
+    Recorre `queryset` en bloques de hasta `size` filas (dicts con 'id' y
+    `fields`) paginando por clave: cada bloque es `id > último id ORDER BY
+    id LIMIT size`, que avanza por el índice de la clave primaria en lugar
+    de repetir la consulta desde el principio o saltar filas con OFFSET.
+
+    Las filas con id mayor que `upper_bound` (el id máximo al empezar la
+    campaña) no se incluyen: lo que llega durante el envío no entra en él
+    ni desplaza ninguna fila.
+    """
+    queryset = queryset.order_by('id')
+    if upper_bound is not None:
+        queryset = queryset.filter(id__lte=upper_bound)
+    fields = ['id', *(field for field in fields if field != 'id')]
+
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id).values(*fields)[:size])
+        if chunk:
+            yield chunk
+        if len(chunk) < size:
+            return
+        last_id = chunk[-1]['id']
+
+
+def upper_bound(queryset):
+    """Id máximo actual de `queryset` (la cota de keyset_chunks)"""
+    return queryset.aggregate(upper=Max('id'))['upper']
+
+
+def record_outcomes(campaign, outcomes):
+    """
+    Guarda en bloque los resultados por destinatario y actualiza los
+    contadores de progreso de la campaña.
+    """
+    CampaignRecipient.objects.bulk_create(outcomes)
+    sent = sum(1 for outcome in outcomes if outcome.status == CampaignRecipient.STATUS_SENT)
+    Campaign.objects.filter(pk=campaign.pk).update(
+        sent=F('sent') + sent,
+        failed=F('failed') + len(outcomes) - sent,
+    )
+
+
+def materialize_recipients(campaign):
+    """
+    Guarda la audiencia de la campaña de email como destinatarios
+    pendientes. Se hace una sola vez: al reanudar la campaña la lista ya
+    existe y no se vuelven a evaluar los filtros. Las direcciones repetidas
+    (varios registros con el mismo email) reciben un solo mensaje.
+    """
+    if campaign.recipients.exists():
+        return
+
+    seen = set()
+    registrations = audience(campaign)
+    bound = upper_bound(Registration.objects.all())
+    with transaction.atomic():
+        for chunk in keyset_chunks(registrations, ['email', 'name', 'last_name'], upper_bound=bound):
+            pending = []
+            for contact in chunk:
+                address = contact['email'].strip()
+                if address.lower() in seen:
+                    continue
+                seen.add(address.lower())
+                pending.append(CampaignRecipient(
+                    campaign=campaign,
+                    registration_id=contact['id'],
+                    address=address,
+                    name=f'{contact["name"] or ""} {contact["last_name"] or ""}'.strip(),
+                    status=CampaignRecipient.STATUS_PENDING,
+                    processed_at=None
+                ))
+            CampaignRecipient.objects.bulk_create(pending)
+
+
+def refresh_counters(campaign):
+    """
+    Recalcula total/enviados/fallidos a partir de los destinatarios; los
+    que están en la cola de reintentos no cuentan todavía como fallidos.
+    """
+    counts = dict(campaign.recipients.order_by().values_list('status').annotate(total=Count('id')))
+    Campaign.objects.filter(pk=campaign.pk).update(
+        total=sum(counts.values()),
+        sent=counts.get(CampaignRecipient.STATUS_SENT, 0),
+        failed=counts.get(CampaignRecipient.STATUS_FAILED, 0) + counts.get(CampaignRecipient.STATUS_DEAD, 0),
+    )
+
+
+def build_email(campaign, name, address):
+    """
+    Mensaje personalizado para un destinatario, armado sobre el esqueleto
+    MIME pre-codificado de la campaña (mime.py).
+    """
+    skeleton = mime.message_skeleton(
+        campaign.subject,
+        settings.CAMPAIGN_FROM_EMAIL,
+        campaign.message,
+        campaign.text_message or email_templates.plain_text(campaign.message),
+    )
+    return skeleton.build(address, email_templates.recipient_context(name, address))
+
+
+def build_templated_email(campaign, name, address):
+    """Destinatario para un transporte con plantilla (el proveedor personaliza el mensaje)"""
+    return TemplatedMessage(
+        settings.CAMPAIGN_FROM_EMAIL,
+        [address],
+        campaign.subject,
+        campaign.message,
+        campaign.text_message or email_templates.plain_text(campaign.message),
+        email_templates.recipient_context(name, address),
+    )
+
+
+def retry_delay(kind, number):
+    """
+    Segundos hasta el siguiente intento de un destinatario que lleva
+    `number` intentos fallidos, el último de la clase `kind`; None si ya
+    no se reintenta (fallo permanente o reintentos agotados).
+    """
+    policy = settings.CAMPAIGN_RETRY_POLICY.get(kind) or {}
+    if number > policy.get('retries', 0):
+        return None
+    # Jitter completo: los fallos de un mismo bloque no vuelven todos a la vez
+    base = policy.get('base', RETRY_BASE_SECONDS)
+    cap = policy.get('cap', RETRY_CAP_SECONDS)
+    return backoff_delay(number - 1, base=base, cap=cap)
+
+
+def record_deliveries(campaign, transport, deliveries):
+    """
+    Guarda en bloque el resultado de varios envíos, [(destinatario, error)]:
+    un upsert de los CampaignRecipient por id, un INSERT de los SendAttempt
+    y un incremento de los contadores de la campaña. El coste depende del
+    tamaño del bloque, no de cuántos envíos lleva la campaña.
+
+    Un envío fallido pasa a la cola de reintentos con la espera que toca a
+    su clase de fallo (retry_delay), o queda descartado si no se reintenta.
+    """
+    if not deliveries:
+        return
+    now = timezone.now()
+    recipients = []
+    attempts = []
+    for recipient, error in deliveries:
+        number = recipient['attempts'] + 1
+        next_attempt_at = None
+        if error is None:
+            status, attempt_status, error = CampaignRecipient.STATUS_SENT, CampaignRecipient.STATUS_SENT, ''
+        else:
+            delay = retry_delay(error.kind, number)
+            if delay is None:
+                status = CampaignRecipient.STATUS_DEAD
+            else:
+                status = CampaignRecipient.STATUS_RETRY
+                next_attempt_at = now + timedelta(seconds=delay)
+            attempt_status, error = CampaignRecipient.STATUS_FAILED, str(error)
+        recipients.append(CampaignRecipient(
+            id=recipient['id'],
+            campaign_id=campaign.pk,
+            address=recipient['address'],
+            name=recipient['name'],
+            status=status,
+            error=error,
+            attempts=number,
+            processed_at=now,
+            next_attempt_at=next_attempt_at
+        ))
+        attempts.append(SendAttempt(
+            recipient_id=recipient['id'],
+            number=number,
+            transport=transport.name,
+            status=attempt_status,
+            error=error,
+            created_at=now
+        ))
+
+    sent = sum(1 for recipient in recipients if recipient.status == CampaignRecipient.STATUS_SENT)
+    dead = sum(1 for recipient in recipients if recipient.status == CampaignRecipient.STATUS_DEAD)
+    with transaction.atomic():
+        CampaignRecipient.objects.bulk_create(
+            recipients,
+            update_conflicts=True,
+            unique_fields=['id'],
+            update_fields=['status', 'error', 'attempts', 'processed_at', 'next_attempt_at'],
+        )
+        SendAttempt.objects.bulk_create(attempts)
+        Campaign.objects.filter(pk=campaign.pk).update(
+            sent=F('sent') + sent,
+            failed=F('failed') + dead,
+        )
+
+
+def rate_controller(provider):
+    """Control de tasa AIMD que empieza por la última tasa aprendida para el proveedor"""
+    state = SendRateState.objects.filter(provider=provider).first()
+    return AimdRateController(
+        state.rate if state else settings.CAMPAIGN_SEND_RATE_INITIAL,
+        min_rate=settings.CAMPAIGN_SEND_RATE_MIN,
+        max_rate=settings.CAMPAIGN_SEND_RATE_MAX,
+        increase=settings.CAMPAIGN_SEND_RATE_INCREASE,
+        decrease=settings.CAMPAIGN_SEND_RATE_DECREASE,
+    )
+
+
+def save_send_rate(provider, controller):
+    """Guarda la tasa aprendida en este envío para el siguiente"""
+    if not controller.sent and not controller.throttles:
+        return
+    SendRateState.objects.update_or_create(
+        provider=provider,
+        defaults={
+            'rate': controller.rate,
+            'achieved_rate': controller.achieved_rate,
+            'throttles': controller.throttles,
+        },
+    )
+
+
+def send_email_campaign(campaign, transport=None, limit=None, progress=None):
+    """
+    Envía la campaña de email a sus destinatarios pendientes, en orden.
+
+    El estado de los destinatarios se guarda en bloques pequeños a medida
+    que llegan los resultados (CAMPAIGN_EMAIL_STATE_BATCH), así que si el
+    proceso se interrumpe la campaña se reanuda por el primer pendiente; si
+    muere de golpe, como mucho se repite un bloque. `transport` sustituye al de la campaña (p. ej.
+    la consola para simular); con `limit` se envían como máximo ese número
+    de mensajes. `progress(recipient, ok)` se llama después de cada envío.
+    Los envíos siguen la tasa adaptativa del proveedor, que se guarda al
+    terminar; si se agota su cuota diaria el envío se detiene y el motivo
+    queda en campaign.error. Un fallo de la cuenta del proveedor (no se
+    pudo conectar o autenticar, cuenta pausada...) se lanza como SendError
+    sin marcar a nadie. Devuelve True si quedan destinatarios pendientes.
+    """
+    materialize_recipients(campaign)
+    if transport is None:
+        transport = get_transport(campaign.transport)
+    provider = transport.provider
+    if provider is not None and transport.rate_controller is None:
+        transport.rate_controller = rate_controller(provider)
+
+    pending = campaign.recipients.filter(status=CampaignRecipient.STATUS_PENDING)
+    chunks = keyset_chunks(
+        pending,
+        ['address', 'name', 'attempts'],
+        size=settings.CAMPAIGN_EMAIL_CHUNK_SIZE,
+        upper_bound=upper_bound(pending),
+    )
+
+    build = build_templated_email if transport.templated else build_email
+    refresh_counters(campaign)
+    processed = 0
+    try:
+        with transport:
+            for chunk in chunks:
+                if limit is not None:
+                    chunk = chunk[:limit - processed]
+                # Los resultados llegan en orden de finalización (el transporte puede
+                # enviar en paralelo) y se guardan en bloques de CAMPAIGN_EMAIL_STATE_BATCH
+                results = []
+                stop = None
+                recipients, emails = [], []
+                for recipient in chunk:
+                    try:
+                        emails.append(build(campaign, recipient['name'], recipient['address']))
+                    except ValueError as e:
+                        # Dirección inválida (p. ej. con saltos de línea): falla solo ese destinatario
+                        results.append((recipient, SendError(f'{type(e).__name__}: {e}', type(e).__name__)))
+                        continue
+                    recipients.append(recipient)
+                try:
+                    for index, error in transport.send_many(emails):
+                        if error is not None and error.kind in ('provider', 'quota'):
+                            # Fallo de la cuenta, no del destinatario: sigue pendiente
+                            stop = stop or error
+                            continue
+                        results.append((recipients[index], error))
+                        if progress:
+                            progress(recipients[index], error is None)
+                        if len(results) >= settings.CAMPAIGN_EMAIL_STATE_BATCH:
+                            record_deliveries(campaign, transport, results)
+                            results = []
+                except QuotaExhausted as e:
+                    stop = e
+                finally:
+                    record_deliveries(campaign, transport, results)
+                if stop is not None and not isinstance(stop, QuotaExhausted) and stop.kind == 'provider':
+                    # Credenciales, cuenta o configuración: run_campaign la marca como fallida
+                    raise stop
+                if stop is not None:
+                    # Los que no salieron siguen pendientes: la campaña queda en pausa
+                    Campaign.objects.filter(pk=campaign.pk).update(error=str(stop))
+                    break
+                processed += len(chunk)
+                if limit is not None and processed >= limit:
+                    break
+    finally:
+        if provider is not None:
+            save_send_rate(provider, transport.rate_controller)
+    refresh_counters(campaign)
+    return pending.exists()
+
+
+def retry_failed(campaign):
+    """
+    Vuelve a poner como pendientes los destinatarios fallidos, descartados
+    o en la cola de reintentos (sin esperar a su próximo intento); devuelve
+    cuántos
+    """
+    count = campaign.recipients.filter(status__in=[
+        CampaignRecipient.STATUS_FAILED,
+        CampaignRecipient.STATUS_DEAD,
+        CampaignRecipient.STATUS_RETRY,
+    ]).update(status=CampaignRecipient.STATUS_PENDING, next_attempt_at=None)
+    refresh_counters(campaign)
+    return count
+
+
+def send_sms_campaign(campaign):
+    """
+    Envía la campaña de SMS con SmsDispatcher (hilos + token bucket) y
+    guarda el SID de cada mensaje aceptado en SmsMessage.
+
+    El mensaje es una plantilla ({nombre}, {apellidos}); cada SMS
+    personalizado se ajusta a los segmentos calculados para la plantilla.
+    """
+    if not all([settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, settings.TWILIO_PHONE_NUMBER]):
+        raise RuntimeError('Twilio no está configurado correctamente')
+
+    dispatcher = SmsDispatcher(status_callback=settings.TWILIO_STATUS_CALLBACK_URL)
+    max_segments = template_segments(campaign.message)
+
+    registrations = audience(campaign)
+    bound = upper_bound(Registration.objects.all())
+    for chunk in keyset_chunks(registrations, ['phone_number', 'name', 'last_name'], upper_bound=bound):
+        results = dispatcher.dispatch(
+            (
+                contact['id'],
+                format_phone(contact['phone_number']),
+                personalize(campaign.message, contact, max_segments)
+            )
+            for contact in chunk
+        )
+
+        outcomes = []
+        messages = []
+        for contact, result in zip(chunk, results):
+            registration_id = contact['id']
+            outcomes.append(CampaignRecipient(
+                campaign=campaign,
+                registration_id=registration_id,
+                address=contact['phone_number'],
+                status=CampaignRecipient.STATUS_SENT if result.ok else CampaignRecipient.STATUS_FAILED,
+                error=result.error or ''
+            ))
+            if result.ok:
+                messages.append(SmsMessage(
+                    sid=result.sid,
+                    campaign=campaign,
+                    registration_id=registration_id,
+                    to=result.to,
+                    from_number=settings.TWILIO_PHONE_NUMBER,
+                    status=result.status or 'queued'
+                ))
+
+        SmsMessage.objects.bulk_create(messages, ignore_conflicts=True)
+        record_outcomes(campaign, outcomes)
+
+
+def run_campaign(campaign, transport=None, limit=None, progress=None):
+    """
+    Envía o reanuda la campaña y deja su estado al día: completada, en
+    pausa (si `limit` o la cuota del proveedor dejaron destinatarios
+    pendientes), con reintentos programados (process_retries la retoma
+    cuando vencen) o fallida (los destinatarios sin enviar siguen
+    pendientes y se reanuda con run_campaign).
+    """
+    now = timezone.now()
+    Campaign.objects.filter(pk=campaign.pk).update(status=Campaign.STATUS_RUNNING, error='', finished_at=None)
+    Campaign.objects.filter(pk=campaign.pk, started_at__isnull=True).update(started_at=now)
+
+    try:
+        if campaign.channel == Campaign.CHANNEL_EMAIL:
+            remaining = send_email_campaign(campaign, transport=transport, limit=limit, progress=progress)
+        else:
+            Campaign.objects.filter(pk=campaign.pk).update(total=audience(campaign).count())
+            send_sms_campaign(campaign)
+            remaining = False
+        if remaining:
+            Campaign.objects.filter(pk=campaign.pk).update(status=Campaign.STATUS_PAUSED)
+        elif campaign.recipients.filter(status=CampaignRecipient.STATUS_RETRY).exists():
+            Campaign.objects.filter(pk=campaign.pk).update(status=Campaign.STATUS_RETRYING)
+        else:
+            Campaign.objects.filter(pk=campaign.pk).update(
+                status=Campaign.STATUS_DONE,
+                finished_at=timezone.now(),
+            )
+    except Exception as e:
+        Campaign.objects.filter(pk=campaign.pk).update(
+            status=Campaign.STATUS_FAILED,
+            error=str(e),
+            finished_at=timezone.now(),
+        )
+    campaign.refresh_from_db()
+    return campaign
+
+
+def process_campaigns():
+    """Tarea del worker: procesa la siguiente campaña pendiente. Devuelve True si hubo trabajo."""
+    campaign = Campaign.objects.filter(status=Campaign.STATUS_PENDING).order_by('created_at').first()
+    if campaign is None:
+        return False
+
+    claimed = Campaign.objects.filter(pk=campaign.pk, status=Campaign.STATUS_PENDING).update(
+        status=Campaign.STATUS_RUNNING,
+        started_at=timezone.now(),
+    )
+    if not claimed:
+        return True
+
+    run_campaign(campaign)
+    return True
+
+
+def process_retries():
+    """
+    Tarea del worker: reenvía los destinatarios con el reintento vencido de
+    una campaña. Pasan a pendientes todos a la vez y se envían con el mismo
+    motor que el envío original (transporte en paralelo, tasa aprendida,
+    estado en bloque). Devuelve True si hubo trabajo.
+    """
+    now = timezone.now()
+    campaign_id = CampaignRecipient.objects.filter(
+        status=CampaignRecipient.STATUS_RETRY,
+        next_attempt_at__lte=now,
+        campaign__status=Campaign.STATUS_RETRYING,
+    ).order_by('next_attempt_at').values_list('campaign_id', flat=True).first()
+    if campaign_id is None:
+        return False
+
+    claimed = Campaign.objects.filter(pk=campaign_id, status=Campaign.STATUS_RETRYING).update(
+        status=Campaign.STATUS_RUNNING,
+    )
+    if not claimed:
+        return True
+
+    campaign = Campaign.objects.get(pk=campaign_id)
+    campaign.recipients.filter(status=CampaignRecipient.STATUS_RETRY, next_attempt_at__lte=now).update(
+        status=CampaignRecipient.STATUS_PENDING,
+        next_attempt_at=None,
+    )
+    run_campaign(campaign)
+    return True
+
+
+def latest_email_campaign(subject):
+    """
+    Última campaña de email real con ese asunto (para los scripts de
+    reintento); las simulaciones (--dry-run, transporte consola) no cuentan
+    """
+    return Campaign.objects.filter(channel=Campaign.CHANNEL_EMAIL, subject=subject).exclude(
+        transport=Campaign.TRANSPORT_CONSOLE
+    ).order_by('-created_at').first()
+
+
+def campaign_progress(campaign):
+    """Estado de la campaña para el endpoint de progreso del dashboard"""
+    processed = campaign.sent + campaign.failed
+    if campaign.status == Campaign.STATUS_DONE:
+        progress = 100
+    elif campaign.total:
+        progress = min(99, int(processed * 100 / campaign.total))
+    else:
+        progress = 0
+
+    failures = campaign.recipients.filter(
+        status__in=[CampaignRecipient.STATUS_FAILED, CampaignRecipient.STATUS_DEAD]
+    ).order_by('-id').values('address', 'error')[:10]
+    retrying = campaign.recipients.filter(status=CampaignRecipient.STATUS_RETRY)
+
+    return {
+        'status': campaign.status,
+        'progress': progress,
+        'total': campaign.total,
+        'sent': campaign.sent,
+        'failed': campaign.failed,
+        'retrying': retrying.count(),
+        'next_retry_at': retrying.aggregate(next_at=Min('next_attempt_at'))['next_at'],
+        'error': campaign.error,
+        'recent_failures': list(failures),
+    }
+
+
+def sms_delivery_stats(limit=10):
+    """
+    Tasa de entrega de las últimas campañas de SMS según los StatusCallback
+    guardados en SmsMessage, en una sola consulta agregada.
+    """
+    campaigns = Campaign.objects.filter(channel=Campaign.CHANNEL_SMS).annotate(
+        sms_total=Count('sms_messages'),
+        sms_delivered=Count('sms_messages', filter=Q(sms_messages__status='delivered')),
+        sms_failed=Count('sms_messages', filter=Q(sms_messages__status__in=['failed', 'undelivered'])),
+    ).order_by('-created_at')[:limit]
+
+    stats = []
+    for campaign in campaigns:
+        total = campaign.sms_total
+        stats.append({
+            'campaign': campaign,
+            'total': total,
+            'delivered': campaign.sms_delivered,
+            'failed': campaign.sms_failed,
+            'pending': total - campaign.sms_delivered - campaign.sms_failed,
+            'delivery_rate': round(campaign.sms_delivered * 100 / total, 1) if total else 0,
+        })
+    return stats
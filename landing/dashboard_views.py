@@ -1,21 +1,21 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import get_object_or_404
 from django.views.generic import TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.core.paginator import Paginator
-from django.db.models import Count, Q
-from django.db.models.functions import TruncDate
 from django.conf import settings
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_date
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+import hashlib
 import json
-import csv
-from datetime import datetime, timedelta
-from twilio.rest import Client
-from .models import Registration
+from datetime import datetime
+from .models import Campaign, ExportJob, Registration, Segment
 from .filters import RegistrationFilter
+from . import campaigns, exports, facets, live, regions, rollups, segments, sms_encoding, specialties
 
 
 class DashboardView(LoginRequiredMixin, TemplateView):
@@ -30,60 +30,69 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         filterset = RegistrationFilter(self.request.GET, queryset=Registration.objects.all())
         registrations = filterset.qs
         
-        # Estadísticas generales
-        context['total_registros'] = registrations.count()
-        context['total_medicos'] = registrations.filter(is_doctor=True).count()
-        context['total_colegiados'] = registrations.filter(is_licensed=True).count()
-        context['total_ayuda_voto'] = registrations.filter(needs_voting_help=True).count()
-        context['total_acepto_promociones'] = registrations.filter(accepts_promotions=True).count()
-        
-        # Registros recientes (últimos 7 días)
-        seven_days_ago = datetime.now() - timedelta(days=7)
-        context['registros_recientes'] = registrations.filter(created_at__gte=seven_days_ago).count()
-        
-        # Paginación
+        # Estadísticas generales y conteos por opción de filtro (una consulta, en caché)
+        counts = facets.facet_counts(self.request.GET)
+        context.update(counts['stats'])
+
+        # Paginación (el total ya está calculado; se evita el COUNT del paginador)
         page = self.request.GET.get('page', 1)
         paginator = Paginator(registrations.order_by('-created_at'), settings.DASHBOARD_ITEMS_PER_PAGE)
+        paginator.count = counts['stats']['total_registros']
         context['registrations'] = paginator.get_page(page)
-        
-        # Filtros
+
+        # Filtros (cada opción muestra cuántos registros tiene)
+        facets.label_choices(filterset.form, counts['facets'])
+        specialty_counts = {pk: total for pk, name, total in specialties.specialty_counts(self.request.GET)}
+        filterset.form.fields['canonical_specialty'].label_from_instance = (
+            lambda specialty: f'{specialty.name} ({specialty_counts.get(specialty.pk, 0)})'
+        )
         context['filter'] = filterset
         
+        # Entrega de SMS por campaña (StatusCallback de Twilio)
+        context['sms_delivery'] = campaigns.sms_delivery_stats()
+        
         return context
 
 
+def chart_series_state(request):
+    """Estado de la serie del gráfico, calculado una sola vez por petición"""
+    if not hasattr(request, '_chart_series_state'):
+        request._chart_series_state = rollups.series_state()
+    return request._chart_series_state
+
+
+def chart_data_etag(request):
+    """ETag del gráfico: estado del rollup, conteo de hoy y parámetros"""
+    fingerprint = f"{rollups.series_fingerprint(chart_series_state(request))}|{request.GET.urlencode()}"
+    return hashlib.md5(fingerprint.encode()).hexdigest()
+
+
+def chart_data_last_modified(request):
+    return chart_series_state(request)['latest']
+
+
+@method_decorator(condition(etag_func=chart_data_etag, last_modified_func=chart_data_last_modified), name='get')
 class DashboardChartDataView(LoginRequiredMixin, View):
     """API para obtener datos del gráfico de tendencias"""
     login_url = '/admin/login/'
     
     def get(self, request):
-        # Obtener el rango de fechas
-        start_date = request.GET.get('start_date')
-        end_date = request.GET.get('end_date')
-        
-        registrations = Registration.objects.all()
-        
-        if start_date:
-            registrations = registrations.filter(created_at__gte=start_date)
-        if end_date:
-            registrations = registrations.filter(created_at__lte=end_date)
+        # Obtener el rango de fechas (YYYY-MM-DD, hora de Puerto Rico)
+        start_date = parse_date(request.GET.get('start_date') or '')
+        end_date = parse_date(request.GET.get('end_date') or '')
         
-        # Agrupar por fecha
-        daily_registrations = registrations.annotate(
-            date=TruncDate('created_at')
-        ).values('date').annotate(
-            count=Count('id')
-        ).order_by('date')
+        # Días pasados desde el rollup en caché; solo hoy se recalcula
+        daily_registrations = rollups.daily_series(start_date, end_date, state=chart_series_state(request))
         
         # Formatear datos para Chart.js
         labels = []
         data = []
         
-        for item in daily_registrations:
-            labels.append(item['date'].strftime('%Y-%m-%d'))
-            data.append(item['count'])
+        for date, count in daily_registrations:
+            labels.append(date.strftime('%Y-%m-%d'))
+            data.append(count)
         
-        return JsonResponse({
+        response = JsonResponse({
             'labels': labels,
             'datasets': [{
                 'label': 'Registros por día',
@@ -93,64 +102,69 @@ class DashboardChartDataView(LoginRequiredMixin, View):
                 'tension': 0.4
             }]
         })
+        # Obligar al navegador a revalidar para recibir 304 si nada cambió
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class DashboardRegionsView(LoginRequiredMixin, View):
+    """Registros por municipio para el panel regional (agregado en caché)"""
+    login_url = '/admin/login/'
+    
+    def get(self, request):
+        counts = regions.municipality_counts(request.GET)
+        return JsonResponse({
+            'labels': [name for name, total in counts['municipalities']],
+            'data': [total for name, total in counts['municipalities']],
+            'unknown': counts['unknown'],
+            'zip_codes': [{'zip_code': zip_code, 'total': total} for zip_code, total in counts['zip_codes']],
+        })
+
+
+class DashboardLiveView(LoginRequiredMixin, View):
+    """Server-Sent Events con los contadores y los registros nuevos"""
+    login_url = '/admin/login/'
+    
+    def get(self, request):
+        response = StreamingHttpResponse(live.event_stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
 
 
 class SendEmailView(LoginRequiredMixin, View):
-    """Vista para enviar emails masivos"""
+    """Vista para enviar emails masivos (se encolan para el worker)"""
     login_url = '/admin/login/'
     
     def post(self, request):
         try:
             data = json.loads(request.body)
             recipient_ids = data.get('recipients', [])
+            filters = data.get('filters')
             subject = data.get('subject', '')
             message_html = data.get('message', '')
             
-            if not recipient_ids or not subject or not message_html:
+            # La audiencia es una selección explícita o "todos los que coinciden con el filtro"
+            if (not recipient_ids and filters is None) or not subject or not message_html:
                 return JsonResponse({
                     'success': False,
                     'message': 'Faltan datos requeridos'
                 }, status=400)
             
-            # Obtener destinatarios que aceptaron promociones
-            recipients = Registration.objects.filter(
-                id__in=recipient_ids,
-                accepts_promotions=True,
-                email__isnull=False
-            ).exclude(email='')
-            
-            sent_count = 0
-            failed_count = 0
-            
-            for recipient in recipients:
-                try:
-                    # Crear email
-                    from_email = settings.EMAIL_HOST_USER
-                    to_email = recipient.email
-                    
-                    text_content = strip_tags(message_html)
-                    
-                    email = EmailMultiAlternatives(
-                        subject,
-                        text_content,
-                        from_email,
-                        [to_email]
-                    )
-                    
-                    email.attach_alternative(message_html, "text/html")
-                    email.send()
-                    
-                    sent_count += 1
-                    
-                except Exception as e:
-                    print(f"Error enviando email a {recipient.email}: {e}")
-                    failed_count += 1
+            campaign = campaigns.create_campaign(
+                Campaign.CHANNEL_EMAIL,
+                message_html,
+                subject=subject,
+                recipient_ids=recipient_ids,
+                filters=filters,
+                user=request.user
+            )
             
             return JsonResponse({
                 'success': True,
-                'message': f'Emails enviados: {sent_count}. Fallidos: {failed_count}',
-                'sent': sent_count,
-                'failed': failed_count
+                'message': f'Envío de emails programado (campaña #{campaign.pk})',
+                'campaign_id': campaign.pk,
+                'status_url': reverse('landing:campaign-status', args=[campaign.pk])
             })
             
         except Exception as e:
@@ -161,21 +175,26 @@ class SendEmailView(LoginRequiredMixin, View):
 
 
 class SendSMSView(LoginRequiredMixin, View):
-    """Vista para enviar SMS masivos usando Twilio"""
+    """Vista para enviar SMS masivos usando Twilio (se encolan para el worker)"""
     login_url = '/admin/login/'
     
     def post(self, request):
         try:
             data = json.loads(request.body)
             recipient_ids = data.get('recipients', [])
+            filters = data.get('filters')
             message_text = data.get('message', '')
             
-            if not recipient_ids or not message_text:
+            if (not recipient_ids and filters is None) or not message_text:
                 return JsonResponse({
                     'success': False,
                     'message': 'Faltan datos requeridos'
                 }, status=400)
             
+            # Versión GSM-7 del mensaje (sin acentos que fuerzan UCS-2)
+            if data.get('transliterate'):
+                message_text = sms_encoding.transliterate(message_text)
+            
             # Verificar configuración de Twilio
             if not all([settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, settings.TWILIO_PHONE_NUMBER]):
                 return JsonResponse({
@@ -183,46 +202,80 @@ class SendSMSView(LoginRequiredMixin, View):
                     'message': 'Twilio no está configurado correctamente'
                 }, status=500)
             
-            # Inicializar cliente de Twilio
-            client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+            campaign = campaigns.create_campaign(
+                Campaign.CHANNEL_SMS,
+                message_text,
+                recipient_ids=recipient_ids,
+                filters=filters,
+                user=request.user
+            )
             
-            # Obtener destinatarios que aceptaron promociones
-            recipients = Registration.objects.filter(
-                id__in=recipient_ids,
-                accepts_promotions=True,
-                phone_number__isnull=False
-            ).exclude(phone_number='')
+            return JsonResponse({
+                'success': True,
+                'message': f'Envío de SMS programado (campaña #{campaign.pk})',
+                'campaign_id': campaign.pk,
+                'status_url': reverse('landing:campaign-status', args=[campaign.pk])
+            })
             
-            sent_count = 0
-            failed_count = 0
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'message': f'Error: {str(e)}'
+            }, status=500)
+
+
+class SmsAnalyzeView(LoginRequiredMixin, View):
+    """Codificación y segmentos de un mensaje SMS antes de enviarlo"""
+    login_url = '/admin/login/'
+    
+    def post(self, request):
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'success': False, 'message': 'JSON inválido'}, status=400)
+        
+        message_text = data.get('message', '')
+        analysis = sms_encoding.analyze(message_text)
+        analysis['template_segments'] = sms_encoding.template_segments(message_text)
+        
+        response = {'success': True, 'analysis': analysis}
+        if analysis['non_gsm']:
+            transliterated = sms_encoding.transliterate(message_text)
+            response['transliterated'] = {
+                'message': transliterated,
+                'analysis': sms_encoding.analyze(transliterated),
+                'template_segments': sms_encoding.template_segments(transliterated),
+            }
+        return JsonResponse(response)
+
+
+class SegmentCreateView(LoginRequiredMixin, View):
+    """Guarda los filtros actuales del dashboard como segmento con nombre"""
+    login_url = '/admin/login/'
+    
+    def post(self, request):
+        try:
+            data = json.loads(request.body)
+            name = (data.get('name') or '').strip()
+            
+            if not name:
+                return JsonResponse({
+                    'success': False,
+                    'message': 'El segmento necesita un nombre'
+                }, status=400)
             
-            for recipient in recipients:
-                try:
-                    # Limpiar número de teléfono
-                    phone = recipient.phone_number.strip()
-                    
-                    # Asegurarse que tenga formato internacional
-                    if not phone.startswith('+'):
-                        phone = '+1' + phone.replace('(', '').replace(')', '').replace('-', '').replace(' ', '')
-                    
-                    # Enviar SMS
-                    message = client.messages.create(
-                        body=message_text,
-                        from_=settings.TWILIO_PHONE_NUMBER,
-                        to=phone
-                    )
-                    
-                    sent_count += 1
-                    
-                except Exception as e:
-                    print(f"Error enviando SMS a {recipient.phone_number}: {e}")
-                    failed_count += 1
+            if Segment.objects.filter(name=name).exists():
+                return JsonResponse({
+                    'success': False,
+                    'message': f'Ya existe un segmento llamado "{name}"'
+                }, status=400)
+            
+            segment = segments.create_segment(name, campaigns.parse_filters(data.get('filters')), user=request.user)
             
             return JsonResponse({
                 'success': True,
-                'message': f'SMS enviados: {sent_count}. Fallidos: {failed_count}',
-                'sent': sent_count,
-                'failed': failed_count
+                'message': f'Segmento "{segment.name}" guardado con {segment.member_count} registros',
+                'segment_id': segment.pk
             })
             
         except Exception as e:
@@ -232,6 +285,18 @@ class SendSMSView(LoginRequiredMixin, View):
             }, status=500)
 
 
+class CampaignStatusView(LoginRequiredMixin, View):
+    """Progreso en vivo de una campaña de email o SMS"""
+    login_url = '/admin/login/'
+    
+    def get(self, request, pk):
+        campaign = get_object_or_404(Campaign, pk=pk)
+        return JsonResponse({
+            'success': True,
+            **campaigns.campaign_progress(campaign)
+        })
+
+
 class ExportCSVView(LoginRequiredMixin, View):
     """Vista para exportar registros a CSV"""
     login_url = '/admin/login/'
@@ -241,47 +306,52 @@ class ExportCSVView(LoginRequiredMixin, View):
         filterset = RegistrationFilter(request.GET, queryset=Registration.objects.all())
         registrations = filterset.qs.order_by('-created_at')
         
-        # Crear respuesta CSV
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="registros_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-        
-        writer = csv.writer(response)
-        
-        # Encabezados
-        writer.writerow([
-            'Código',
-            'Nombre',
-            'Apellidos',
-            'Email',
-            'Teléfono',
-            'Dirección',
-            '¿Médico?',
-            'Especialidad',
-            'Años Ejerciendo',
-            'Lugar Servicios',
-            '¿Colegiado?',
-            '¿Necesita Ayuda Voto?',
-            '¿Acepta Promociones?',
-            'Fecha Registro'
-        ])
-        
-        # Datos
-        for reg in registrations:
-            writer.writerow([
-                reg.unique_id,
-                reg.name,
-                reg.last_name,
-                reg.email or '',
-                reg.phone_number,
-                reg.postal_address,
-                'Sí' if reg.is_doctor else 'No',
-                reg.specialty or '',
-                reg.years_practicing or '',
-                reg.service_location or '',
-                'Sí' if reg.is_licensed else 'No',
-                'Sí' if reg.needs_voting_help else 'No',
-                'Sí' if reg.accepts_promotions else 'No',
-                reg.created_at.strftime('%Y-%m-%d %H:%M:%S')
-            ])
-        
-        return response
\ No newline at end of file
+        # Respuesta CSV en streaming (memoria constante)
+        filename = f'registros_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+        return exports.stream_csv(registrations, exports.DASHBOARD_COLUMNS, filename)
+
+
+class ExportJobCreateView(LoginRequiredMixin, View):
+    """Encola una exportación CSV en segundo plano con los filtros del dashboard"""
+    login_url = '/admin/login/'
+    
+    def post(self, request):
+        job, reused = exports.enqueue_export(request.GET, user=request.user)
+        return JsonResponse({
+            'success': True,
+            'job_id': job.pk,
+            'reused': reused,
+            'status_url': reverse('landing:export-job-status', args=[job.pk]),
+        })
+
+
+class ExportJobStatusView(LoginRequiredMixin, View):
+    """Progreso de una exportación en segundo plano"""
+    login_url = '/admin/login/'
+    
+    def get(self, request, pk):
+        job = get_object_or_404(ExportJob, pk=pk)
+        data = {
+            'success': True,
+            'status': job.status,
+            'progress': job.progress,
+            'rows_done': job.rows_done,
+            'rows_total': job.rows_total,
+        }
+        if job.status == ExportJob.STATUS_DONE:
+            data['download_url'] = reverse('landing:export-job-download', args=[job.pk])
+        elif job.status == ExportJob.STATUS_FAILED:
+            data['message'] = job.error
+        return JsonResponse(data)
+
+
+class ExportJobDownloadView(LoginRequiredMixin, View):
+    """Descarga el archivo generado por una exportación en segundo plano"""
+    login_url = '/admin/login/'
+    
+    def get(self, request, pk):
+        job = get_object_or_404(ExportJob, pk=pk, status=ExportJob.STATUS_DONE)
+        if not job.file or (job.expires_at and job.expires_at <= timezone.now()):
+            raise Http404('La exportación expiró')
+        filename = f'registros_{timezone.localtime(job.finished_at).strftime("%Y%m%d_%H%M%S")}.csv'
+        return FileResponse(job.file.open('rb'), as_attachment=True, filename=filename)
@@ -0,0 +1,130 @@
+"""
+Plantillas de las campañas de email.
+
+Las plantillas viven en landing/templates/landing/emails/ (HTML y texto
+plano) y usan marcadores {{ nombre }}. Los que son iguales para toda la
+campaña (URLs de imágenes, encuesta, contacto) se sustituyen una vez al
+crearla; en Campaign.message solo quedan los del destinatario
+({{ nombre_completo }} y {{ email_destinatario }}), que se rellenan al
+enviar cada mensaje.
+
+Cada plantilla se compila una sola vez en trozos fijos y huecos
+(CompiledTemplate); renderizar un destinatario es rellenar los huecos y
+hacer un único join, sin volver a recorrer el HTML.
+"""
+
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.template.loader import get_template
+from django.utils.html import strip_tags
+
+Preset = namedtuple('Preset', ['subject', 'html', 'text'])
+
+PRESETS = {
+    'encuesta': Preset(
+        subject='Ayúdanos a fortalecer la campaña del Dr. Méndez Sexto - Encuesta',
+        html='landing/emails/email_encuesta.html',
+        text='landing/emails/email_encuesta.txt',
+    ),
+    'transparencia': Preset(
+        subject='URGE TRANSPARENCIA EN EL PROCESO ELECTORAL DEL COLEGIO DE MÉDICOS',
+        html='landing/emails/email_transparencia.html',
+        text='landing/emails/email_transparencia.txt',
+    ),
+}
+
+PLACEHOLDER_RE = re.compile(r'{{\s*(\w+)\s*}}')
+
+DEFAULT_NAME = 'Estimado/a doctor/a'
+
+
+def campaign_context():
+    """Valores de los marcadores que no dependen del destinatario"""
+    site_url = settings.SITE_URL
+    return {
+        'url_sitio_web': site_url,
+        'url_logo': f'{site_url}/static/landing/img/email/DR_x_RPA@4x.png',
+        'url_imagen_1': f'{site_url}/static/landing/img/email/1transparencia.jpg',
+        'url_imagen_2': f'{site_url}/static/landing/img/email/2transparencia.jpg',
+        'url_imagen_3': f'{site_url}/static/landing/img/email/3transparencia.jpg',
+        'url_imagen_4': f'{site_url}/static/landing/img/email/4transparencia.jpg',
+        'url_encuesta': settings.CAMPAIGN_SURVEY_URL,
+        'email_contacto': settings.CAMPAIGN_CONTACT_EMAIL,
+    }
+
+
+class CompiledTemplate:
+    """
+    Plantilla partida en trozos fijos y huecos.
+
+    `parts` alterna texto fijo y marcadores tal como aparecen en la plantilla
+    ([texto, '{{ nombre_completo }}', texto, ...]); `slots` dice qué posición
+    ocupa cada marcador. render() copia la lista, pone los valores en los
+    huecos y la une; los marcadores que no están en el contexto se dejan
+    igual. render_bytes() hace lo mismo con los trozos fijos ya codificados.
+    """
+
+    def __init__(self, source):
+        self.parts = []
+        self.slots = []
+        position = 0
+        for match in PLACEHOLDER_RE.finditer(source):
+            self.parts.append(source[position:match.start()])
+            self.slots.append((len(self.parts), match.group(1)))
+            self.parts.append(match.group(0))
+            position = match.end()
+        self.parts.append(source[position:])
+        self._encoded = {}
+
+    def render(self, context):
+        parts = self.parts.copy()
+        for index, name in self.slots:
+            if name in context:
+                parts[index] = str(context[name])
+        return ''.join(parts)
+
+    def render_bytes(self, context, encoding='utf-8'):
+        encoded = self._encoded.get(encoding)
+        if encoded is None:
+            encoded = self._encoded[encoding] = [part.encode(encoding) for part in self.parts]
+        parts = encoded.copy()
+        for index, name in self.slots:
+            if name in context:
+                parts[index] = str(context[name]).encode(encoding)
+        return b''.join(parts)
+
+
+@lru_cache(maxsize=32)
+def compile_template(source):
+    """CompiledTemplate de `source`, en caché por el hash de la plantilla"""
+    return CompiledTemplate(source)
+
+
+@lru_cache(maxsize=32)
+def plain_text(html):
+    """Versión en texto plano de una plantilla HTML (los marcadores se conservan)"""
+    return strip_tags(html)
+
+
+def render(template, context):
+    """Sustituye los marcadores presentes en `context`; el resto se deja igual"""
+    return compile_template(template).render(context)
+
+
+def load_preset(name):
+    """(asunto, html, texto) de la plantilla con los valores de campaña ya sustituidos"""
+    preset = PRESETS[name]
+    context = campaign_context()
+    html = render(get_template(preset.html).template.source, context)
+    text = render(get_template(preset.text).template.source, context)
+    return preset.subject, html, text
+
+
+def recipient_context(name, email):
+    return {
+        'nombre_completo': name.strip() or DEFAULT_NAME,
+        'email_destinatario': email,
+    }
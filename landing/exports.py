@@ -0,0 +1,303 @@
+"""
+Motor de exportación CSV en streaming.
+
+Cada exportación se describe con una lista de columnas (encabezado, campo del
+modelo y formato). Las filas se leen con values_list(...).iterator() y se
+escriben por bloques, de modo que la memoria usada no depende de la cantidad
+de registros exportados.
+
+Las exportaciones grandes del dashboard se encolan como ExportJob y las
+procesa el worker local (python manage.py run_worker).
+"""
+
+import csv
+import io
+import os
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .caching import registrations_version
+from .filters import RegistrationFilter, filter_key, normalize_filter_params
+from .models import ExportJob, Registration
+
+CHUNK_SIZE = 2000
+
+
+def yes_no(value):
+    return 'Sí' if value else 'No'
+
+
+def or_empty(value):
+    return value or ''
+
+
+def date_format(fmt):
+    def formatter(value):
+        return value.strftime(fmt) if value else ''
+    return formatter
+
+
+class Column:
+    """Columna de una exportación: encabezado, campo a leer y formato opcional"""
+
+    def __init__(self, header, field, formatter=None):
+        self.header = header
+        self.field = field
+        self.formatter = formatter
+
+
+# ============================================
+# ESPECIFICACIONES DE COLUMNAS
+# ============================================
+
+DASHBOARD_COLUMNS = [
+    Column('Código', 'unique_id'),
+    Column('Nombre', 'name'),
+    Column('Apellidos', 'last_name'),
+    Column('Email', 'email', or_empty),
+    Column('Teléfono', 'phone_number'),
+    Column('Dirección', 'postal_address'),
+    Column('Municipio', 'municipality'),
+    Column('Código Postal', 'zip_code'),
+    Column('¿Médico?', 'is_doctor', yes_no),
+    Column('Especialidad', 'specialty', or_empty),
+    Column('Especialidad Normalizada', 'canonical_specialty__name', or_empty),
+    Column('Años Ejerciendo', 'years_practicing', or_empty),
+    Column('Lugar Servicios', 'service_location', or_empty),
+    Column('¿Colegiado?', 'is_licensed', yes_no),
+    Column('¿Necesita Ayuda Voto?', 'needs_voting_help', yes_no),
+    Column('¿Acepta Promociones?', 'accepts_promotions', yes_no),
+    Column('Fecha Registro', 'created_at', date_format('%Y-%m-%d %H:%M:%S')),
+]
+
+ADMIN_COLUMNS = [
+    Column('Código', 'unique_id'),
+    Column('Nombre', 'name'),
+    Column('Apellidos', 'last_name'),
+    Column('Dirección', 'postal_address'),
+    Column('Teléfono', 'phone_number'),
+    Column('Email', 'email', or_empty),
+    Column('¿Médico?', 'is_doctor', yes_no),
+    Column('Lugar de Servicios', 'service_location', or_empty),
+    Column('Años Ejerciendo', 'years_practicing', or_empty),
+    Column('¿Colegiado?', 'is_licensed', yes_no),
+    Column('¿Necesita Ayuda Voto?', 'needs_voting_help', yes_no),
+    Column('Aceptó Términos', 'accepts_terms', yes_no),
+    Column('Aceptó Promociones', 'accepts_promotions', yes_no),
+    Column('Fecha Registro', 'created_at', date_format('%d/%m/%Y %H:%M')),
+]
+
+DOCTOR_COLUMNS = [
+    Column('Código', 'unique_id'),
+    Column('Nombre', 'name'),
+    Column('Apellidos', 'last_name'),
+    Column('Teléfono', 'phone_number'),
+    Column('Email', 'email', or_empty),
+    Column('Lugar de Servicios', 'service_location'),
+    Column('Años Ejerciendo', 'years_practicing'),
+    Column('¿Colegiado?', 'is_licensed', yes_no),
+]
+
+VOTING_HELP_COLUMNS = [
+    Column('Código', 'unique_id'),
+    Column('Nombre', 'name'),
+    Column('Apellidos', 'last_name'),
+    Column('Dirección', 'postal_address'),
+    Column('Teléfono', 'phone_number'),
+    Column('Email', 'email', or_empty),
+]
+
+PROMOTIONS_COLUMNS = [
+    Column('Código', 'unique_id'),
+    Column('Nombre', 'name'),
+    Column('Apellidos', 'last_name'),
+    Column('Email', 'email', or_empty),
+    Column('Teléfono', 'phone_number'),
+]
+
+
+# ============================================
+# MOTOR
+# ============================================
+
+def iter_rows(queryset, columns, chunk_size=CHUNK_SIZE):
+    """Genera las filas formateadas leyendo solo los campos necesarios"""
+    fields = [column.field for column in columns]
+    formatters = [column.formatter for column in columns]
+    for values in queryset.values_list(*fields).iterator(chunk_size=chunk_size):
+        yield [fmt(value) if fmt else value for fmt, value in zip(formatters, values)]
+
+
+def iter_csv(queryset, columns, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Genera el CSV como bloques de texto de hasta `chunk_size` filas.
+
+    `progress`, si se indica, se llama con el número de filas escritas
+    después de cada bloque.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.header for column in columns])
+
+    written = 0
+    for row in iter_rows(queryset, columns, chunk_size):
+        writer.writerow(row)
+        written += 1
+        if written % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            if progress:
+                progress(written)
+
+    yield buffer.getvalue()
+    if progress:
+        progress(written)
+
+
+def stream_csv(queryset, columns, filename):
+    """Respuesta HTTP en streaming con el CSV de `queryset`"""
+    response = StreamingHttpResponse(iter_csv(queryset, columns), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+# ============================================
+# EXPORTACIONES EN SEGUNDO PLANO
+# ============================================
+
+def data_version():
+    """Versión de los datos de registros (incluye la membresía de los segmentos)"""
+    return registrations_version()
+
+
+def enqueue_export(params, user=None):
+    """
+    Crea (o reutiliza) un trabajo de exportación para los filtros dados.
+
+    Si existe un trabajo reciente con el mismo filtro y la misma versión de
+    datos que no ha fallado ni expirado, se devuelve ese en lugar de crear
+    uno nuevo. Los trabajos abandonados por el worker se marcan antes como
+    fallidos (fail_stale_exports) para no reutilizarlos. Devuelve (job,
+    reutilizado).
+    """
+    params = normalize_filter_params(params)
+    key = filter_key(params)
+    version = data_version()
+    fail_stale_exports()
+
+    existing = ExportJob.objects.filter(
+        filter_hash=key,
+        data_version=version,
+    ).exclude(
+        status=ExportJob.STATUS_FAILED
+    ).filter(
+        Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now())
+    ).first()
+    if existing:
+        return existing, True
+
+    job = ExportJob.objects.create(
+        filter_hash=key,
+        params=params,
+        data_version=version,
+        created_by=user if user and user.is_authenticated else None,
+    )
+    return job, False
+
+
+def run_export_job(job):
+    """
+    Genera el archivo CSV de `job` en el almacenamiento privado
+    (PRIVATE_MEDIA_ROOT/exports/) actualizando el progreso y heartbeat_at.
+
+    El nombre lleva un token aleatorio y el archivo solo se descarga con
+    ExportJobDownloadView. Si mientras tanto el trabajo se dio por abandonado
+    (fail_stale_exports), no se marca como completado y el archivo se borra.
+    """
+    registrations = RegistrationFilter(job.params, queryset=Registration.objects.all()).qs.order_by('-created_at')
+    ExportJob.objects.filter(pk=job.pk).update(rows_total=registrations.count(), heartbeat_at=timezone.now())
+
+    storage = job.file.storage
+    name = f'exports/registros_{job.pk}_{secrets.token_urlsafe(16)}.csv'
+    path = storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def progress(rows_done):
+        ExportJob.objects.filter(pk=job.pk).update(rows_done=rows_done, heartbeat_at=timezone.now())
+
+    with open(path, 'w', newline='', encoding='utf-8') as output:
+        for block in iter_csv(registrations, DASHBOARD_COLUMNS, progress=progress):
+            output.write(block)
+
+    now = timezone.now()
+    finished = ExportJob.objects.filter(pk=job.pk, status=ExportJob.STATUS_RUNNING).update(
+        file=name,
+        status=ExportJob.STATUS_DONE,
+        finished_at=now,
+        expires_at=now + timedelta(hours=settings.EXPORT_JOB_TTL_HOURS),
+    )
+    if not finished:
+        storage.delete(name)
+
+
+def fail_stale_exports():
+    """
+    Marca como fallidos los trabajos en proceso sin avances (heartbeat_at)
+    en los últimos EXPORT_JOB_STALE_MINUTES (p. ej. el worker murió a mitad
+    de la exportación), para que la siguiente petición cree uno nuevo en
+    lugar de esperar a uno que nunca termina.
+
+    Los trabajos en cola no se tocan: el worker comparte el bucle con las
+    campañas y puede tardar en llegar a ellos, pero llegará.
+    """
+    cutoff = timezone.now() - timedelta(minutes=settings.EXPORT_JOB_STALE_MINUTES)
+    return ExportJob.objects.filter(status=ExportJob.STATUS_RUNNING, heartbeat_at__lt=cutoff).update(
+        status=ExportJob.STATUS_FAILED,
+        error='La exportación no terminó a tiempo; vuelve a solicitarla',
+        finished_at=timezone.now(),
+    )
+
+
+def purge_expired_exports():
+    """Elimina los trabajos expirados junto con sus archivos"""
+    expired = ExportJob.objects.filter(expires_at__lte=timezone.now())
+    for job in expired:
+        if job.file:
+            job.file.delete(save=False)
+    return expired.delete()[0]
+
+
+def process_export_jobs():
+    """Tarea del worker: procesa el siguiente trabajo pendiente. Devuelve True si hubo trabajo."""
+    purge_expired_exports()
+    fail_stale_exports()
+
+    job = ExportJob.objects.filter(status=ExportJob.STATUS_PENDING).order_by('created_at').first()
+    if job is None:
+        return False
+
+    # Reclamar el trabajo; si otro worker lo tomó primero, no hacer nada
+    now = timezone.now()
+    claimed = ExportJob.objects.filter(pk=job.pk, status=ExportJob.STATUS_PENDING).update(
+        status=ExportJob.STATUS_RUNNING,
+        started_at=now,
+        heartbeat_at=now,
+    )
+    if not claimed:
+        return True
+
+    try:
+        run_export_job(job)
+    except Exception as e:
+        ExportJob.objects.filter(pk=job.pk, status=ExportJob.STATUS_RUNNING).update(
+            status=ExportJob.STATUS_FAILED,
+            error=str(e),
+            finished_at=timezone.now(),
+        )
+    return True
@@ -0,0 +1,98 @@
+"""
+Conteos por opción (facetas) de los filtros del dashboard.
+
+Cada opción de los filtros Sí/No muestra cuántos registros quedarían al
+elegirla, teniendo en cuenta el resto de filtros activos. Todo se calcula en
+una sola consulta: los filtros que no son facetas se aplican en el WHERE y
+cada combinación faceta/opción es un COUNT condicional. En la misma consulta
+van las estadísticas de las tarjetas del dashboard. El resultado se guarda en
+caché por los filtros normalizados y la versión de los datos; los registros
+recientes son los de los últimos 7 días naturales (hora local), así que la
+fecha de hoy también va en la clave.
+"""
+
+from datetime import timedelta
+
+from django import forms
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .caching import cached_aggregate
+from .filters import RegistrationFilter, normalize_filter_params
+from .models import Registration
+from .rollups import day_start
+
+# Días (contando hoy) de la tarjeta de registros recientes
+RECENT_DAYS = 7
+
+BOOLEAN_FACETS = ['is_doctor', 'is_licensed', 'needs_voting_help', 'accepts_promotions']
+
+# Tarjetas del dashboard: campo booleano que cuenta cada una
+STAT_FIELDS = {
+    'total_medicos': 'is_doctor',
+    'total_colegiados': 'is_licensed',
+    'total_ayuda_voto': 'needs_voting_help',
+    'total_acepto_promociones': 'accepts_promotions',
+}
+
+
+def selected_values(params):
+    """{faceta: True/False} de los filtros Sí/No activos"""
+    field = forms.NullBooleanField()
+    selected = {}
+    for name in BOOLEAN_FACETS:
+        value = field.to_python(params.get(name))
+        if value is not None:
+            selected[name] = value
+    return selected
+
+
+def facet_counts(params):
+    """
+    {'stats': {...}, 'facets': {faceta: {True: n, False: n}}} para los
+    filtros dados. El conteo de cada faceta ignora su propio filtro y aplica
+    todos los demás.
+    """
+    params = normalize_filter_params(params)
+    selected = selected_values(params)
+    today = timezone.localdate()
+    recent_since = day_start(today - timedelta(days=RECENT_DAYS - 1))
+
+    def compute():
+        registrations = RegistrationFilter(
+            {key: value for key, value in params.items() if key not in BOOLEAN_FACETS},
+            queryset=Registration.objects.all()
+        ).qs.order_by()
+
+        active = Q(**selected)
+        aggregates = {
+            'total_registros': Count('id', filter=active),
+            'registros_recientes': Count('id', filter=active & Q(created_at__gte=recent_since)),
+        }
+        for stat, field in STAT_FIELDS.items():
+            aggregates[stat] = Count('id', filter=active & Q(**{field: True}))
+        for name in BOOLEAN_FACETS:
+            others = Q(**{field: value for field, value in selected.items() if field != name})
+            aggregates[f'{name}_true'] = Count('id', filter=others & Q(**{name: True}))
+            aggregates[f'{name}_false'] = Count('id', filter=others & Q(**{name: False}))
+
+        row = registrations.aggregate(**aggregates)
+        return {
+            'stats': {stat: row[stat] for stat in ['total_registros', 'registros_recientes', *STAT_FIELDS]},
+            'facets': {
+                name: {True: row[f'{name}_true'], False: row[f'{name}_false']}
+                for name in BOOLEAN_FACETS
+            },
+        }
+
+    return cached_aggregate(f'facets:{today.isoformat()}', params, compute)
+
+
+def label_choices(form, facets):
+    """Añade los conteos a las opciones de los filtros Sí/No del formulario"""
+    for name, counts in facets.items():
+        form.fields[name].widget.choices = [
+            ('', f'Todos ({counts[True] + counts[False]})'),
+            (True, f'Sí ({counts[True]})'),
+            (False, f'No ({counts[False]})'),
+        ]
@@ -1,6 +1,9 @@
+import hashlib
+import json
 import django_filters
 from django import forms
-from .models import Registration
+from .geo import MUNICIPALITIES
+from .models import Registration, Segment, Specialty
 
 class RegistrationFilter(django_filters.FilterSet):
     """Filtros para el dashboard de registros"""
@@ -72,8 +75,56 @@ class RegistrationFilter(django_filters.FilterSet):
         })
     )
     
+    municipality = django_filters.ChoiceFilter(
+        choices=[(name, name) for name in MUNICIPALITIES],
+        empty_label='Todos',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    
+    canonical_specialty = django_filters.ModelChoiceFilter(
+        queryset=Specialty.objects.all(),
+        empty_label='Todas',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    
+    segment = django_filters.ModelChoiceFilter(
+        queryset=Segment.objects.all(),
+        method='filter_segment',
+        empty_label='Todos',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    
     class Meta:
         model = Registration
         fields = ['name', 'last_name', 'email', 'phone_number', 
                   'is_doctor', 'is_licensed', 'needs_voting_help', 
-                  'accepts_promotions', 'created_at']
\ No newline at end of file
+                  'accepts_promotions', 'municipality', 'canonical_specialty', 'created_at']
+    
+    def filter_segment(self, queryset, name, value):
+        """Miembros del segmento guardado, sin volver a aplicar sus filtros"""
+        return queryset.filter(segment_memberships__segment=value)
+
+def normalize_filter_params(params):
+    """
+    Parámetros de filtro normalizados: solo los campos de RegistrationFilter,
+    sin valores vacíos y en orden estable. Sirven para guardar un filtro y
+    volver a aplicarlo fuera de la petición (trabajos en segundo plano).
+    """
+    allowed = set(RegistrationFilter.base_filters)
+    allowed.update(
+        f'{name}{suffix}'
+        for name, field in RegistrationFilter.base_filters.items()
+        if isinstance(field, django_filters.DateFromToRangeFilter)
+        for suffix in ('_after', '_before', '_min', '_max')
+    )
+    return {
+        key: str(params.get(key)).strip()
+        for key in sorted(params.keys())
+        if key in allowed and str(params.get(key) or '').strip()
+    }
+
+
+def filter_key(params):
+    """Hash estable de un conjunto de parámetros de filtro"""
+    normalized = normalize_filter_params(params)
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
@@ -0,0 +1,71 @@
+"""
+Código postal y municipio a partir de la dirección postal (texto libre).
+
+Las direcciones suelen terminar en "<municipio> PR <zip>", por ejemplo
+"Urb. Villa Borinquen buzón 349 Lares PR 00669". Se extraen una sola vez al
+guardar el registro (y con el comando backfill_geo para los registros
+existentes) y se guardan en columnas indexadas, de modo que los conteos por
+región son un GROUP BY sobre esas columnas.
+"""
+
+import re
+import unicodedata
+
+# Códigos postales de Puerto Rico: 006xx-009xx (ZIP+4 opcional)
+ZIP_RE = re.compile(r'(?<!\d)(00[6-9]\d\d)(?:-\d{4})?(?!\d)')
+
+MUNICIPALITIES = [
+    'Adjuntas', 'Aguada', 'Aguadilla', 'Aguas Buenas', 'Aibonito', 'Añasco',
+    'Arecibo', 'Arroyo', 'Barceloneta', 'Barranquitas', 'Bayamón', 'Cabo Rojo',
+    'Caguas', 'Camuy', 'Canóvanas', 'Carolina', 'Cataño', 'Cayey', 'Ceiba',
+    'Ciales', 'Cidra', 'Coamo', 'Comerío', 'Corozal', 'Culebra', 'Dorado',
+    'Fajardo', 'Florida', 'Guánica', 'Guayama', 'Guayanilla', 'Guaynabo',
+    'Gurabo', 'Hatillo', 'Hormigueros', 'Humacao', 'Isabela', 'Jayuya',
+    'Juana Díaz', 'Juncos', 'Lajas', 'Lares', 'Las Marías', 'Las Piedras',
+    'Loíza', 'Luquillo', 'Manatí', 'Maricao', 'Maunabo', 'Mayagüez', 'Moca',
+    'Morovis', 'Naguabo', 'Naranjito', 'Orocovis', 'Patillas', 'Peñuelas',
+    'Ponce', 'Quebradillas', 'Rincón', 'Río Grande', 'Sabana Grande', 'Salinas',
+    'San Germán', 'San Juan', 'San Lorenzo', 'San Sebastián', 'Santa Isabel',
+    'Toa Alta', 'Toa Baja', 'Trujillo Alto', 'Utuado', 'Vega Alta', 'Vega Baja',
+    'Vieques', 'Villalba', 'Yabucoa', 'Yauco',
+]
+
+# Barrios y sectores que se escriben en lugar del municipio
+ALIASES = {
+    'Río Piedras': 'San Juan',
+    'Hato Rey': 'San Juan',
+    'Santurce': 'San Juan',
+    'Condado': 'San Juan',
+    'Levittown': 'Toa Baja',
+    'Mercedita': 'Ponce',
+}
+
+
+def fold(text):
+    """Mayúsculas sin acentos, para comparar nombres escritos de varias formas"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).upper()
+
+
+_NAMES = {fold(name): name for name in MUNICIPALITIES}
+_NAMES.update({fold(alias): municipality for alias, municipality in ALIASES.items()})
+# Los nombres más largos primero para que "Toa Baja" gane a un posible "Toa"
+MUNICIPALITY_RE = re.compile(
+    r'\b(' + '|'.join(re.escape(name) for name in sorted(_NAMES, key=len, reverse=True)) + r')\b'
+)
+
+
+def parse_zip(address):
+    matches = ZIP_RE.findall(address or '')
+    return matches[-1] if matches else ''
+
+
+def parse_municipality(address):
+    """Último municipio mencionado en la dirección (el de la línea de ciudad)"""
+    matches = MUNICIPALITY_RE.findall(fold(address or ''))
+    return _NAMES[matches[-1]] if matches else ''
+
+
+def parse_address(address):
+    """Devuelve (código postal, municipio); cadenas vacías si no se reconocen"""
+    return parse_zip(address), parse_municipality(address)
@@ -0,0 +1,172 @@
+"""
+Actualizaciones en vivo del dashboard (Server-Sent Events).
+
+Un único hilo por proceso consulta la base de datos y reparte el resultado a
+todas las pestañas conectadas: con N dashboards abiertos se hace una sola
+consulta por ciclo en lugar de N recargas completas de la página.
+
+El hilo se despierta en cuanto se guarda un registro nuevo (señal post_save,
+ver signals.py) y, como respaldo para los registros creados desde otros
+procesos o con bulk_create, cada LIVE_POLL_SECONDS segundos. Los contadores
+solo se recalculan si el ID máximo cambió o se guardó algún registro.
+
+Cada pestaña conectada ocupa un worker síncrono mientras dura su stream; el
+stream se cierra a los LIVE_STREAM_SECONDS y el navegador (EventSource) se
+reconecta solo, así que una pestaña abierta no retiene un worker para
+siempre (ver LIVE_STREAM_SECONDS en settings).
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from .models import Registration
+from .rollups import day_start
+
+logger = logging.getLogger(__name__)
+
+
+def counters():
+    """Contadores del dashboard sin filtros, en una sola consulta"""
+    since = timezone.now() - timedelta(days=7)
+    return Registration.objects.aggregate(
+        total_registros=Count('id'),
+        total_medicos=Count('id', filter=Q(is_doctor=True)),
+        total_colegiados=Count('id', filter=Q(is_licensed=True)),
+        total_ayuda_voto=Count('id', filter=Q(needs_voting_help=True)),
+        total_acepto_promociones=Count('id', filter=Q(accepts_promotions=True)),
+        registros_recientes=Count('id', filter=Q(created_at__gte=since)),
+        registros_hoy=Count('id', filter=Q(created_at__gte=day_start(timezone.localdate()))),
+    )
+
+
+class Broadcaster:
+    """Reparte los eventos del hilo de consulta a las colas de los suscriptores"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.subscribers = set()
+        self.thread = None
+        self.last_id = None
+        self.latest = None
+        self.event_id = 0
+        self.dirty = False
+        self.failures = 0
+
+    def subscribe(self):
+        subscriber = queue.Queue(maxsize=settings.LIVE_QUEUE_SIZE)
+        with self.lock:
+            self.subscribers.add(subscriber)
+            if self.latest is not None:
+                subscriber.put_nowait(self.latest)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def notify(self):
+        """Llamado desde post_save: adelanta la siguiente consulta"""
+        if self.subscribers:
+            self.dirty = True
+            self.wakeup.set()
+
+    def publish(self, payload):
+        with self.lock:
+            self.event_id += 1
+            self.latest = (self.event_id, json.dumps(payload, default=str))
+            for subscriber in list(self.subscribers):
+                try:
+                    subscriber.put_nowait(self.latest)
+                except queue.Full:
+                    # Pestaña atrasada: los contadores son una foto completa,
+                    # basta con descartar el evento más antiguo
+                    try:
+                        subscriber.get_nowait()
+                    except queue.Empty:
+                        pass
+                    subscriber.put_nowait(self.latest)
+
+    def poll(self):
+        """Una consulta por ciclo, compartida por todos los suscriptores"""
+        last_id = Registration.objects.aggregate(last=Max('id'))['last'] or 0
+        if self.latest is not None and last_id == self.last_id and not self.dirty:
+            return
+        self.dirty = False
+
+        new = []
+        if self.last_id is not None:
+            new = list(
+                Registration.objects.filter(id__gt=self.last_id).order_by('-id').values(
+                    'id', 'name', 'last_name', 'created_at'
+                )[:settings.LIVE_MAX_NEW]
+            )
+        self.last_id = last_id
+        self.publish({
+            'counters': counters(),
+            'today': timezone.localdate().isoformat(),
+            'new_registrations': new,
+        })
+
+    def run(self):
+        while True:
+            # Tras un error se espera el doble en cada intento, hasta LIVE_ERROR_BACKOFF_SECONDS
+            delay = settings.LIVE_POLL_SECONDS
+            if self.failures:
+                delay = min(settings.LIVE_ERROR_BACKOFF_SECONDS, delay * 2 ** self.failures)
+            self.wakeup.wait(delay)
+            self.wakeup.clear()
+            with self.lock:
+                if not self.subscribers:
+                    self.thread = None
+                    self.latest = None
+                    return
+            close_old_connections()
+            try:
+                self.poll()
+                self.failures = 0
+            except Exception:
+                self.failures += 1
+                logger.exception('Falló la consulta de las actualizaciones en vivo (intento %d)', self.failures)
+            finally:
+                close_old_connections()
+
+
+broadcaster = Broadcaster()
+
+
+def event_stream():
+    """Generador SSE para StreamingHttpResponse"""
+    # La suscripción se hace al empezar a iterar: si el cliente se desconecta
+    # antes, no queda ninguna cola huérfana
+    subscriber = broadcaster.subscribe()
+    deadline = time.monotonic() + settings.LIVE_STREAM_SECONDS
+    try:
+        yield f'retry: {settings.LIVE_RETRY_MS}\n\n'
+        while True:
+            # Al cerrar el stream el navegador se reconecta y libera el worker mientras tanto
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                event_id, data = subscriber.get(timeout=min(settings.LIVE_KEEPALIVE_SECONDS, remaining))
+            except queue.Empty:
+                # Comentario SSE para mantener viva la conexión
+                yield ': keepalive\n\n'
+                continue
+            yield f'id: {event_id}\nevent: update\ndata: {data}\n\n'
+    finally:
+        broadcaster.unsubscribe(subscriber)
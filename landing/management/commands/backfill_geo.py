@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from landing import segments
+from landing.models import Registration
+
+
+class Command(BaseCommand):
+    help = 'Extrae código postal y municipio de la dirección de los registros existentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Registros por bloque (default: 1000)'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Procesa todos los registros, no solo los que no tienen código postal ni municipio'
+        )
+
+    def handle(self, *args, **options):
+        registrations = Registration.objects.only('id', 'postal_address', 'zip_code', 'municipality')
+        if not options['all']:
+            registrations = registrations.filter(zip_code='', municipality='')
+
+        last_id = 0
+        processed = 0
+        updated = 0
+        while True:
+            # Paginación por ID: cada bloque es una consulta indexada
+            chunk = list(registrations.filter(id__gt=last_id).order_by('id')[:options['chunk_size']])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+
+            now = timezone.now()
+            changed = []
+            for registration in chunk:
+                before = (registration.zip_code, registration.municipality)
+                registration.parse_postal_address()
+                if (registration.zip_code, registration.municipality) != before:
+                    registration.updated_at = now
+                    changed.append(registration)
+            Registration.objects.bulk_update(changed, ['zip_code', 'municipality', 'updated_at'])
+
+            processed += len(chunk)
+            updated += len(changed)
+            self.stdout.write(f'{processed} registros revisados, {updated} actualizados')
+
+        # bulk_update no dispara señales: recalcular los segmentos guardados
+        if updated:
+            segments.rebuild_all()
+
+        self.stdout.write(self.style.SUCCESS(f'Backfill completado: {updated} de {processed} registros actualizados'))
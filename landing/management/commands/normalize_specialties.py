@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from landing import segments, specialties
+
+
+class Command(BaseCommand):
+    help = 'Asigna la especialidad canónica a los registros según la tabla de alias'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing',
+            action='store_true',
+            help='Solo los registros que aún no tienen especialidad normalizada'
+        )
+
+    def handle(self, *args, **options):
+        updated, unresolved = specialties.normalize_all(only_missing=options['missing'])
+        # update() no dispara señales: recalcular los segmentos guardados
+        if updated:
+            segments.rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f'{updated} registros actualizados'))
+
+        if unresolved:
+            self.stdout.write(self.style.WARNING(
+                f'{len(unresolved)} textos sin especialidad (agregar alias en el admin):'
+            ))
+            for raw, total in unresolved[:50]:
+                self.stdout.write(f'  {total:>6}  {raw}')
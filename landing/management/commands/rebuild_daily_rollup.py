@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from landing import rollups
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el rollup diario de registros usado por el gráfico del dashboard'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Borra y recalcula todos los días (usar tras importar o borrar registros)'
+        )
+
+    def handle(self, *args, **options):
+        if options['full']:
+            days = rollups.rebuild_daily_rollup()
+        else:
+            days = rollups.update_daily_rollup()
+        self.stdout.write(self.style.SUCCESS(f'Rollup actualizado: {days} días consolidados'))
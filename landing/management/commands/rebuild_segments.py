@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from landing import segments
+
+
+class Command(BaseCommand):
+    help = 'Recalcula la membresía de los segmentos guardados (usar tras importar registros)'
+
+    def handle(self, *args, **options):
+        for name, count in segments.rebuild_all().items():
+            self.stdout.write(f'{name}: {count} miembros')
+        self.stdout.write(self.style.SUCCESS('Segmentos recalculados'))
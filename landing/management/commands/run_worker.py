@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from landing.tasks import TASKS
+
+
+class Command(BaseCommand):
+    help = 'Worker local: procesa exportaciones y demás trabajos en segundo plano'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Procesa los trabajos pendientes y termina'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.WORKER_POLL_INTERVAL,
+            help=f'Segundos entre consultas cuando no hay trabajo (default: {settings.WORKER_POLL_INTERVAL})'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Worker iniciado con {len(TASKS)} tareas')
+
+        while True:
+            close_old_connections()
+            busy = False
+            for task in TASKS:
+                try:
+                    busy = task() or busy
+                except Exception as e:
+                    self.stderr.write(f'Error en {task.__name__}: {e}')
+
+            if busy:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
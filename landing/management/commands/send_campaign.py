@@ -0,0 +1,263 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from landing import campaigns, email_templates, segments
+from landing.models import Campaign, CampaignRecipient, Segment
+from landing.transports import TRANSPORTS, SendError, get_transport
+
+
+class Command(BaseCommand):
+    help = (
+        'Envía una campaña de email con una plantilla (--preset) o reanuda una '
+        'existente (--campaign). Sustituye a los scripts send_*.py y retry_*.py'
+    )
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group()
+        target.add_argument(
+            '--preset',
+            choices=sorted(email_templates.PRESETS),
+            help='Crea una campaña nueva con esta plantilla'
+        )
+        target.add_argument(
+            '--campaign',
+            type=int,
+            help='ID de la campaña a reanudar'
+        )
+        parser.add_argument(
+            '--transport',
+            choices=sorted(TRANSPORTS),
+            help="smtp, ses o console (simulación). Por defecto el de la campaña ('smtp' en las nuevas)"
+        )
+        parser.add_argument(
+            '--segment',
+            help='Limita la audiencia a un segmento guardado (nombre o ID)'
+        )
+        parser.add_argument(
+            '--filters',
+            default='',
+            help="Filtros del dashboard como querystring, p. ej. 'is_doctor=True&municipality=Ponce'"
+        )
+        parser.add_argument(
+            '--promotions-only',
+            action='store_true',
+            help='Solo registros que aceptaron promociones (por defecto, todos los que tienen email)'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Envía como máximo N emails y deja la campaña en pausa'
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Vuelve a enviar ya a los destinatarios fallidos, descartados o en la cola de reintentos'
+        )
+        parser.add_argument(
+            '--to',
+            help='Envía un solo email de prueba a esta dirección (no crea campaña)'
+        )
+        parser.add_argument(
+            '--status',
+            action='store_true',
+            help='Muestra el estado de la campaña (o de las últimas) y termina'
+        )
+        parser.add_argument(
+            '--noinput', '--no-input',
+            action='store_false',
+            dest='interactive',
+            help='No pide confirmación'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help="Reanuda aunque la campaña figure 'en proceso' (p. ej. tras matar el proceso)"
+        )
+
+    def handle(self, *args, **options):
+        if options['status']:
+            return self.show_status(options['campaign'])
+        if options['to']:
+            return self.send_test(options)
+
+        if options['preset']:
+            campaign = self.create(options)
+            created = True
+        elif options['campaign']:
+            campaign = self.get_campaign(options)
+            created = False
+        else:
+            raise CommandError('Indica --preset para una campaña nueva o --campaign para reanudar una')
+
+        if options['retry_failed']:
+            self.stdout.write(f'{campaigns.retry_failed(campaign)} destinatarios fallidos o en reintento vuelven a la cola')
+
+        transport_name = options['transport'] or campaign.transport
+        campaigns.materialize_recipients(campaign)
+        pending = campaign.recipients.filter(status=CampaignRecipient.STATUS_PENDING).count()
+        to_send = min(pending, options['limit']) if options['limit'] is not None else pending
+
+        self.stdout.write(f'Campaña #{campaign.pk}: {campaign.subject}')
+        self.stdout.write(f'  Transporte: {transport_name}')
+        self.stdout.write(
+            f"  Audiencia: {'solo los que aceptaron promociones' if campaign.promotions_only else 'todos los registros con email'}"
+        )
+        self.stdout.write(f'  Destinatarios pendientes: {pending} (se enviarán {to_send})')
+        if not to_send:
+            self.stdout.write('No hay destinatarios pendientes.')
+            self.show_retries(campaign)
+            return
+
+        if options['interactive'] and transport_name != Campaign.TRANSPORT_CONSOLE:
+            if input(f'¿Confirmas enviar {to_send} emails? Escribe SI para continuar: ').strip().upper() != 'SI':
+                if created:
+                    campaign.delete()
+                self.stdout.write('Envío cancelado.')
+                return
+
+        processed = [0]
+        started = time.monotonic()
+
+        def progress(recipient, ok):
+            processed[0] += 1
+            mark = self.style.SUCCESS('OK') if ok else self.style.ERROR('FALLO')
+            self.stdout.write(f'[{processed[0]}/{to_send}] {mark} {recipient["address"]}')
+
+        transport = get_transport(transport_name)
+        campaign = campaigns.run_campaign(
+            campaign,
+            transport=transport,
+            limit=options['limit'],
+            progress=progress,
+        )
+        elapsed = time.monotonic() - started
+
+        self.stdout.write('')
+        self.stdout.write(
+            f'Enviados: {campaign.sent}  Fallidos: {campaign.failed}  Total: {campaign.total}  '
+            f'({processed[0] / elapsed if elapsed else 0:.1f} emails/s en esta ejecución)'
+        )
+        controller = transport.rate_controller
+        if controller is not None:
+            self.stdout.write(
+                f'Tasa conseguida: {controller.achieved_rate:.1f} emails/s  '
+                f'Tasa aprendida para {transport.provider}: {controller.rate:.1f} emails/s  '
+                f'Avisos de throttling: {controller.throttles}'
+            )
+        limits = transport.limits()
+        if limits:
+            used = controller.achieved_rate / limits['allowed_rate'] if limits['allowed_rate'] else 0
+            if limits['remaining'] is None:
+                daily = 'sin límite en 24 horas'
+            else:
+                daily = f"quedan {limits['remaining']} de {limits['max_24h']:.0f} en 24 horas"
+            self.stdout.write(
+                f"Cuota de la cuenta: {limits['allowed_rate']:.1f} emails/s permitidos "
+                f"({used:.0%} aprovechado), {limits['workers']} hilos, {daily}"
+            )
+        for number, stats in enumerate(transport.stats(), 1):
+            self.stdout.write(
+                f'  Conexión {number}: {stats["sent"]} emails, {stats["rate"]:.1f} emails/s, '
+                f'{stats["reconnects"]} reconexiones'
+            )
+        if campaign.status == Campaign.STATUS_FAILED:
+            raise CommandError(
+                f'La campaña falló: {campaign.error}. Los destinatarios sin enviar siguen pendientes; '
+                f'continúa con: python manage.py send_campaign --campaign {campaign.pk}'
+            )
+        if campaign.status == Campaign.STATUS_PAUSED:
+            if campaign.error:
+                self.stdout.write(self.style.WARNING(campaign.error))
+            self.stdout.write(self.style.WARNING(
+                f'Campaña en pausa; continúa con: python manage.py send_campaign --campaign {campaign.pk}'
+            ))
+        elif campaign.status == Campaign.STATUS_RETRYING:
+            self.show_retries(campaign)
+        else:
+            self.stdout.write(self.style.SUCCESS('Campaña completada'))
+        if campaign.failed:
+            self.stdout.write(
+                f'Reintenta los descartados con: python manage.py send_campaign --campaign {campaign.pk} --retry-failed'
+            )
+
+    def show_retries(self, campaign):
+        retrying = campaign.recipients.filter(status=CampaignRecipient.STATUS_RETRY)
+        count = retrying.count()
+        if not count:
+            return
+        next_at = timezone.localtime(retrying.order_by('next_attempt_at').first().next_attempt_at)
+        self.stdout.write(self.style.WARNING(
+            f'{count} destinatarios en la cola de reintentos (el próximo a las {next_at:%H:%M:%S}); '
+            f'los reenvía python manage.py run_worker, o envíalos ya con --retry-failed'
+        ))
+
+    def create(self, options):
+        subject, html, text = email_templates.load_preset(options['preset'])
+        filters = campaigns.parse_filters(options['filters'])
+        if options['segment']:
+            try:
+                filters['segment'] = str(segments.get_segment(options['segment']).pk)
+            except Segment.DoesNotExist:
+                raise CommandError(f'No existe el segmento {options["segment"]}')
+        # En pausa hasta confirmar, para que el worker no la tome antes
+        return campaigns.create_campaign(
+            Campaign.CHANNEL_EMAIL,
+            html,
+            subject=subject,
+            text_message=text,
+            filters=filters,
+            transport=options['transport'] or Campaign.TRANSPORT_SMTP,
+            status=Campaign.STATUS_PAUSED,
+            promotions_only=options['promotions_only'],
+        )
+
+    def get_campaign(self, options):
+        try:
+            campaign = Campaign.objects.get(pk=options['campaign'], channel=Campaign.CHANNEL_EMAIL)
+        except Campaign.DoesNotExist:
+            raise CommandError(f'No existe la campaña de email #{options["campaign"]}')
+        if campaign.status == Campaign.STATUS_RUNNING and not options['force']:
+            raise CommandError(
+                f'La campaña #{campaign.pk} está en proceso en otro worker; usa --force si ese proceso ya no existe'
+            )
+        transport = options['transport']
+        if transport and transport != campaign.transport and not options['to']:
+            # Simular sobre una campaña real marcaría sus destinatarios como enviados
+            if transport == Campaign.TRANSPORT_CONSOLE:
+                raise CommandError('Para simular crea una campaña nueva con --preset ... --transport console')
+            Campaign.objects.filter(pk=campaign.pk).update(transport=transport)
+            campaign.transport = transport
+        return campaign
+
+    def send_test(self, options):
+        if options['campaign']:
+            campaign = self.get_campaign(options)
+        elif options['preset']:
+            subject, html, text = email_templates.load_preset(options['preset'])
+            campaign = Campaign(subject=subject, message=html, text_message=text)
+        else:
+            raise CommandError('--to necesita --preset o --campaign')
+
+        campaign.subject = f'[PRUEBA] {campaign.subject}'
+        email = campaigns.build_email(campaign, 'Usuario Prueba', options['to'])
+        try:
+            with get_transport(options['transport'] or campaign.transport) as transport:
+                transport.send(email)
+        except SendError as e:
+            raise CommandError(f'No se pudo enviar la prueba: {e}')
+        self.stdout.write(self.style.SUCCESS(f'Email de prueba enviado a {options["to"]}'))
+
+    def show_status(self, campaign_id):
+        queryset = Campaign.objects.filter(channel=Campaign.CHANNEL_EMAIL)
+        if campaign_id:
+            queryset = queryset.filter(pk=campaign_id)
+        for campaign in queryset.order_by('-created_at')[:20]:
+            pending = campaign.recipients.filter(status=CampaignRecipient.STATUS_PENDING).count()
+            retrying = campaign.recipients.filter(status=CampaignRecipient.STATUS_RETRY).count()
+            self.stdout.write(
+                f'#{campaign.pk} [{campaign.get_status_display()}] {campaign.subject[:50]} — '
+                f'{campaign.sent} enviados, {campaign.failed} fallidos, {retrying} en reintento, '
+                f'{pending} pendientes de {campaign.total}'
+            )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from landing import sms_sync
+from landing.sms import TwilioAPIError
+
+
+class Command(BaseCommand):
+    help = 'Sincroniza el log de mensajes de Twilio en SmsMessage desde el último watermark'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Ignora el watermark y recorre todo el log de mensajes'
+        )
+        parser.add_argument(
+            '--max-pages',
+            type=int,
+            help='Máximo de páginas en esta ejecución; la siguiente continúa donde quedó'
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=sms_sync.PAGE_SIZE,
+            help='Mensajes por página (máximo 1000)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            pages, synced, finished = sms_sync.sync_messages(
+                page_size=options['page_size'],
+                max_pages=options['max_pages'],
+                full=options['full'],
+                log=self.stdout.write if options['verbosity'] > 1 else None,
+            )
+        except TwilioAPIError as e:
+            raise CommandError(f'Error de la API de Twilio: {e} (se reanudará desde la última página guardada)')
+
+        if finished:
+            self.stdout.write(self.style.SUCCESS(f'Sincronización completa: {synced} mensajes en {pages} páginas'))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'Sincronización parcial: {synced} mensajes en {pages} páginas; ejecuta de nuevo para continuar'
+            ))
@@ -0,0 +1,176 @@
+"""
+Perfilado de consultas SQL por petición, solo para usuarios staff.
+
+Para cada petición de un usuario staff se cuentan las consultas, el tiempo
+total en la base de datos, las consultas más lentas (con su EXPLAIN) y el
+tiempo de render de las plantillas. El resumen se envía en la cabecera
+Server-Timing (visible en las herramientas de desarrollo del navegador) y,
+en las páginas HTML, como un panel plegable al final del <body>.
+
+Para el resto de los usuarios no se instala nada: el coste es comprobar la
+cookie de sesión. Por defecto solo está activo con DEBUG (QUERY_PROFILING).
+"""
+
+import functools
+import heapq
+import itertools
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+from django.template.loader import render_to_string
+
+_local = threading.local()
+
+
+class QueryRecorder:
+    """execute_wrapper que cuenta las consultas y guarda solo las más lentas"""
+
+    def __init__(self, keep):
+        self.keep = keep
+        self.count = 0
+        self.total = 0.0
+        self.slowest = []
+        self.counter = itertools.count()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.total += duration
+            entry = (duration, next(self.counter), context['connection'].alias, sql, params, many)
+            if len(self.slowest) < self.keep:
+                heapq.heappush(self.slowest, entry)
+            elif duration > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def slowest_queries(self):
+        return [
+            {'duration': duration * 1000, 'alias': alias, 'sql': sql, 'params': params, 'many': many}
+            for duration, _, alias, sql, params, many in sorted(self.slowest, reverse=True)
+        ]
+
+
+class TemplateTimer:
+    """Tiempo de render de las plantillas de la petición (sin contar dos veces los include)"""
+
+    def __init__(self):
+        self.total = 0.0
+        self.depth = 0
+
+
+def install_template_timer():
+    """
+    Envuelve Template.render una sola vez para medir todas las plantillas,
+    tanto las de TemplateResponse como las de render() y render_to_string().
+    Solo mide en el hilo de una petición perfilada (con un TemplateTimer).
+    """
+    render = Template.render
+    if getattr(render, 'profiling', False):
+        return
+
+    @functools.wraps(render)
+    def timed_render(self, context):
+        timer = getattr(_local, 'timer', None)
+        if timer is None:
+            return render(self, context)
+        timer.depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            timer.depth -= 1
+            if not timer.depth:
+                timer.total += time.perf_counter() - start
+
+    timed_render.profiling = True
+    Template.render = timed_render
+
+
+def explain(query):
+    """Plan de ejecución de una consulta SELECT ya ejecutada"""
+    if query['many'] or not query['sql'].lstrip().upper().startswith('SELECT'):
+        return ''
+    connection = connections[query['alias']]
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + query['sql'], query['params'])
+            return '\n'.join(' | '.join(str(value) for value in row) for row in cursor.fetchall())
+    except Exception as e:
+        return f'(EXPLAIN no disponible: {e})'
+
+
+class QueryProfilingMiddleware:
+    """Mide consultas y render de plantillas en las peticiones de staff"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def should_profile(self, request):
+        if not getattr(settings, 'QUERY_PROFILING', False):
+            return False
+        # Sin cookie de sesión no hay usuario staff: no tocar request.user
+        if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+            return False
+        return request.user.is_staff
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        install_template_timer()
+        recorder = QueryRecorder(keep=settings.QUERY_PROFILING_SLOWEST)
+        timer = _local.timer = TemplateTimer()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                response = self.get_response(request)
+        finally:
+            _local.timer = None
+        total = (time.perf_counter() - start) * 1000
+
+        template_time = timer.total * 1000
+        response['Server-Timing'] = ', '.join([
+            f'sql;dur={recorder.total * 1000:.1f};desc="{recorder.count} consultas"',
+            f'tpl;dur={template_time:.1f};desc="Plantillas"',
+            f'total;dur={total:.1f}',
+        ])
+
+        if self.accepts_panel(response):
+            self.inject_panel(request, response, recorder, template_time, total)
+        return response
+
+    def accepts_panel(self, response):
+        return (
+            not response.streaming
+            and response.status_code == 200
+            and response.get('Content-Type', '').startswith('text/html')
+            and b'</body>' in response.content
+        )
+
+    def inject_panel(self, request, response, recorder, template_time, total):
+        queries = recorder.slowest_queries()
+        for query in queries[:settings.QUERY_PROFILING_EXPLAIN]:
+            query['explain'] = explain(query)
+
+        panel = render_to_string('landing/profiling_panel.html', {
+            'path': request.path,
+            'query_count': recorder.count,
+            'sql_time': recorder.total * 1000,
+            'template_time': template_time,
+            'total_time': total,
+            'queries': queries,
+        })
+        content = response.content.replace(b'</body>', panel.encode(response.charset) + b'</body>', 1)
+        response.content = content
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = str(len(content))
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.23 on 2026-10-19 13:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0007_alter_registration_needs_voting_help'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRegistrationCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Fecha')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Registros')),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Conteo Diario de Registros',
+                'verbose_name_plural': 'Conteos Diarios de Registros',
+                'ordering': ['date'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='registration',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
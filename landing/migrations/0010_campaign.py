@@ -0,0 +1,41 @@
+# Generated by Django 4.2.23 on 2026-10-19 13:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('landing', '0009_exportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Campaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('email', 'Email'), ('sms', 'SMS')], max_length=10)),
+                ('subject', models.CharField(blank=True, max_length=255, verbose_name='Asunto')),
+                ('message', models.TextField(verbose_name='Mensaje')),
+                ('filters', models.JSONField(blank=True, default=dict, help_text='Parámetros de RegistrationFilter que definen la audiencia')),
+                ('recipient_ids', models.JSONField(blank=True, help_text='Selección explícita de registros; si está vacío se usan los filtros', null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En proceso'), ('done', 'Completado'), ('failed', 'Fallido')], default='pending', max_length=10)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('sent', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Campaña',
+                'verbose_name_plural': 'Campañas',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.23 on 2026-10-19 13:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0010_campaign'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CampaignRecipient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address', models.CharField(max_length=254, verbose_name='Email o teléfono')),
+                ('status', models.CharField(choices=[('sent', 'Enviado'), ('failed', 'Fallido')], max_length=10)),
+                ('error', models.TextField(blank=True)),
+                ('processed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipients', to='landing.campaign')),
+                ('registration', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='campaign_deliveries', to='landing.registration')),
+            ],
+            options={
+                'verbose_name': 'Destinatario de Campaña',
+                'verbose_name_plural': 'Destinatarios de Campaña',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['campaign', 'status'], name='landing_cam_campaig_f22935_idx')],
+            },
+        ),
+    ]
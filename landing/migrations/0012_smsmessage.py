@@ -0,0 +1,35 @@
+# Generated by Django 4.2.23 on 2026-10-19 13:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0011_campaignrecipient'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SmsMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sid', models.CharField(max_length=34, unique=True, verbose_name='SID de Twilio')),
+                ('to', models.CharField(max_length=20)),
+                ('from_number', models.CharField(blank=True, max_length=20)),
+                ('status', models.CharField(default='queued', max_length=20)),
+                ('error_code', models.IntegerField(blank=True, null=True)),
+                ('error_message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('campaign', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sms_messages', to='landing.campaign')),
+                ('registration', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sms_messages', to='landing.registration')),
+            ],
+            options={
+                'verbose_name': 'Mensaje SMS',
+                'verbose_name_plural': 'Mensajes SMS',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.23 on 2026-10-19 13:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0012_smsmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('watermark', models.DateTimeField(blank=True, null=True)),
+                ('run_watermark', models.DateTimeField(blank=True, null=True)),
+                ('next_page_uri', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Cursor de sincronización',
+                'verbose_name_plural': 'Cursores de sincronización',
+            },
+        ),
+        migrations.AddField(
+            model_name='smsmessage',
+            name='date_sent',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Enviado (Twilio)'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.23 on 2026-10-19 13:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('landing', '0013_twilio_message_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Segment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Nombre')),
+                ('filters', models.JSONField(blank=True, default=dict, help_text='Parámetros de RegistrationFilter que definen el segmento')),
+                ('member_count', models.PositiveIntegerField(default=0, verbose_name='Miembros')),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True, verbose_name='Recalculado')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Segmento',
+                'verbose_name_plural': 'Segmentos',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SegmentMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('registration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segment_memberships', to='landing.registration')),
+                ('segment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='landing.segment')),
+            ],
+            options={
+                'verbose_name': 'Miembro de segmento',
+                'verbose_name_plural': 'Miembros de segmento',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='segmentmembership',
+            constraint=models.UniqueConstraint(fields=('segment', 'registration'), name='unique_segment_membership'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.23 on 2026-10-19 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0014_segment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registration',
+            name='municipality',
+            field=models.CharField(blank=True, db_index=True, max_length=50, verbose_name='Municipio'),
+        ),
+        migrations.AddField(
+            model_name='registration',
+            name='zip_code',
+            field=models.CharField(blank=True, db_index=True, max_length=5, verbose_name='Código Postal'),
+        ),
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Versión de datos',
+                'verbose_name_plural': 'Versiones de datos',
+            },
+        ),
+        migrations.AlterField(
+            model_name='exportjob',
+            name='data_version',
+            field=models.PositiveBigIntegerField(blank=True, help_text='Versión de los datos de registros (DataVersion) al crear el trabajo', null=True),
+        ),
+    ]
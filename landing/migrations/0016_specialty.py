@@ -0,0 +1,44 @@
+# Generated by Django 4.2.23 on 2026-10-19 13:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0015_registration_geo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Specialty',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Nombre')),
+            ],
+            options={
+                'verbose_name': 'Especialidad',
+                'verbose_name_plural': 'Especialidades',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SpecialtyAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=200, unique=True, verbose_name='Texto normalizado')),
+                ('specialty', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='landing.specialty')),
+            ],
+            options={
+                'verbose_name': 'Alias de especialidad',
+                'verbose_name_plural': 'Alias de especialidades',
+                'ordering': ['key'],
+            },
+        ),
+        migrations.AddField(
+            model_name='registration',
+            name='canonical_specialty',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='registrations', to='landing.specialty', verbose_name='Especialidad normalizada'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+import re
+import unicodedata
+
+from django.db import migrations
+
+# Especialidad canónica -> formas en que suele escribirse
+SPECIALTIES = {
+    'Medicina General': ['medicina general', 'medicina primaria', 'medico general', 'generalista',
+                         'general practice', 'general medicine', 'primary care', 'medicina primaria general'],
+    'Medicina de Familia': ['medicina de familia', 'medicina familiar', 'medico de familia', 'family medicine'],
+    'Medicina Interna': ['medicina interna', 'internista', 'internal medicine'],
+    'Pediatría': ['pediatria', 'pediatra', 'pediatrics'],
+    'Ginecología y Obstetricia': ['ginecologia y obstetricia', 'ginecologia', 'obstetricia', 'ginecologo',
+                                  'obstetra', 'ob gyn', 'obgyn', 'obstetrics and gynecology'],
+    'Cardiología': ['cardiologia', 'cardiologo', 'cardiology'],
+    'Cirugía General': ['cirugia general', 'cirugia', 'cirujano', 'cirujano general', 'general surgery'],
+    'Psiquiatría': ['psiquiatria', 'psiquiatra', 'psychiatry'],
+    'Dermatología': ['dermatologia', 'dermatologo', 'dermatology'],
+    'Oftalmología': ['oftalmologia', 'oftalmologo', 'ophthalmology'],
+    'Ortopedia': ['ortopedia', 'ortopeda', 'cirugia ortopedica', 'orthopedics'],
+    'Anestesiología': ['anestesiologia', 'anestesiologo', 'anestesia', 'anesthesiology'],
+    'Radiología': ['radiologia', 'radiologo', 'radiology'],
+    'Neurología': ['neurologia', 'neurologo', 'neurology'],
+    'Gastroenterología': ['gastroenterologia', 'gastroenterologo', 'gastroenterology'],
+    'Endocrinología': ['endocrinologia', 'endocrinologo', 'endocrinology'],
+    'Nefrología': ['nefrologia', 'nefrologo', 'nephrology'],
+    'Neumología': ['neumologia', 'neumologo', 'pulmonologia', 'pulmonology'],
+    'Oncología': ['oncologia', 'oncologo', 'hematologia oncologia', 'oncology'],
+    'Hematología': ['hematologia', 'hematologo', 'hematology'],
+    'Urología': ['urologia', 'urologo', 'urology'],
+    'Otorrinolaringología': ['otorrinolaringologia', 'otorrino', 'otorrinolaringologo', 'ent'],
+    'Medicina de Emergencia': ['medicina de emergencia', 'emergencias', 'emergenciologo', 'emergency medicine'],
+    'Geriatría': ['geriatria', 'geriatra', 'geriatrics'],
+    'Infectología': ['infectologia', 'infectologo', 'enfermedades infecciosas', 'infectious diseases'],
+    'Reumatología': ['reumatologia', 'reumatologo', 'rheumatology'],
+    'Patología': ['patologia', 'patologo', 'pathology'],
+    'Fisiatría': ['fisiatria', 'fisiatra', 'medicina fisica y rehabilitacion', 'physical medicine'],
+    'Neurocirugía': ['neurocirugia', 'neurocirujano', 'neurosurgery'],
+    'Cirugía Plástica': ['cirugia plastica', 'cirujano plastico', 'plastic surgery'],
+}
+
+
+def specialty_key(raw):
+    # Copia de specialties.specialty_key: las migraciones no importan código de la app
+    decomposed = unicodedata.normalize('NFKD', raw or '')
+    text = ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+    text = re.sub(r'[^a-z0-9]+', ' ', text)
+    return ' '.join(text.split())
+
+
+def seed(apps, schema_editor):
+    Specialty = apps.get_model('landing', 'Specialty')
+    SpecialtyAlias = apps.get_model('landing', 'SpecialtyAlias')
+    for name, aliases in SPECIALTIES.items():
+        specialty, _ = Specialty.objects.get_or_create(name=name)
+        for alias in {specialty_key(name), *aliases}:
+            SpecialtyAlias.objects.get_or_create(key=specialty_key(alias), defaults={'specialty': specialty})
+
+
+def unseed(apps, schema_editor):
+    apps.get_model('landing', 'Specialty').objects.filter(name__in=SPECIALTIES).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0016_specialty'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed, unseed),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.23 on 2026-10-19 13:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0017_seed_specialties'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='promotions_only',
+            field=models.BooleanField(default=True, help_text='Limita la audiencia a los registros que aceptaron recibir promociones', verbose_name='Solo aceptan promociones'),
+        ),
+        migrations.AddField(
+            model_name='campaign',
+            name='text_message',
+            field=models.TextField(blank=True, help_text='Alternativa de texto del email; si está vacío se genera a partir del HTML', verbose_name='Mensaje en texto plano'),
+        ),
+        migrations.AddField(
+            model_name='campaign',
+            name='transport',
+            field=models.CharField(choices=[('smtp', 'SMTP'), ('ses', 'Amazon SES'), ('console', 'Consola (simulación)')], default='smtp', help_text='Solo para email: cómo se entregan los mensajes', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='campaignrecipient',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Intentos'),
+        ),
+        migrations.AddField(
+            model_name='campaignrecipient',
+            name='name',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Nombre completo'),
+        ),
+        migrations.AlterField(
+            model_name='campaign',
+            name='message',
+            field=models.TextField(help_text='Email: HTML con {{ nombre_completo }} y {{ email_destinatario }} por destinatario', verbose_name='Mensaje'),
+        ),
+        migrations.AlterField(
+            model_name='campaign',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En proceso'), ('paused', 'En pausa'), ('done', 'Completado'), ('failed', 'Fallido')], default='pending', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='campaignrecipient',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, null=True),
+        ),
+        migrations.AlterField(
+            model_name='campaignrecipient',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pendiente'), ('sent', 'Enviado'), ('failed', 'Fallido')], max_length=10),
+        ),
+        migrations.CreateModel(
+            name='SendAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveSmallIntegerField(verbose_name='Intento')),
+                ('transport', models.CharField(max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('sent', 'Enviado'), ('failed', 'Fallido')], max_length=10)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='send_attempts', to='landing.campaignrecipient')),
+            ],
+            options={
+                'verbose_name': 'Intento de envío',
+                'verbose_name_plural': 'Intentos de envío',
+                'ordering': ['id'],
+            },
+        ),
+    ]
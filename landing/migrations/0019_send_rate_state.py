@@ -0,0 +1,28 @@
+# Generated by Django 4.2.23 on 2026-10-19 13:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0018_campaign_engine'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SendRateState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=100, unique=True, verbose_name='Proveedor')),
+                ('rate', models.FloatField(verbose_name='Tasa aprendida (emails/s)')),
+                ('achieved_rate', models.FloatField(default=0, verbose_name='Tasa conseguida (emails/s)')),
+                ('throttles', models.PositiveIntegerField(default=0, verbose_name='Avisos de throttling')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Tasa de envío',
+                'verbose_name_plural': 'Tasas de envío',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-19 13:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0019_send_rate_state'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='campaign',
+            name='transport',
+            field=models.CharField(choices=[('smtp', 'SMTP'), ('ses', 'Amazon SES'), ('ses_bulk', 'Amazon SES (plantilla, envío masivo)'), ('console', 'Consola (simulación)')], default='smtp', help_text='Solo para email: cómo se entregan los mensajes', max_length=10),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.23 on 2026-10-19 13:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0020_ses_bulk_transport'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='campaignrecipient',
+            name='landing_cam_campaig_f22935_idx',
+        ),
+        migrations.AddIndex(
+            model_name='campaignrecipient',
+            index=models.Index(fields=['campaign', 'status', 'id'], name='landing_cam_campaig_17ccdd_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.23 on 2026-10-19 13:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landing', '0021_recipient_state_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaignrecipient',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Próximo intento'),
+        ),
+        migrations.AlterField(
+            model_name='campaign',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En proceso'), ('paused', 'En pausa'), ('retrying', 'Reintentos programados'), ('done', 'Completado'), ('failed', 'Fallido')], default='pending', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='campaignrecipient',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pendiente'), ('sent', 'Enviado'), ('failed', 'Fallido'), ('retry', 'Reintento programado'), ('dead', 'Descartado')], max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='sendattempt',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pendiente'), ('sent', 'Enviado'), ('failed', 'Fallido'), ('retry', 'Reintento programado'), ('dead', 'Descartado')], max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='campaignrecipient',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='landing_cam_status_c335ec_idx'),
+        ),
+    ]
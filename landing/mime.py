@@ -0,0 +1,140 @@
+"""
+Mensajes MIME pre-codificados para los envíos masivos.
+
+En una campaña todos los emails son iguales salvo la cabecera To, Date y
+Message-ID y los marcadores del destinatario ({{ nombre_completo }},
+{{ email_destinatario }}). MessageSkeleton codifica una vez las cabeceras
+comunes y los trozos fijos de las dos partes (texto y HTML) en
+quoted-printable; cada mensaje se arma codificando solo los valores del
+destinatario y uniendo los bytes, sin construir el árbol MIME con
+EmailMultiAlternatives ni volver a codificar el HTML.
+
+Para poder empalmar trozos codificados por separado, cada trozo que no
+termina en salto de línea acaba en un salto blando de quoted-printable
+("=\\r\\n"), que desaparece al decodificar; así ninguna línea pasa de 76
+caracteres.
+"""
+
+import binascii
+import uuid
+from email.utils import formatdate, make_msgid
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.mail.message import forbid_multi_line_headers
+from django.core.mail.utils import DNS_NAME
+
+from .email_templates import compile_template
+
+CRLF = b'\r\n'
+
+
+class BulkMessage:
+    """
+    Un email ya serializado, listo para el transporte. Expone lo que usan
+    los transportes de un EmailMessage de Django (from_email, to, subject,
+    recipients()) y los bytes en `data`.
+    """
+
+    __slots__ = ('from_email', 'to', 'subject', 'data')
+
+    def __init__(self, from_email, to, subject, data):
+        self.from_email = from_email
+        self.to = to
+        self.subject = subject
+        self.data = data
+
+    def recipients(self):
+        return self.to
+
+
+def encode_header(name, value):
+    """Cabecera `Nombre: valor` codificada (RFC 2047) y plegada con CRLF"""
+    name, value = forbid_multi_line_headers(name, value, 'utf-8')
+    return f'{name}: {value}'.replace('\r\n', '\n').replace('\n', '\r\n').encode('ascii') + CRLF
+
+
+def encode_qp(text):
+    """`text` en quoted-printable con CRLF, terminado en salto duro o blando"""
+    if not text:
+        return b''
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    data = binascii.b2a_qp(text.encode('utf-8'), istext=True).replace(b'\n', CRLF)
+    if not data.endswith(CRLF):
+        data += b'=' + CRLF
+    return data
+
+
+class MessageSkeleton:
+    """
+    Mensaje multipart/alternative de una campaña con todo lo común ya
+    codificado.
+
+    `parts` es la lista de bytes del mensaje completo con huecos para las
+    cabeceras del destinatario y los marcadores de las plantillas; `slots`
+    dice qué posición ocupa cada hueco. build() rellena los huecos de una
+    copia y la une.
+    """
+
+    def __init__(self, subject, from_email, html, text):
+        self.subject = subject
+        self.from_email = from_email
+        # '=_' no puede aparecer en quoted-printable: el separador nunca choca con el contenido
+        boundary = f'=_{uuid.uuid4().hex}'.encode('ascii')
+
+        self.parts = [
+            b'Content-Type: multipart/alternative; boundary="' + boundary + b'"' + CRLF
+            + b'MIME-Version: 1.0' + CRLF
+            + encode_header('Subject', subject)
+            + encode_header('From', from_email)
+        ]
+        self.slots = []
+        # Los huecos de las cabeceras llevan ':' para no chocar con ningún marcador {{ nombre }}
+        self._slot(':to')
+        self._slot(':date')
+        self._slot(':message-id')
+        self.parts.append(CRLF)
+
+        for content_type, source in (('plain', text), ('html', html)):
+            self.parts.append(
+                b'--' + boundary + CRLF
+                + f'Content-Type: text/{content_type}; charset="utf-8"'.encode('ascii') + CRLF
+                + b'MIME-Version: 1.0' + CRLF
+                + b'Content-Transfer-Encoding: quoted-printable' + CRLF
+                + CRLF
+            )
+            template = compile_template(source)
+            slots = dict(template.slots)
+            for index, part in enumerate(template.parts):
+                if index in slots:
+                    self._slot(slots[index], default=encode_qp(part))
+                else:
+                    self.parts.append(encode_qp(part))
+            self.parts.append(CRLF)
+        self.parts.append(b'--' + boundary + b'--' + CRLF)
+
+    def _slot(self, name, default=b''):
+        self.slots.append((len(self.parts), name))
+        self.parts.append(default)
+
+    def build(self, address, context):
+        """BulkMessage para `address` con los marcadores rellenados con `context`"""
+        values = {
+            ':to': encode_header('To', address),
+            ':date': b'Date: ' + formatdate(localtime=settings.EMAIL_USE_LOCALTIME).encode('ascii') + CRLF,
+            ':message-id': b'Message-ID: ' + make_msgid(domain=DNS_NAME).encode('ascii') + CRLF,
+        }
+        parts = self.parts.copy()
+        for index, name in self.slots:
+            value = values.get(name)
+            if value is None and name in context:
+                value = values[name] = encode_qp(str(context[name]))
+            if value is not None:
+                parts[index] = value
+        return BulkMessage(self.from_email, [address], self.subject, b''.join(parts))
+
+
+@lru_cache(maxsize=8)
+def message_skeleton(subject, from_email, html, text):
+    """MessageSkeleton en caché: cada campaña se codifica una sola vez"""
+    return MessageSkeleton(subject, from_email, html, text)
@@ -1,6 +1,9 @@
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.db import models
 from django.utils import timezone
 import uuid
+from . import geo
 
 class Registration(models.Model):
     """Modelo para registros de simpatizantes del Dr. Méndez Sexto"""
@@ -11,6 +14,10 @@ class Registration(models.Model):
     postal_address = models.TextField(verbose_name="Dirección Postal")
     phone_number = models.CharField(max_length=20, verbose_name="Número Telefónico")
     
+    # Extraídos de postal_address al guardar (ver geo.py)
+    zip_code = models.CharField(max_length=5, blank=True, db_index=True, verbose_name="Código Postal")
+    municipality = models.CharField(max_length=50, blank=True, db_index=True, verbose_name="Municipio")
+    
     # Información profesional
     service_location = models.TextField(
         verbose_name="¿Dónde provee servicios?",
@@ -55,9 +62,17 @@ class Registration(models.Model):
     
     # Campos del sistema
     unique_id = models.CharField(max_length=6, unique=True, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     specialty = models.CharField(max_length=200, blank=True, null=True, verbose_name="Especialidad")
+    canonical_specialty = models.ForeignKey(
+        'Specialty',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='registrations',
+        verbose_name="Especialidad normalizada"
+    )
     
     # Email opcional para enviar confirmaciones
     email = models.EmailField(
@@ -83,9 +98,21 @@ class Registration(models.Model):
             if not Registration.objects.filter(unique_id=unique_id).exists():
                 return unique_id
     
+    def parse_postal_address(self):
+        """Actualiza zip_code y municipality a partir de la dirección"""
+        self.zip_code, self.municipality = geo.parse_address(self.postal_address)
+    
     def save(self, *args, **kwargs):
         if not self.unique_id:
             self.unique_id = self.generate_unique_id()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'postal_address' in update_fields:
+            self.parse_postal_address()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'zip_code', 'municipality'}
+        if update_fields is not None and 'specialty' in update_fields:
+            # canonical_specialty se asigna en la señal pre_save (signals.py)
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'canonical_specialty'}
         super().save(*args, **kwargs)
 
 class PlanEstrategico(models.Model):
@@ -101,4 +128,432 @@ class PlanEstrategico(models.Model):
         verbose_name_plural = 'Planes Estratégicos'
     
     def __str__(self):
-        return self.titulo
\ No newline at end of file
+        return self.titulo
+
+
+class DailyRegistrationCount(models.Model):
+    """Rollup de registros por día (hora de Puerto Rico) para el gráfico del dashboard"""
+    date = models.DateField(unique=True, verbose_name="Fecha")
+    count = models.PositiveIntegerField(default=0, verbose_name="Registros")
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['date']
+        verbose_name = 'Conteo Diario de Registros'
+        verbose_name_plural = 'Conteos Diarios de Registros'
+
+    def __str__(self):
+        return f"{self.date}: {self.count}"
+
+
+def private_storage():
+    """Almacenamiento de archivos con datos personales (PRIVATE_MEDIA_ROOT, no público)"""
+    return FileSystemStorage(location=settings.PRIVATE_MEDIA_ROOT)
+
+
+class ExportJob(models.Model):
+    """Exportación CSV procesada en segundo plano por el worker local"""
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_RUNNING, 'En proceso'),
+        (STATUS_DONE, 'Completado'),
+        (STATUS_FAILED, 'Fallido'),
+    ]
+
+    filter_hash = models.CharField(max_length=64, verbose_name="Hash del filtro")
+    params = models.JSONField(default=dict, blank=True, verbose_name="Parámetros del filtro")
+    data_version = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Versión de los datos de registros (DataVersion) al crear el trabajo"
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    rows_total = models.PositiveIntegerField(default=0)
+    rows_done = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to='exports/', storage=private_storage, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Último avance del worker; sin avances el trabajo se da por abandonado"
+    )
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['filter_hash', 'data_version'])]
+        verbose_name = 'Exportación'
+        verbose_name_plural = 'Exportaciones'
+
+    def __str__(self):
+        return f"Exportación #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def progress(self):
+        """Porcentaje completado (0-100)"""
+        if self.status == self.STATUS_DONE:
+            return 100
+        if not self.rows_total:
+            return 0
+        return min(99, int(self.rows_done * 100 / self.rows_total))
+
+
+class Campaign(models.Model):
+    """Envío masivo (email o SMS) desde el dashboard, procesado por el worker local"""
+
+    CHANNEL_EMAIL = 'email'
+    CHANNEL_SMS = 'sms'
+    CHANNEL_CHOICES = [
+        (CHANNEL_EMAIL, 'Email'),
+        (CHANNEL_SMS, 'SMS'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_PAUSED = 'paused'
+    STATUS_RETRYING = 'retrying'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_RUNNING, 'En proceso'),
+        (STATUS_PAUSED, 'En pausa'),
+        (STATUS_RETRYING, 'Reintentos programados'),
+        (STATUS_DONE, 'Completado'),
+        (STATUS_FAILED, 'Fallido'),
+    ]
+
+    TRANSPORT_SMTP = 'smtp'
+    TRANSPORT_SES = 'ses'
+    TRANSPORT_SES_BULK = 'ses_bulk'
+    TRANSPORT_CONSOLE = 'console'
+    TRANSPORT_CHOICES = [
+        (TRANSPORT_SMTP, 'SMTP'),
+        (TRANSPORT_SES, 'Amazon SES'),
+        (TRANSPORT_SES_BULK, 'Amazon SES (plantilla, envío masivo)'),
+        (TRANSPORT_CONSOLE, 'Consola (simulación)'),
+    ]
+
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    transport = models.CharField(
+        max_length=10,
+        choices=TRANSPORT_CHOICES,
+        default=TRANSPORT_SMTP,
+        help_text="Solo para email: cómo se entregan los mensajes"
+    )
+    subject = models.CharField(max_length=255, blank=True, verbose_name="Asunto")
+    message = models.TextField(
+        verbose_name="Mensaje",
+        help_text="Email: HTML con {{ nombre_completo }} y {{ email_destinatario }} por destinatario"
+    )
+    text_message = models.TextField(
+        blank=True,
+        verbose_name="Mensaje en texto plano",
+        help_text="Alternativa de texto del email; si está vacío se genera a partir del HTML"
+    )
+    filters = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Parámetros de RegistrationFilter que definen la audiencia"
+    )
+    recipient_ids = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Selección explícita de registros; si está vacío se usan los filtros"
+    )
+    promotions_only = models.BooleanField(
+        default=True,
+        verbose_name="Solo aceptan promociones",
+        help_text="Limita la audiencia a los registros que aceptaron recibir promociones"
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    total = models.PositiveIntegerField(default=0)
+    sent = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Campaña'
+        verbose_name_plural = 'Campañas'
+
+    def __str__(self):
+        return f"{self.get_channel_display()} #{self.pk} ({self.get_status_display()})"
+
+
+class CampaignRecipient(models.Model):
+    """
+    Destinatario de una campaña y su estado de envío.
+
+    Las campañas de email guardan toda la audiencia como pendiente al
+    empezar; el envío avanza por los pendientes, así que una campaña
+    interrumpida se reanuda exactamente donde se quedó. Un email que falla
+    queda en reintento hasta `next_attempt_at` (el worker lo vuelve a poner
+    pendiente) o, si el fallo es permanente o se agotaron los reintentos,
+    descartado.
+    """
+
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_RETRY = 'retry'
+    STATUS_DEAD = 'dead'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_SENT, 'Enviado'),
+        (STATUS_FAILED, 'Fallido'),
+        (STATUS_RETRY, 'Reintento programado'),
+        (STATUS_DEAD, 'Descartado'),
+    ]
+
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='recipients')
+    registration = models.ForeignKey(
+        Registration,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='campaign_deliveries'
+    )
+    address = models.CharField(max_length=254, verbose_name="Email o teléfono")
+    name = models.CharField(max_length=255, blank=True, verbose_name="Nombre completo")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Intentos")
+    error = models.TextField(blank=True)
+    processed_at = models.DateTimeField(default=timezone.now, null=True, blank=True)
+    next_attempt_at = models.DateTimeField(null=True, blank=True, verbose_name="Próximo intento")
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # Reanudar y reintentar recorren los pendientes/fallidos de una campaña por id
+            models.Index(fields=['campaign', 'status', 'id']),
+            # El worker busca los reintentos vencidos de todas las campañas
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+        verbose_name = 'Destinatario de Campaña'
+        verbose_name_plural = 'Destinatarios de Campaña'
+
+    def __str__(self):
+        return f"{self.address} ({self.get_status_display()})"
+
+
+class SendAttempt(models.Model):
+    """Un intento de entrega de un email de campaña"""
+
+    recipient = models.ForeignKey(CampaignRecipient, on_delete=models.CASCADE, related_name='send_attempts')
+    number = models.PositiveSmallIntegerField(verbose_name="Intento")
+    transport = models.CharField(max_length=10)
+    status = models.CharField(max_length=10, choices=CampaignRecipient.STATUS_CHOICES)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Intento de envío'
+        verbose_name_plural = 'Intentos de envío'
+
+    def __str__(self):
+        return f"{self.recipient.address} #{self.number} ({self.status})"
+
+
+class SendRateState(models.Model):
+    """
+    Tasa de envío aprendida para un proveedor de email (p. ej.
+    'smtp:smtp.gmail.com' o 'ses:us-east-1'); el siguiente envío empieza
+    por ella en lugar de volver a tantear desde la tasa inicial.
+    """
+
+    provider = models.CharField(max_length=100, unique=True, verbose_name="Proveedor")
+    rate = models.FloatField(verbose_name="Tasa aprendida (emails/s)")
+    achieved_rate = models.FloatField(default=0, verbose_name="Tasa conseguida (emails/s)")
+    throttles = models.PositiveIntegerField(default=0, verbose_name="Avisos de throttling")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Tasa de envío'
+        verbose_name_plural = 'Tasas de envío'
+
+    def __str__(self):
+        return f"{self.provider}: {self.rate:.1f} emails/s"
+
+
+class SmsMessage(models.Model):
+    """Mensaje SMS aceptado por Twilio, identificado por su SID"""
+
+    sid = models.CharField(max_length=34, unique=True, verbose_name="SID de Twilio")
+    campaign = models.ForeignKey(
+        Campaign,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='sms_messages'
+    )
+    registration = models.ForeignKey(
+        Registration,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='sms_messages'
+    )
+    to = models.CharField(max_length=20)
+    from_number = models.CharField(max_length=20, blank=True)
+    status = models.CharField(max_length=20, default='queued')
+    error_code = models.IntegerField(null=True, blank=True)
+    error_message = models.TextField(blank=True)
+    date_sent = models.DateTimeField(null=True, blank=True, db_index=True, verbose_name="Enviado (Twilio)")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Mensaje SMS'
+        verbose_name_plural = 'Mensajes SMS'
+
+    def __str__(self):
+        return f"{self.sid} → {self.to} ({self.status})"
+
+
+class SyncCursor(models.Model):
+    """
+    Posición de una sincronización incremental con una API externa.
+
+    `watermark` es el punto hasta donde se sincronizó por completo; mientras
+    una sincronización está en curso, `next_page_uri` guarda la siguiente
+    página a pedir y `run_watermark` el valor que tomará el watermark al
+    terminar, para poder reanudar después de una interrupción.
+    """
+
+    name = models.CharField(max_length=50, unique=True)
+    watermark = models.DateTimeField(null=True, blank=True)
+    run_watermark = models.DateTimeField(null=True, blank=True)
+    next_page_uri = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Cursor de sincronización'
+        verbose_name_plural = 'Cursores de sincronización'
+
+    def __str__(self):
+        return f"{self.name} ({self.watermark or 'sin sincronizar'})"
+
+
+class DataVersion(models.Model):
+    """
+    Contador de versión de un conjunto de datos (p. ej. 'registrations'),
+    usado en las claves de caché de los agregados (caching.py).
+    """
+
+    name = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Versión de datos'
+        verbose_name_plural = 'Versiones de datos'
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class Segment(models.Model):
+    """
+    Audiencia guardada: un conjunto de filtros de RegistrationFilter con su
+    membresía materializada en SegmentMembership.
+    """
+
+    name = models.CharField(max_length=100, unique=True, verbose_name="Nombre")
+    filters = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Parámetros de RegistrationFilter que definen el segmento"
+    )
+    member_count = models.PositiveIntegerField(default=0, verbose_name="Miembros")
+    refreshed_at = models.DateTimeField(null=True, blank=True, verbose_name="Recalculado")
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Segmento'
+        verbose_name_plural = 'Segmentos'
+
+    def __str__(self):
+        return f"{self.name} ({self.member_count})"
+
+
+class SegmentMembership(models.Model):
+    """Registro que pertenece a un segmento"""
+
+    segment = models.ForeignKey(Segment, on_delete=models.CASCADE, related_name='memberships')
+    registration = models.ForeignKey(
+        Registration,
+        on_delete=models.CASCADE,
+        related_name='segment_memberships'
+    )
+
+    class Meta:
+        verbose_name = 'Miembro de segmento'
+        verbose_name_plural = 'Miembros de segmento'
+        constraints = [
+            models.UniqueConstraint(fields=['segment', 'registration'], name='unique_segment_membership'),
+        ]
+
+
+class Specialty(models.Model):
+    """Especialidad médica canónica"""
+
+    name = models.CharField(max_length=100, unique=True, verbose_name="Nombre")
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Especialidad'
+        verbose_name_plural = 'Especialidades'
+
+    def __str__(self):
+        return self.name
+
+
+class SpecialtyAlias(models.Model):
+    """
+    Forma en que se escribe una especialidad en el formulario o en los
+    imports. `key` es el texto normalizado (minúsculas, sin acentos ni
+    signos) que se compara; ver specialties.specialty_key().
+    """
+
+    key = models.CharField(max_length=200, unique=True, verbose_name="Texto normalizado")
+    specialty = models.ForeignKey(Specialty, on_delete=models.CASCADE, related_name='aliases')
+
+    class Meta:
+        ordering = ['key']
+        verbose_name = 'Alias de especialidad'
+        verbose_name_plural = 'Alias de especialidades'
+
+    def __str__(self):
+        return f"{self.key} → {self.specialty}"
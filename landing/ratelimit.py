@@ -0,0 +1,130 @@
+"""
+Control de tasa para envíos masivos.
+"""
+
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket compartido entre hilos.
+
+    Se rellena a `rate` tokens por segundo hasta `capacity`. acquire() bloquea
+    hasta que haya un token disponible, de modo que varios hilos enviando a la
+    vez nunca superan la tasa configurada. Con la capacidad por defecto (1)
+    los envíos salen espaciados de forma uniforme, sin ráfagas.
+
+    Se pueden pedir más tokens que la capacidad (p. ej. un SMS de varios
+    segmentos): se conceden en cuanto el bucket está lleno y la deuda se
+    descuenta de las siguientes peticiones.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens=1):
+        """Espera hasta consumir `tokens`; devuelve los segundos esperados"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                needed = min(tokens, self.capacity)
+                if self.tokens >= needed:
+                    self.tokens -= tokens
+                    return waited
+                delay = (needed - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def set_rate(self, rate):
+        """Cambia la tasa; los tokens acumulados hasta ahora se conservan"""
+        with self.lock:
+            self._refill()
+            self.rate = float(rate)
+
+
+class AimdRateController:
+    """
+    Tasa de envío adaptativa (AIMD: aumento aditivo, reducción multiplicativa).
+
+    Mientras los envíos salen bien la tasa sube unos `increase` mensajes/s
+    por cada segundo de envío; cuando el proveedor limita (throttling) se
+    multiplica por `decrease`. Tras una reducción se ignoran los demás avisos
+    durante `cooldown` segundos: son mensajes que ya estaban en vuelo con la
+    tasa anterior y no deben volver a recortarla. La tasa queda siempre
+    entre `min_rate` y `max_rate`.
+
+    acquire() reparte los envíos con un TokenBucket compartido, así que vale
+    también para varios hilos enviando a la vez.
+    """
+
+    def __init__(self, rate, min_rate, max_rate, increase=1.0, decrease=0.5, cooldown=1.0):
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.increase = float(increase)
+        self.decrease = float(decrease)
+        self.cooldown = cooldown
+        self.bucket = TokenBucket(self._clamp(rate))
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.throttles = 0
+        self.started = None
+        self.finished = None
+        self.last_decrease = None
+
+    def _clamp(self, rate):
+        return max(self.min_rate, min(self.max_rate, float(rate)))
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    def acquire(self, tokens=1):
+        """Espera el turno del siguiente envío (`tokens` mensajes)"""
+        if self.started is None:
+            self.started = time.monotonic()
+        return self.bucket.acquire(tokens)
+
+    def limit(self, max_rate):
+        """Baja el techo de la tasa (p. ej. al máximo que permite la cuenta del proveedor)"""
+        with self.lock:
+            self.max_rate = min(self.max_rate, float(max_rate))
+            self.min_rate = min(self.min_rate, self.max_rate)
+            self.bucket.set_rate(self._clamp(self.rate))
+
+    def success(self):
+        with self.lock:
+            self.sent += 1
+            self.finished = time.monotonic()
+            self.bucket.set_rate(self._clamp(self.rate + self.increase / self.rate))
+
+    def throttled(self):
+        with self.lock:
+            self.throttles += 1
+            now = time.monotonic()
+            if self.last_decrease is None or now - self.last_decrease >= self.cooldown:
+                self.bucket.set_rate(self._clamp(self.rate * self.decrease))
+                self.last_decrease = now
+
+    @property
+    def achieved_rate(self):
+        """Mensajes entregados por segundo desde el primer envío"""
+        if not self.sent or self.finished is None or self.finished <= self.started:
+            return 0.0
+        return self.sent / (self.finished - self.started)
+
+
+def backoff_delay(attempt, base=0.5, cap=30.0):
+    """Espera exponencial con jitter completo para el reintento número `attempt` (desde 0)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
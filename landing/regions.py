@@ -0,0 +1,37 @@
+"""
+Conteos de registros por municipio y código postal.
+
+Se calculan con un GROUP BY sobre las columnas indexadas municipality y
+zip_code (ver geo.py) y se sirven desde caché hasta que cambian los datos.
+"""
+
+from django.db.models import Count
+
+from .caching import cached_aggregate
+from .filters import RegistrationFilter, normalize_filter_params
+from .models import Registration
+
+TOP_ZIP_CODES = 15
+
+
+def municipality_counts(params):
+    """Registros por municipio (y los códigos postales más frecuentes) para los filtros dados"""
+    params = normalize_filter_params(params)
+
+    def compute():
+        registrations = RegistrationFilter(params, queryset=Registration.objects.all()).qs.order_by()
+        by_municipality = list(
+            registrations.values_list('municipality').annotate(total=Count('id')).order_by('-total', 'municipality')
+        )
+        by_zip = list(
+            registrations.exclude(zip_code='').values_list('zip_code').annotate(
+                total=Count('id')
+            ).order_by('-total', 'zip_code')[:TOP_ZIP_CODES]
+        )
+        return {
+            'municipalities': [(name, total) for name, total in by_municipality if name],
+            'unknown': sum(total for name, total in by_municipality if not name),
+            'zip_codes': by_zip,
+        }
+
+    return cached_aggregate('municipalities', params, compute)
@@ -0,0 +1,136 @@
+"""
+Rollup diario de registros para el gráfico del dashboard.
+
+Los días anteriores a hoy (en la zona horaria del sitio, America/Puerto_Rico)
+se cuentan una sola vez y se guardan en DailyRegistrationCount; se consideran
+inmutables y su serie se mantiene en caché. Solo el día de hoy se recalcula
+en cada petición, con un conteo sobre el índice de created_at.
+
+series_state() reúne en dos consultas todo lo que necesita una petición del
+gráfico (ETag, Last-Modified y la serie); la vista lo calcula una sola vez.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, Max, Min, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyRegistrationCount, Registration
+
+CACHE_KEY = 'landing:daily_rollup:{last}:{stamp}'
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def day_start(day):
+    """Inicio (aware) del día `day` en la zona horaria del sitio"""
+    return timezone.make_aware(datetime.combine(day, time.min), timezone.get_current_timezone())
+
+
+def _rollup_state():
+    """Último día consolidado y marca de tiempo del último cálculo"""
+    return DailyRegistrationCount.objects.aggregate(last=Max('date'), stamp=Max('computed_at'))
+
+
+def update_daily_rollup():
+    """
+    Consolida los días completos que aún no están en el rollup.
+
+    Calcula en una sola consulta agrupada todos los días entre el último día
+    consolidado (o el primer registro) y ayer, incluyendo los días sin
+    registros para no tener que volver a revisarlos.
+    """
+    return _consolidate(DailyRegistrationCount.objects.aggregate(last=Max('date'))['last'])
+
+
+def _consolidate(last):
+    """update_daily_rollup() a partir del último día consolidado ya leído"""
+    today = timezone.localdate()
+    if last is None:
+        first = Registration.objects.aggregate(first=Min('created_at'))['first']
+        if first is None:
+            return 0
+        start = timezone.localdate(first)
+    else:
+        start = last + timedelta(days=1)
+
+    if start >= today:
+        return 0
+
+    counts = dict(
+        Registration.objects.filter(
+            created_at__gte=day_start(start),
+            created_at__lt=day_start(today),
+        ).annotate(
+            date=TruncDate('created_at', tzinfo=timezone.get_current_timezone())
+        ).values_list('date').annotate(count=Count('id')).order_by()
+    )
+
+    rows = []
+    day = start
+    while day < today:
+        rows.append(DailyRegistrationCount(date=day, count=counts.get(day, 0)))
+        day += timedelta(days=1)
+
+    DailyRegistrationCount.objects.bulk_create(rows, ignore_conflicts=True)
+    return len(rows)
+
+
+def rebuild_daily_rollup():
+    """Borra y recalcula el rollup completo (p. ej. tras importar o borrar registros)"""
+    DailyRegistrationCount.objects.all().delete()
+    return update_daily_rollup()
+
+
+def series_state():
+    """
+    Estado de la serie: último día consolidado y marca del cálculo (`last`,
+    `stamp`), registros de hoy (`today`) y fecha del último registro
+    (`latest`). Consolida antes los días que falten; con el rollup al día
+    son dos consultas.
+    """
+    state = _rollup_state()
+    if _consolidate(state['last']):
+        state = _rollup_state()
+    state.update(Registration.objects.aggregate(
+        today=Count('id', filter=Q(created_at__gte=day_start(timezone.localdate()))),
+        latest=Max('created_at'),
+    ))
+    return state
+
+
+def past_series(state=None):
+    """Serie [(fecha, conteo)] de los días consolidados, servida desde caché"""
+    if state is None:
+        state = series_state()
+    if state['last'] is None:
+        return []
+
+    key = CACHE_KEY.format(last=state['last'].isoformat(), stamp=state['stamp'].timestamp())
+    series = cache.get(key)
+    if series is None:
+        series = list(DailyRegistrationCount.objects.order_by('date').values_list('date', 'count'))
+        cache.set(key, series, CACHE_TIMEOUT)
+    return series
+
+
+def daily_series(start_date=None, end_date=None, state=None):
+    """Serie diaria completa, incluyendo el día de hoy, limitada al rango dado"""
+    if state is None:
+        state = series_state()
+    series = past_series(state) + [(timezone.localdate(), state['today'])]
+    return [
+        (day, count) for day, count in series
+        if (start_date is None or day >= start_date) and (end_date is None or day <= end_date)
+    ]
+
+
+def series_fingerprint(state):
+    """Huella del estado de la serie (series_state()), usada para el ETag"""
+    return '{}:{}:{}:{}'.format(
+        state['last'],
+        state['stamp'].timestamp() if state['stamp'] else 0,
+        timezone.localdate(),
+        state['today'],
+    )
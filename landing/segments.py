@@ -0,0 +1,112 @@
+"""
+Segmentos guardados.
+
+Un segmento es un conjunto de filtros de RegistrationFilter con nombre. Su
+membresía se calcula una vez y se guarda en SegmentMembership; a partir de
+ahí el dashboard, las exportaciones y los envíos usan el segmento con un
+join sobre esa tabla en lugar de volver a aplicar los filtros.
+
+La membresía se mantiene al día de forma incremental: cada vez que se guarda
+un registro se comprueba solo ese registro contra cada segmento (ver
+signals.py). Los imports con bulk_create no disparan señales; después de
+un import hay que ejecutar `python manage.py rebuild_segments`.
+"""
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .caching import bump_registrations_version
+from .filters import RegistrationFilter, normalize_filter_params
+from .models import Registration, Segment, SegmentMembership
+
+CHUNK_SIZE = 2000
+
+
+def filtered(segment, queryset=None):
+    """Aplica los filtros del segmento (sin usar la membresía guardada)"""
+    if queryset is None:
+        queryset = Registration.objects.all()
+    filters = {key: value for key, value in segment.filters.items() if key != 'segment'}
+    return RegistrationFilter(filters, queryset=queryset).qs
+
+
+def create_segment(name, filters, user=None):
+    """Guarda el segmento y materializa su membresía"""
+    segment = Segment.objects.create(
+        name=name,
+        filters={key: value for key, value in normalize_filter_params(filters).items() if key != 'segment'},
+        created_by=user if user and user.is_authenticated else None,
+    )
+    rebuild_segment(segment)
+    return segment
+
+
+def rebuild_segment(segment):
+    """Recalcula desde cero la membresía del segmento"""
+    ids = filtered(segment).order_by().values_list('id', flat=True)
+    with transaction.atomic():
+        SegmentMembership.objects.filter(segment=segment).delete()
+        count = 0
+        batch = []
+        for registration_id in ids.iterator(chunk_size=CHUNK_SIZE):
+            batch.append(SegmentMembership(segment=segment, registration_id=registration_id))
+            if len(batch) >= CHUNK_SIZE:
+                SegmentMembership.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        SegmentMembership.objects.bulk_create(batch)
+        count += len(batch)
+        Segment.objects.filter(pk=segment.pk).update(member_count=count, refreshed_at=timezone.now())
+        bump_registrations_version()
+    segment.member_count = count
+    return count
+
+
+def rebuild_all():
+    """
+    Recalcula todos los segmentos. Es el paso final de cualquier cambio en
+    bloque sobre los registros (bulk_create, bulk_update, update()), que no
+    dispara señales; cambia la versión de los datos aunque no haya segmentos.
+    """
+    counts = {segment.name: rebuild_segment(segment) for segment in Segment.objects.all()}
+    bump_registrations_version()
+    return counts
+
+
+def update_membership(registration):
+    """Añade o quita `registration` de cada segmento según sus filtros"""
+    current = set(
+        SegmentMembership.objects.filter(registration=registration).values_list('segment_id', flat=True)
+    )
+    for segment in Segment.objects.all():
+        matches = filtered(segment, Registration.objects.filter(pk=registration.pk)).exists()
+        if matches and segment.pk not in current:
+            _, created = SegmentMembership.objects.get_or_create(segment=segment, registration=registration)
+            if created:
+                Segment.objects.filter(pk=segment.pk).update(member_count=F('member_count') + 1)
+        elif not matches and segment.pk in current:
+            SegmentMembership.objects.filter(segment=segment, registration=registration).delete()
+            Segment.objects.filter(pk=segment.pk).update(member_count=F('member_count') - 1)
+
+
+def remove_registration(registration):
+    """Descuenta el registro de sus segmentos antes de borrarlo"""
+    segment_ids = list(
+        SegmentMembership.objects.filter(registration=registration).values_list('segment_id', flat=True)
+    )
+    Segment.objects.filter(pk__in=segment_ids).update(member_count=F('member_count') - 1)
+
+
+def get_segment(name_or_id):
+    """Busca un segmento por ID o por nombre (para los scripts)"""
+    if str(name_or_id).isdigit():
+        return Segment.objects.get(pk=int(name_or_id))
+    return Segment.objects.get(name=name_or_id)
+
+
+def restrict(queryset, name_or_id=None):
+    """Limita `queryset` a los miembros del segmento indicado, si hay uno"""
+    if not name_or_id:
+        return queryset
+    return queryset.filter(segment_memberships__segment=get_segment(name_or_id))
@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import segments, specialties
+from .caching import bump_registrations_version
+from .live import broadcaster
+from .models import Registration, Specialty, SpecialtyAlias
+
+
+@receiver(pre_save, sender=Registration)
+def normalize_specialty(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Asigna la especialidad canónica a partir del texto libre"""
+    if raw or (update_fields is not None and 'specialty' not in update_fields):
+        return
+    instance.canonical_specialty_id = specialties.resolve(instance.specialty)
+
+
+@receiver(post_save, sender=Registration)
+def update_segment_membership(sender, instance, raw=False, **kwargs):
+    """Mantiene la membresía de los segmentos al crear o editar un registro"""
+    if not raw:
+        segments.update_membership(instance)
+
+
+@receiver([post_save, post_delete], sender=Registration)
+def invalidate_registration_aggregates(sender, instance, raw=False, **kwargs):
+    """Nueva versión de los agregados (después de actualizar los segmentos)"""
+    if not raw:
+        bump_registrations_version()
+
+
+@receiver(post_save, sender=Registration)
+def notify_live_dashboards(sender, instance, **kwargs):
+    """Avisa a los dashboards abiertos (SSE) cuando el cambio se confirma"""
+    transaction.on_commit(broadcaster.notify)
+
+
+@receiver(pre_delete, sender=Registration)
+def remove_segment_membership(sender, instance, **kwargs):
+    segments.remove_registration(instance)
+
+
+@receiver([post_save, post_delete], sender=SpecialtyAlias)
+@receiver([post_save, post_delete], sender=Specialty)
+def reload_specialty_aliases(sender, **kwargs):
+    specialties.clear_alias_table()
+    bump_registrations_version()
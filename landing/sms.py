@@ -0,0 +1,321 @@
+"""
+Envío de SMS con Twilio fuera de la petición HTTP.
+
+SmsDispatcher reparte los mensajes en un pool acotado de hilos que comparten
+una sesión HTTP (conexiones keep-alive reutilizadas) y un token bucket
+ajustado a los mensajes por segundo del número remitente. Las respuestas 429
+y 5xx y los errores al abrir la conexión se reintentan con espera
+exponencial y jitter; un timeout de lectura no, porque Twilio puede haber
+aceptado ya el mensaje y reintentarlo lo enviaría (y cobraría) dos veces.
+
+La URL base de la API es configurable (TWILIO_API_BASE_URL) para poder medir
+contra un servidor local que imita a Twilio (ver twilio_standin.py).
+
+Los StatusCallback de Twilio se acumulan en un StatusBuffer en memoria y se
+escriben en bloque en SmsMessage, en lugar de una transacción por callback.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timezone as dt_timezone
+
+import requests
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from .models import SmsMessage
+from .ratelimit import TokenBucket, backoff_delay
+from .sms_encoding import count_segments
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+logger = logging.getLogger(__name__)
+
+
+class TwilioAPIError(Exception):
+    """Error devuelto por la API de Twilio (o de red al llamarla)"""
+
+    def __init__(self, message, status=None, code=None, retry_after=None, unsent=False):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.retry_after = retry_after
+        # True si la petición no llegó a Twilio (no se pudo abrir la conexión)
+        self.unsent = unsent
+
+    @property
+    def retryable(self):
+        if self.status is None:
+            return self.unsent
+        return self.status in RETRY_STATUS
+
+
+def connect_failed(error):
+    """True si `error` de requests ocurrió antes de enviar la petición"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if isinstance(error, requests.ConnectionError) and error.args:
+        # requests envuelve el MaxRetryError de urllib3, que guarda la causa en `reason`
+        reason = getattr(error.args[0], 'reason', error.args[0])
+        return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+    return False
+
+
+class TwilioRestClient:
+    """
+    Cliente mínimo de la API REST de Twilio sobre una sesión de requests.
+
+    La sesión mantiene un pool de `pool_size` conexiones, suficiente para
+    que cada hilo del dispatcher reutilice la suya.
+    """
+
+    def __init__(self, account_sid=None, auth_token=None, base_url=None, pool_size=10, timeout=15):
+        self.account_sid = account_sid or settings.TWILIO_ACCOUNT_SID
+        self.base_url = (base_url or settings.TWILIO_API_BASE_URL).rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.auth = (self.account_sid, auth_token or settings.TWILIO_AUTH_TOKEN)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def url(self, path):
+        return f'{self.base_url}/2010-04-01/Accounts/{self.account_sid}/{path}'
+
+    def request(self, method, url, **kwargs):
+        try:
+            response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            raise TwilioAPIError(str(e), unsent=connect_failed(e))
+
+        if response.status_code >= 400:
+            try:
+                payload = response.json()
+            except ValueError:
+                payload = {}
+            retry_after = response.headers.get('Retry-After')
+            raise TwilioAPIError(
+                payload.get('message') or f'HTTP {response.status_code}',
+                status=response.status_code,
+                code=payload.get('code'),
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+        return response.json()
+
+    def create_message(self, to, body, from_=None, status_callback=None):
+        data = {'To': to, 'From': from_ or settings.TWILIO_PHONE_NUMBER, 'Body': body}
+        if status_callback:
+            data['StatusCallback'] = status_callback
+        return self.request('POST', self.url('Messages.json'), data=data)
+
+    def list_messages(self, date_sent_after=None, page_size=1000):
+        """Primera página del log de mensajes, del más reciente al más antiguo"""
+        params = {'PageSize': page_size}
+        if date_sent_after:
+            params['DateSent>'] = date_sent_after.astimezone(dt_timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        return self.request('GET', self.url('Messages.json'), params=params)
+
+    def fetch_page(self, page_uri):
+        """Página siguiente a partir del next_page_uri devuelto por Twilio"""
+        return self.request('GET', self.base_url + page_uri)
+
+
+class SmsResult:
+    """Resultado del envío de un mensaje"""
+
+    def __init__(self, key, to, sid=None, status=None, error=None, error_code=None, attempts=1):
+        self.key = key
+        self.to = to
+        self.sid = sid
+        self.status = status
+        self.error = error
+        self.error_code = error_code
+        self.attempts = attempts
+
+    @property
+    def ok(self):
+        return self.sid is not None
+
+
+class SmsDispatcher:
+    """
+    Envía mensajes en paralelo respetando la tasa de Twilio.
+
+    `rate` es el límite de segmentos por segundo del remitente (1 para un
+    número local, 3 para toll-free, 100 para short code) y `workers` el
+    número de hilos con peticiones en curso a la vez. Cada mensaje consume
+    tantos tokens como segmentos ocupa.
+    """
+
+    def __init__(self, client=None, rate=None, workers=None, max_retries=None, status_callback=None):
+        self.workers = workers or settings.SMS_WORKERS
+        self.client = client or TwilioRestClient(pool_size=self.workers)
+        self.bucket = TokenBucket(rate or settings.SMS_SEND_RATE)
+        self.max_retries = settings.SMS_MAX_RETRIES if max_retries is None else max_retries
+        self.status_callback = status_callback
+
+    def send_one(self, key, to, body):
+        attempt = 0
+        segments = max(1, count_segments(body))
+        while True:
+            self.bucket.acquire(segments)
+            try:
+                message = self.client.create_message(to, body, status_callback=self.status_callback)
+                return SmsResult(key, to, sid=message['sid'], status=message.get('status'), attempts=attempt + 1)
+            except TwilioAPIError as e:
+                if not e.retryable or attempt >= self.max_retries:
+                    return SmsResult(key, to, error=str(e), error_code=e.code, attempts=attempt + 1)
+                time.sleep(e.retry_after or backoff_delay(attempt))
+                attempt += 1
+
+    def dispatch(self, messages):
+        """
+        Envía `messages` (tuplas (clave, teléfono, texto)) y devuelve los
+        SmsResult en el mismo orden.
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self.send_one, key, to, body) for key, to, body in messages]
+            return [future.result() for future in futures]
+
+
+# ============================================
+# STATUS CALLBACKS
+# ============================================
+
+# Orden del ciclo de vida de un mensaje; un callback que llega tarde con un
+# estado anterior (p. ej. "sent" después de "delivered") no lo sobrescribe.
+STATUS_RANK = {
+    'accepted': 0,
+    'scheduled': 0,
+    'queued': 1,
+    'sending': 2,
+    'sent': 3,
+    'delivered': 4,
+    'undelivered': 4,
+    'failed': 4,
+    'canceled': 4,
+    'read': 5,
+}
+
+
+def status_rank(status):
+    return STATUS_RANK.get(status, 0)
+
+
+def parse_error_code(value):
+    """ErrorCode del callback como entero; None si falta o no es numérico"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class StatusBuffer:
+    """
+    Buffer en memoria de eventos de estado de SMS.
+
+    Conserva solo el evento más avanzado por SID y se vacía en una sola
+    transacción cuando alcanza `max_size` eventos o cuando el evento más
+    antiguo tiene más de `max_age` segundos. Un hilo en segundo plano vacía
+    el buffer cuando dejan de llegar callbacks.
+    """
+
+    def __init__(self, max_size=None, max_age=None):
+        self.max_size = max_size or settings.SMS_STATUS_BUFFER_SIZE
+        self.max_age = max_age or settings.SMS_STATUS_FLUSH_SECONDS
+        self.events = {}
+        self.oldest = None
+        self.lock = threading.Lock()
+        self.timer = None
+
+    def add(self, sid, status, to='', from_number='', error_code=None, error_message=''):
+        event = {
+            'status': status,
+            'to': to,
+            'from_number': from_number,
+            'error_code': parse_error_code(error_code),
+            'error_message': error_message or '',
+        }
+        with self.lock:
+            current = self.events.get(sid)
+            if current is None or status_rank(status) >= status_rank(current['status']):
+                self.events[sid] = event
+            if self.oldest is None:
+                self.oldest = time.monotonic()
+            due = len(self.events) >= self.max_size or time.monotonic() - self.oldest >= self.max_age
+            self._start_timer()
+
+        if due:
+            self.flush()
+
+    def _start_timer(self):
+        if self.timer is None or not self.timer.is_alive():
+            self.timer = threading.Thread(target=self._flush_periodically, daemon=True)
+            self.timer.start()
+
+    def _flush_periodically(self):
+        try:
+            while True:
+                time.sleep(self.max_age)
+                with self.lock:
+                    if not self.events:
+                        return
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception('No se pudieron guardar los estados de SMS')
+        finally:
+            # La conexión de Django es por hilo: sin cerrarla, cada hilo deja una abierta
+            connection.close()
+
+    def flush(self):
+        """Escribe los eventos acumulados; devuelve cuántos se procesaron"""
+        with self.lock:
+            events, self.events, self.oldest = self.events, {}, None
+        if events:
+            apply_status_events(events)
+        return len(events)
+
+
+def apply_status_events(events):
+    """Aplica en bloque un dict {sid: evento} sobre SmsMessage"""
+    now = timezone.now()
+    with transaction.atomic():
+        existing = SmsMessage.objects.in_bulk(list(events), field_name='sid')
+
+        changed = []
+        for sid, message in existing.items():
+            event = events[sid]
+            if status_rank(event['status']) < status_rank(message.status):
+                continue
+            message.status = event['status']
+            message.error_code = event['error_code']
+            message.error_message = event['error_message']
+            message.updated_at = now
+            changed.append(message)
+        SmsMessage.objects.bulk_update(
+            changed, ['status', 'error_code', 'error_message', 'updated_at'], batch_size=500
+        )
+
+        # Mensajes que no salieron de una campaña (p. ej. enviados desde la consola)
+        SmsMessage.objects.bulk_create([
+            SmsMessage(
+                sid=sid,
+                to=event['to'],
+                from_number=event['from_number'],
+                status=event['status'],
+                error_code=event['error_code'],
+                error_message=event['error_message'],
+            )
+            for sid, event in events.items() if sid not in existing
+        ], ignore_conflicts=True)
+
+
+status_buffer = StatusBuffer()
+atexit.register(status_buffer.flush)
@@ -0,0 +1,170 @@
+"""
+Codificación y segmentos de los SMS antes del envío.
+
+Un SMS se envía en GSM-7 si todos sus caracteres están en el alfabeto GSM
+03.38; basta un carácter fuera de él (una "á", una comilla tipográfica o un
+emoji) para que todo el mensaje pase a UCS-2, que admite menos de la mitad de
+caracteres por segmento. Twilio factura y limita la tasa por segmento, así
+que cada segmento de más alarga el envío masivo.
+
+Las plantillas admiten {nombre} y {apellidos}. Al personalizar, los valores
+se adaptan a la codificación de la plantilla y se recortan si hace falta
+para no superar los segmentos calculados al redactar el mensaje.
+"""
+
+import unicodedata
+
+# Alfabeto básico GSM 03.38 (1 septeto por carácter)
+GSM7_BASIC = set(
+    '@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ'
+    ' !"#¤%&\'()*+,-./0123456789:;<=>?'
+    '¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§'
+    '¿abcdefghijklmnopqrstuvwxyzäöñüà'
+)
+
+# Tabla de extensión: se envían con un carácter de escape (2 septetos)
+GSM7_EXTENDED = set('\f^{}\\[~]|€')
+
+GSM7 = 'GSM-7'
+UCS2 = 'UCS-2'
+
+# Caracteres por segmento: (mensaje de un solo segmento, parte de un mensaje concatenado)
+SEGMENT_SIZE = {
+    GSM7: (160, 153),
+    UCS2: (70, 67),
+}
+
+# Reemplazos que no se obtienen quitando los acentos
+REPLACEMENTS = {
+    '‘': "'", '’': "'", '‚': "'", '′': "'",
+    '“': '"', '”': '"', '„': '"', '″': '"',
+    '–': '-', '—': '-', '−': '-',
+    '…': '...',
+    '\u00a0': ' ', '\u2009': ' ', '\u200b': '',
+    '•': '-', '·': '-',
+    '«': '"', '»': '"',
+    'º': 'o', 'ª': 'a',
+    '\t': ' ',
+}
+
+PLACEHOLDERS = {
+    '{nombre}': 'name',
+    '{apellidos}': 'last_name',
+}
+
+# Caracteres reservados por cada marcador al calcular los segmentos de una plantilla
+PLACEHOLDER_RESERVE = 12
+
+
+def is_gsm7(text):
+    return all(char in GSM7_BASIC or char in GSM7_EXTENDED for char in text)
+
+
+def char_units(char, encoding):
+    """Unidades que ocupa un carácter: septetos en GSM-7, unidades UTF-16 en UCS-2"""
+    if encoding == GSM7:
+        return 2 if char in GSM7_EXTENDED else 1
+    return 2 if ord(char) > 0xFFFF else 1
+
+
+def count_segments(text, encoding=None):
+    """
+    Segmentos que ocupa `text`.
+
+    En un mensaje concatenado un carácter de escape GSM-7 o un par sustituto
+    UTF-16 nunca se parte entre dos segmentos, por eso se empaqueta carácter
+    a carácter en lugar de dividir la longitud total.
+    """
+    encoding = encoding or (GSM7 if is_gsm7(text) else UCS2)
+    single, part = SEGMENT_SIZE[encoding]
+    units = [char_units(char, encoding) for char in text]
+    if sum(units) <= single:
+        return 1 if text else 0
+
+    segments = 1
+    used = 0
+    for size in units:
+        if used + size > part:
+            segments += 1
+            used = 0
+        used += size
+    return segments
+
+
+def analyze(text):
+    """Codificación, longitud y segmentos de un mensaje"""
+    encoding = GSM7 if is_gsm7(text) else UCS2
+    single, part = SEGMENT_SIZE[encoding]
+    length = sum(char_units(char, encoding) for char in text)
+    segments = count_segments(text, encoding)
+    capacity = single if segments <= 1 else segments * part
+    non_gsm = []
+    for char in text:
+        if char not in GSM7_BASIC and char not in GSM7_EXTENDED and char not in non_gsm:
+            non_gsm.append(char)
+    return {
+        'encoding': encoding,
+        'length': length,
+        'segments': segments,
+        'per_segment': single if segments <= 1 else part,
+        'remaining': capacity - length,
+        'non_gsm': non_gsm,
+    }
+
+
+def transliterate_char(char):
+    if char in GSM7_BASIC or char in GSM7_EXTENDED:
+        return char
+    if char in REPLACEMENTS:
+        return REPLACEMENTS[char]
+    # "á" -> "a", "ç" -> "c": quitar las marcas diacríticas
+    decomposed = unicodedata.normalize('NFKD', char)
+    base = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    if base and is_gsm7(base):
+        return base
+    # Emojis y otros símbolos sin equivalente se eliminan
+    return ''
+
+
+def transliterate(text):
+    """Versión del texto que cabe en GSM-7 (conserva ñ, é, ¿, ¡, etc.)"""
+    return ''.join(transliterate_char(char) for char in text)
+
+
+def template_segments(template):
+    """Segmentos de la plantilla reservando PLACEHOLDER_RESERVE caracteres por marcador"""
+    sample = template
+    for placeholder in PLACEHOLDERS:
+        sample = sample.replace(placeholder, 'x' * PLACEHOLDER_RESERVE)
+    return count_segments(sample, GSM7 if is_gsm7(template) else UCS2)
+
+
+def personalize(template, values, max_segments=None):
+    """
+    Rellena los marcadores de la plantilla con `values` ({'name': ..., ...}).
+
+    Si la plantilla es GSM-7 los valores se transliteran para que un nombre
+    con acentos no cambie la codificación. Si el mensaje supera
+    `max_segments`, se recortan los valores más largos hasta que quepa.
+    """
+    gsm = is_gsm7(template)
+    fields = {}
+    for placeholder, key in PLACEHOLDERS.items():
+        if placeholder in template:
+            value = (values.get(key) or '').strip()
+            fields[placeholder] = transliterate(value) if gsm else value
+
+    def render():
+        text = template
+        for placeholder, value in fields.items():
+            text = text.replace(placeholder, value)
+        return text
+
+    text = render()
+    if max_segments is None:
+        return text
+    while count_segments(text) > max_segments and any(fields.values()):
+        longest = max(fields, key=lambda placeholder: len(fields[placeholder]))
+        fields[longest] = fields[longest][:-1].rstrip()
+        text = render()
+    return text
@@ -0,0 +1,111 @@
+"""
+Normalización de especialidades médicas.
+
+El campo `specialty` es texto libre ("Medicina General", "medicina primaria",
+"Pediatra", "cardiologia"...). Cada texto se reduce a una clave (minúsculas,
+sin acentos ni signos) que se busca en SpecialtyAlias; si no hay alias exacto
+se intenta una coincidencia aproximada (difflib) para tolerar errores de
+escritura. El resultado se guarda en Registration.canonical_specialty al
+guardar el registro (signals.py) y en bloque con
+`python manage.py normalize_specialties`.
+"""
+
+import difflib
+import re
+import time
+import unicodedata
+
+from django.db.models import Count
+from django.utils import timezone
+
+from .caching import cached_aggregate
+from .filters import RegistrationFilter, normalize_filter_params
+from .models import Registration, Specialty, SpecialtyAlias
+
+# Similitud mínima para aceptar una coincidencia aproximada
+FUZZY_CUTOFF = 0.85
+# Segundos que se conserva en memoria la tabla de alias de cada proceso
+ALIAS_TTL = 300
+
+_aliases = None
+_loaded_at = 0.0
+
+
+def specialty_key(raw):
+    """'  Medicina  GENERAL.' -> 'medicina general'"""
+    decomposed = unicodedata.normalize('NFKD', raw or '')
+    text = ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+    text = re.sub(r'[^a-z0-9]+', ' ', text)
+    return ' '.join(text.split())
+
+
+def alias_table():
+    """{clave: specialty_id}, en memoria durante ALIAS_TTL segundos"""
+    global _aliases, _loaded_at
+    if _aliases is None or time.monotonic() - _loaded_at > ALIAS_TTL:
+        _aliases = dict(SpecialtyAlias.objects.values_list('key', 'specialty_id'))
+        _loaded_at = time.monotonic()
+    return _aliases
+
+
+def clear_alias_table():
+    global _aliases
+    _aliases = None
+
+
+def resolve(raw):
+    """ID de la especialidad canónica para el texto `raw`, o None"""
+    key = specialty_key(raw)
+    if not key:
+        return None
+    aliases = alias_table()
+    if key in aliases:
+        return aliases[key]
+    close = difflib.get_close_matches(key, aliases.keys(), n=1, cutoff=FUZZY_CUTOFF)
+    return aliases[close[0]] if close else None
+
+
+def normalize_all(only_missing=False):
+    """
+    Recalcula canonical_specialty en bloque: una resolución y un UPDATE por
+    cada texto distinto, no por registro. Devuelve (actualizados, sin resolver)
+    donde `sin resolver` es [(texto, registros)].
+    """
+    registrations = Registration.objects.exclude(specialty__isnull=True).exclude(specialty='')
+    if only_missing:
+        registrations = registrations.filter(canonical_specialty__isnull=True)
+
+    now = timezone.now()
+    updated = 0
+    unresolved = []
+    distinct = registrations.values_list('specialty').annotate(total=Count('id')).order_by('-total')
+    for raw, total in distinct:
+        specialty_id = resolve(raw)
+        if specialty_id is None:
+            unresolved.append((raw, total))
+        updated += registrations.filter(specialty=raw).exclude(
+            canonical_specialty_id=specialty_id
+        ).update(canonical_specialty_id=specialty_id, updated_at=now)
+    return updated, unresolved
+
+
+def specialty_counts(params):
+    """[(id, nombre, registros)] de las especialidades para los filtros dados, en caché"""
+    params = normalize_filter_params(params)
+
+    def compute():
+        registrations = RegistrationFilter(
+            {key: value for key, value in params.items() if key != 'canonical_specialty'},
+            queryset=Registration.objects.all()
+        ).qs.order_by()
+        counts = dict(
+            registrations.exclude(canonical_specialty__isnull=True).values_list(
+                'canonical_specialty'
+            ).annotate(total=Count('id'))
+        )
+        return [
+            (specialty.pk, specialty.name, counts.get(specialty.pk, 0))
+            for specialty in Specialty.objects.all()
+        ]
+
+    return cached_aggregate('specialties', params, compute)
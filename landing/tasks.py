@@ -0,0 +1,16 @@
+"""
+Tareas periódicas del worker local.
+
+`python manage.py run_worker` ejecuta cada tarea en orden en cada ciclo.
+Cada tarea procesa una unidad de trabajo pendiente y devuelve True si hizo
+algo, para que el worker vuelva a consultar sin esperar.
+"""
+
+from .campaigns import process_campaigns, process_retries
+from .exports import process_export_jobs
+
+TASKS = [
+    process_export_jobs,
+    process_campaigns,
+    process_retries,
+]
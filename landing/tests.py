@@ -1,3 +1,1596 @@
-from django.test import TestCase
+from datetime import datetime, timedelta, timezone as dt_timezone
+import email
+import email.policy
+from email.utils import format_datetime
+import io
+import queue
+import smtplib
+import socket
+import sys
+import tempfile
+import unittest
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from twilio.request_validator import RequestValidator
+
+from . import (
+    campaigns, email_templates, exports, facets, geo, live, mime, ratelimit, rollups, segments, sms_encoding, sms_sync,
+    specialties,
+)
+from .caching import cached_aggregate, registrations_version
+from .filters import RegistrationFilter
+from .models import (
+    Campaign, CampaignRecipient, ExportJob, Registration, Segment, SegmentMembership, SendAttempt, SmsMessage,
+    Specialty, SpecialtyAlias, SyncCursor,
+)
+from .sms import SmsDispatcher, StatusBuffer, TwilioAPIError, apply_status_events
+from .transports import QuotaExhausted, SendError, SesBulkTransport, SesTransport, SmtpTransport, Transport
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    Controller = None
+
+try:
+    import boto3
+    from moto import mock_aws
+except ImportError:
+    mock_aws = None
+
+
+def make_registration(number, **fields):
+    """Registro mínimo válido; `number` hace únicos el email y el teléfono"""
+    defaults = {
+        'name': f'Nombre{number}',
+        'last_name': f'Apellido{number}',
+        'postal_address': 'Calle 1, San Juan, PR 00901',
+        'phone_number': f'787555{number:04d}',
+        'email': f'persona{number}@example.com',
+        'accepts_terms': True,
+        'accepts_promotions': True,
+    }
+    defaults.update(fields)
+    return Registration.objects.create(**defaults)
+
+
+def registered_on(day, number):
+    """Registro creado a mediodía (hora local) del día `day`"""
+    registration = make_registration(number)
+    created = rollups.day_start(day) + timedelta(hours=12)
+    Registration.objects.filter(pk=registration.pk).update(created_at=created)
+    return registration
+
+
+class DailyRollupTests(TestCase):
+    """Rollup diario del gráfico y su ETag/Last-Modified"""
+
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        registered_on(self.today - timedelta(days=3), 1)
+        registered_on(self.today - timedelta(days=3), 2)
+        registered_on(self.today - timedelta(days=1), 3)
+        make_registration(4)
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+
+    def test_consolidates_past_days_including_empty_ones(self):
+        self.assertEqual(rollups.update_daily_rollup(), 3)
+        self.assertEqual(rollups.update_daily_rollup(), 0)
+        self.assertEqual(rollups.daily_series(), [
+            (self.today - timedelta(days=3), 2),
+            (self.today - timedelta(days=2), 0),
+            (self.today - timedelta(days=1), 1),
+            (self.today, 1),
+        ])
+
+    def test_series_state_is_two_queries_once_consolidated(self):
+        rollups.update_daily_rollup()
+        with self.assertNumQueries(2):
+            state = rollups.series_state()
+        self.assertEqual(state['today'], 1)
+        self.assertEqual(state['last'], self.today - timedelta(days=1))
+
+    def test_unchanged_chart_is_not_modified(self):
+        url = reverse('landing:dashboard-chart-data')
+        with mock.patch.object(rollups, 'series_state', wraps=rollups.series_state) as state:
+            response = self.client.get(url)
+        # ETag, Last-Modified y la serie comparten el mismo estado
+        self.assertEqual(state.call_count, 1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['datasets'][0]['data'], [2, 0, 1, 1])
+
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+        make_registration(5)
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], response['ETag'])
+
+    def test_etag_depends_on_the_requested_range(self):
+        url = reverse('landing:dashboard-chart-data')
+        response = self.client.get(url)
+        ranged = self.client.get(url, {'start_date': self.today.isoformat()}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(ranged.status_code, 200)
+        self.assertEqual(ranged.json()['labels'], [self.today.isoformat()])
+
+
+class StreamingExportTests(TestCase):
+    """Exportación CSV en streaming (iter_csv / stream_csv)"""
+
+    def setUp(self):
+        for number in range(5):
+            make_registration(number, is_doctor=number % 2 == 0, specialty='Cardiología' if number == 0 else '')
+
+    def test_yields_blocks_of_chunk_size_rows(self):
+        columns = [exports.Column('Teléfono', 'phone_number'), exports.Column('¿Médico?', 'is_doctor', exports.yes_no)]
+        queryset = Registration.objects.order_by('phone_number')
+        blocks = list(exports.iter_csv(queryset, columns, chunk_size=2))
+        self.assertEqual([block.count('\r\n') for block in blocks], [3, 2, 1])
+        self.assertEqual(blocks[0], 'Teléfono,¿Médico?\r\n7875550000,Sí\r\n7875550001,No\r\n')
+
+    def test_formats_empty_values_and_dates(self):
+        columns = [
+            exports.Column('Especialidad', 'specialty', exports.or_empty),
+            exports.Column('Fecha', 'created_at', exports.date_format('%Y')),
+        ]
+        rows = list(exports.iter_rows(Registration.objects.order_by('phone_number')[:2], columns))
+        year = str(timezone.now().year)
+        self.assertEqual(rows, [['Cardiología', year], ['', year]])
+
+    def test_dashboard_export_streams_filtered_rows(self):
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        response = self.client.get(reverse('landing:export-csv'), {'is_doctor': 'true'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[0], 'Código')
+        self.assertEqual(len(lines), 4)
+
+
+class EnqueueExportTests(TestCase):
+    """Reutilización de trabajos de exportación (enqueue_export)"""
+
+    def setUp(self):
+        make_registration(1)
+
+    def test_reuses_job_for_same_filters_and_data(self):
+        job, reused = exports.enqueue_export({'is_doctor': 'true'})
+        self.assertFalse(reused)
+        again, reused = exports.enqueue_export({'is_doctor': 'true'})
+        self.assertTrue(reused)
+        self.assertEqual(again.pk, job.pk)
+
+    def test_new_job_for_other_filters_or_changed_data(self):
+        job, _ = exports.enqueue_export({'is_doctor': 'true'})
+        other, reused = exports.enqueue_export({'is_doctor': 'false'})
+        self.assertFalse(reused)
+
+        make_registration(2)
+        fresh, reused = exports.enqueue_export({'is_doctor': 'true'})
+        self.assertFalse(reused)
+        self.assertNotIn(fresh.pk, {job.pk, other.pk})
+
+    def test_does_not_reuse_failed_or_expired_jobs(self):
+        job, _ = exports.enqueue_export({})
+        ExportJob.objects.filter(pk=job.pk).update(status=ExportJob.STATUS_FAILED)
+        second, reused = exports.enqueue_export({})
+        self.assertFalse(reused)
+
+        ExportJob.objects.filter(pk=second.pk).update(
+            status=ExportJob.STATUS_DONE,
+            expires_at=timezone.now() - timedelta(minutes=1),
+        )
+        third, reused = exports.enqueue_export({})
+        self.assertFalse(reused)
+        self.assertNotEqual(third.pk, second.pk)
+
+    def test_abandoned_running_job_is_failed_and_replaced(self):
+        job, _ = exports.enqueue_export({})
+        ExportJob.objects.filter(pk=job.pk).update(
+            status=ExportJob.STATUS_RUNNING,
+            started_at=timezone.now() - timedelta(hours=2),
+            heartbeat_at=timezone.now() - timedelta(hours=1),
+        )
+        fresh, reused = exports.enqueue_export({})
+        self.assertFalse(reused)
+        self.assertNotEqual(fresh.pk, job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.STATUS_FAILED)
+
+    def test_long_job_with_recent_progress_is_reused(self):
+        job, _ = exports.enqueue_export({})
+        ExportJob.objects.filter(pk=job.pk).update(
+            status=ExportJob.STATUS_RUNNING,
+            started_at=timezone.now() - timedelta(hours=2),
+            heartbeat_at=timezone.now(),
+        )
+        again, reused = exports.enqueue_export({})
+        self.assertTrue(reused)
+        self.assertEqual(again.pk, job.pk)
+
+    def test_queued_job_waiting_for_the_worker_is_not_failed(self):
+        job, _ = exports.enqueue_export({})
+        ExportJob.objects.filter(pk=job.pk).update(created_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(exports.fail_stale_exports(), 0)
+        again, reused = exports.enqueue_export({})
+        self.assertTrue(reused)
+        self.assertEqual(again.pk, job.pk)
+
+
+class ExportJobFileTests(TestCase):
+    """Archivo de las exportaciones en segundo plano: privado y solo por la vista de descarga"""
+
+    def setUp(self):
+        make_registration(1)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.storage = FileSystemStorage(location=directory.name)
+        patcher = mock.patch.object(ExportJob._meta.get_field('file'), 'storage', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.job, _ = exports.enqueue_export({})
+
+    def test_file_has_unguessable_name_and_is_served_by_the_view(self):
+        self.assertTrue(exports.process_export_jobs())
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, ExportJob.STATUS_DONE)
+        self.assertRegex(self.job.file.name, rf'^exports/registros_{self.job.pk}_[\w-]{{22}}\.csv$')
+        self.assertTrue(self.storage.exists(self.job.file.name))
+
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        response = self.client.get(reverse('landing:export-job-download', args=[self.job.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(str(self.job.pk) + '_', response['Content-Disposition'])
+        self.assertIn('persona1@example.com', b''.join(response.streaming_content).decode())
+
+    def test_job_failed_as_stale_is_not_marked_done(self):
+        ExportJob.objects.filter(pk=self.job.pk).update(status=ExportJob.STATUS_RUNNING)
+
+        def abandoned(queryset, columns, progress=None):
+            # Mientras se escribe, fail_stale_exports da el trabajo por abandonado
+            ExportJob.objects.filter(pk=self.job.pk).update(status=ExportJob.STATUS_FAILED)
+            yield 'Código\n'
+
+        with mock.patch.object(exports, 'iter_csv', abandoned):
+            exports.run_export_job(self.job)
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.status, self.job.file.name), (ExportJob.STATUS_FAILED, ''))
+        self.assertEqual(self.storage.listdir('exports')[1], [])
+
+
+class FlakyTwilioClient:
+    """Cliente de Twilio falso que falla con `errors` antes de aceptar el mensaje"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def create_message(self, to, body, status_callback=None):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return {'sid': f'SM{self.calls}', 'status': 'queued'}
+
+
+class SmsDispatcherRetryTests(TestCase):
+    """Qué errores de Twilio se reintentan al enviar un SMS"""
+
+    def send(self, *errors):
+        client = FlakyTwilioClient(*errors)
+        dispatcher = SmsDispatcher(client=client, rate=1000, workers=1, max_retries=3)
+        return dispatcher.send_one(1, '+17875550000', 'Hola'), client
+
+    def test_retries_throttling_and_server_errors(self):
+        result, client = self.send(
+            TwilioAPIError('Too Many Requests', status=429, retry_after=0.001),
+            TwilioAPIError('Service Unavailable', status=503, retry_after=0.001),
+        )
+        self.assertTrue(result.ok)
+        self.assertEqual(client.calls, 3)
+
+    def test_retries_connection_not_established(self):
+        result, client = self.send(TwilioAPIError('Connection refused', unsent=True, retry_after=0.001))
+        self.assertTrue(result.ok)
+        self.assertEqual(client.calls, 2)
+
+    def test_does_not_retry_after_request_was_sent(self):
+        # Un timeout de lectura: Twilio pudo haber aceptado el mensaje
+        result, client = self.send(TwilioAPIError('Read timed out', retry_after=0.001))
+        self.assertFalse(result.ok)
+        self.assertEqual(client.calls, 1)
+
+    def test_does_not_retry_client_errors(self):
+        result, client = self.send(TwilioAPIError('Invalid To', status=400, code=21211))
+        self.assertFalse(result.ok)
+        self.assertEqual(result.error_code, 21211)
+        self.assertEqual(client.calls, 1)
+
+
+def status_event(status, error_code=None, to='+17875550000'):
+    return {
+        'status': status,
+        'to': to,
+        'from_number': '+17875559999',
+        'error_code': error_code,
+        'error_message': '',
+    }
+
+
+class StatusEventsTests(TestCase):
+    """Escritura en bloque de los StatusCallback (StatusBuffer/apply_status_events)"""
+
+    def test_applies_events_and_creates_unknown_messages(self):
+        SmsMessage.objects.create(sid='SM1', to='+17875550000', status='queued')
+        apply_status_events({
+            'SM1': status_event('delivered'),
+            'SM2': status_event('failed', error_code=30003),
+        })
+        self.assertEqual(SmsMessage.objects.get(sid='SM1').status, 'delivered')
+        created = SmsMessage.objects.get(sid='SM2')
+        self.assertEqual((created.status, created.error_code), ('failed', 30003))
+
+    def test_late_event_does_not_move_status_back(self):
+        SmsMessage.objects.create(sid='SM1', to='+17875550000', status='delivered')
+        apply_status_events({'SM1': status_event('sent')})
+        self.assertEqual(SmsMessage.objects.get(sid='SM1').status, 'delivered')
+
+    def test_buffer_keeps_most_advanced_event_and_flushes_when_full(self):
+        buffer = StatusBuffer(max_size=2, max_age=60)
+        buffer.add('SM1', 'delivered')
+        buffer.add('SM1', 'sent')
+        self.assertFalse(SmsMessage.objects.exists())
+        buffer.add('SM2', 'queued')
+        self.assertEqual(dict(SmsMessage.objects.values_list('sid', 'status')), {'SM1': 'delivered', 'SM2': 'queued'})
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_buffer_ignores_non_numeric_error_code(self):
+        buffer = StatusBuffer(max_size=10, max_age=60)
+        buffer.add('SM1', 'failed', error_code='abc')
+        buffer.add('SM2', 'failed', error_code='30007')
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(
+            dict(SmsMessage.objects.values_list('sid', 'error_code')), {'SM1': None, 'SM2': 30007}
+        )
+
+
+@override_settings(TWILIO_STATUS_CALLBACK_URL='https://example.com/api/twilio/status/')
+class TwilioStatusCallbackTests(TestCase):
+    """Validación de la firma del webhook de estados"""
+
+    params = {'MessageSid': 'SM1', 'MessageStatus': 'delivered', 'To': '+17875550000'}
+
+    def post(self, signature):
+        return self.client.post(reverse('landing:twilio-status'), self.params, HTTP_X_TWILIO_SIGNATURE=signature)
+
+    @override_settings(TWILIO_AUTH_TOKEN='secreto')
+    def test_accepts_signed_callback(self):
+        signature = RequestValidator('secreto').compute_signature('https://example.com/api/twilio/status/', self.params)
+        with mock.patch('landing.views.status_buffer') as buffer:
+            self.assertEqual(self.post(signature).status_code, 204)
+        buffer.add.assert_called_once()
+
+    @override_settings(TWILIO_AUTH_TOKEN='secreto')
+    def test_rejects_bad_signature(self):
+        with mock.patch('landing.views.status_buffer') as buffer:
+            self.assertEqual(self.post('firma-falsa').status_code, 403)
+        buffer.add.assert_not_called()
+
+    @override_settings(TWILIO_AUTH_TOKEN='')
+    def test_rejects_everything_without_auth_token(self):
+        # Con un token vacío cualquiera puede calcular la firma
+        signature = RequestValidator('').compute_signature('https://example.com/api/twilio/status/', self.params)
+        with mock.patch('landing.views.status_buffer') as buffer:
+            self.assertEqual(self.post(signature).status_code, 403)
+        buffer.add.assert_not_called()
+
+
+SYNC_START = datetime(2025, 3, 1, 12, 0, tzinfo=dt_timezone.utc)
+MESSAGES_URI = '/2010-04-01/Accounts/AC123/Messages.json'
+
+
+def recorded_message(number, status='delivered'):
+    """Mensaje con el formato del log de Twilio, enviado `number` minutos después de SYNC_START"""
+    return {
+        'sid': f'SM{number:032d}',
+        'to': f'+1787555{number:04d}',
+        'from': '+17870000000',
+        'status': status,
+        'direction': 'outbound-api',
+        'date_sent': format_datetime(SYNC_START + timedelta(minutes=number)),
+        'error_code': 30003 if status == 'undelivered' else None,
+        'error_message': None,
+    }
+
+
+def recorded_pages(messages, page_size=2):
+    """Páginas de Messages.json (del más reciente al más antiguo) enlazadas por next_page_uri"""
+    messages = sorted(messages, key=lambda m: sms_sync.parse_twilio_date(m['date_sent']), reverse=True)
+    pages = []
+    for start in range(0, len(messages), page_size):
+        number = start // page_size
+        more = start + page_size < len(messages)
+        pages.append({
+            'messages': messages[start:start + page_size],
+            'page': number,
+            'next_page_uri': f'{MESSAGES_URI}?PageSize={page_size}&Page={number + 1}' if more else None,
+        })
+    return pages
+
+
+class ReplayTwilioClient:
+    """
+    Reproduce páginas grabadas del log de Twilio: list_messages devuelve la
+    primera y fetch_page la que indica su next_page_uri. Guarda las llamadas
+    para comprobar desde dónde se pidió el log.
+    """
+
+    def __init__(self, pages, fail_on=None):
+        self.pages = pages
+        self.by_uri = {page['next_page_uri']: pages[i + 1] for i, page in enumerate(pages[:-1])}
+        self.fail_on = fail_on
+        self.list_calls = []
+        self.fetched = []
+
+    def list_messages(self, date_sent_after=None, page_size=1000):
+        self.list_calls.append(date_sent_after)
+        return self.pages[0]
+
+    def fetch_page(self, page_uri):
+        if page_uri == self.fail_on:
+            self.fail_on = None
+            raise TwilioAPIError('Service Unavailable', status=503)
+        self.fetched.append(page_uri)
+        return self.by_uri[page_uri]
+
+
+class TwilioSyncTests(TestCase):
+    """Sincronización incremental del log de mensajes (sync_messages)"""
+
+    def setUp(self):
+        self.messages = [recorded_message(number) for number in range(1, 6)]
+        self.pages = recorded_pages(self.messages)
+
+    def cursor(self):
+        return SyncCursor.objects.get(name=sms_sync.CURSOR_NAME)
+
+    def test_full_sync_stores_messages_and_advances_watermark(self):
+        client = ReplayTwilioClient(self.pages)
+        pages, synced, finished = sms_sync.sync_messages(client=client)
+
+        self.assertEqual((pages, synced, finished), (3, 5, True))
+        self.assertEqual(client.list_calls, [None])
+        self.assertEqual(SmsMessage.objects.count(), 5)
+        cursor = self.cursor()
+        self.assertEqual(cursor.watermark, SYNC_START + timedelta(minutes=5))
+        self.assertEqual(cursor.next_page_uri, '')
+        self.assertIsNone(cursor.run_watermark)
+
+    def test_interrupted_sync_resumes_from_saved_page(self):
+        second_page = self.pages[0]['next_page_uri']
+        client = ReplayTwilioClient(self.pages, fail_on=second_page)
+        with self.assertRaises(TwilioAPIError):
+            sms_sync.sync_messages(client=client)
+
+        cursor = self.cursor()
+        self.assertEqual(cursor.next_page_uri, second_page)
+        self.assertIsNone(cursor.watermark)
+        self.assertEqual(cursor.run_watermark, SYNC_START + timedelta(minutes=5))
+        self.assertEqual(SmsMessage.objects.count(), 2)
+
+        pages, synced, finished = sms_sync.sync_messages(client=client)
+        self.assertEqual((pages, synced, finished), (2, 3, True))
+        # Se reanuda por la página guardada, sin volver a listar desde el principio
+        self.assertEqual(len(client.list_calls), 1)
+        self.assertEqual(client.fetched, [second_page, self.pages[1]['next_page_uri']])
+        self.assertEqual(self.cursor().watermark, SYNC_START + timedelta(minutes=5))
+        self.assertEqual(SmsMessage.objects.count(), 5)
+
+    def test_max_pages_leaves_cursor_for_next_run(self):
+        pages, synced, finished = sms_sync.sync_messages(client=ReplayTwilioClient(self.pages), max_pages=1)
+        self.assertEqual((pages, synced, finished), (1, 2, False))
+        self.assertEqual(self.cursor().next_page_uri, self.pages[0]['next_page_uri'])
+
+    @override_settings(TWILIO_SYNC_LOOKBACK_MINUTES=10)
+    def test_incremental_sync_asks_from_watermark_minus_lookback(self):
+        watermark = SYNC_START + timedelta(minutes=3)
+        SyncCursor.objects.create(name=sms_sync.CURSOR_NAME, watermark=watermark)
+        client = ReplayTwilioClient(recorded_pages([recorded_message(4), recorded_message(6)]))
+
+        sms_sync.sync_messages(client=client)
+
+        self.assertEqual(client.list_calls, [watermark - timedelta(minutes=10)])
+        self.assertEqual(self.cursor().watermark, SYNC_START + timedelta(minutes=6))
+
+    def test_watermark_never_moves_back(self):
+        watermark = SYNC_START + timedelta(minutes=30)
+        SyncCursor.objects.create(name=sms_sync.CURSOR_NAME, watermark=watermark)
+        # Solo cambios de estado de mensajes anteriores al watermark (dentro del margen)
+        sms_sync.sync_messages(client=ReplayTwilioClient(recorded_pages([recorded_message(25)])))
+        self.assertEqual(self.cursor().watermark, watermark)
+
+    def test_replaying_pages_is_idempotent_and_updates_status(self):
+        sms_sync.sync_messages(client=ReplayTwilioClient(self.pages))
+        updated = [recorded_message(number, 'undelivered' if number == 2 else 'delivered') for number in range(1, 6)]
+
+        sms_sync.sync_messages(client=ReplayTwilioClient(recorded_pages(updated)), full=True)
+
+        self.assertEqual(SmsMessage.objects.count(), 5)
+        message = SmsMessage.objects.get(sid=recorded_message(2)['sid'])
+        self.assertEqual((message.status, message.error_code), ('undelivered', 30003))
+        self.assertEqual(message.date_sent, SYNC_START + timedelta(minutes=2))
+
+
+class SmsEncodingTests(TestCase):
+    """Codificación y segmentos de los SMS (sms_encoding)"""
+
+    def test_gsm7_segments(self):
+        self.assertEqual(sms_encoding.count_segments(''), 0)
+        self.assertEqual(sms_encoding.count_segments('a' * 160), 1)
+        self.assertEqual(sms_encoding.count_segments('a' * 161), 2)
+        self.assertEqual(sms_encoding.count_segments('a' * 306), 2)
+        self.assertEqual(sms_encoding.count_segments('a' * 307), 3)
+        # Los caracteres de la tabla de extensión ocupan dos septetos
+        self.assertEqual(sms_encoding.count_segments('€' * 80), 1)
+        self.assertEqual(sms_encoding.count_segments('€' * 81), 2)
+
+    def test_escape_and_surrogate_pairs_are_not_split(self):
+        # 306 septetos caben en dos partes si se divide la longitud, pero el escape del € no se parte
+        self.assertEqual(sms_encoding.count_segments('a' * 152 + '€' + 'a' * 152), 3)
+        self.assertEqual(sms_encoding.count_segments('á' * 66 + '😀' + 'á' * 66), 3)
+
+    def test_ucs2_segments(self):
+        self.assertEqual(sms_encoding.count_segments('á' * 70), 1)
+        self.assertEqual(sms_encoding.count_segments('á' * 71), 2)
+        self.assertEqual(sms_encoding.count_segments('😀' * 35), 1)
+        self.assertEqual(sms_encoding.count_segments('😀' * 36), 2)
+
+    def test_analyze_lists_characters_outside_gsm7(self):
+        analysis = sms_encoding.analyze('¿Vienes “mañana”? ó')
+        self.assertEqual(analysis['encoding'], sms_encoding.UCS2)
+        self.assertEqual(analysis['non_gsm'], ['“', '”', 'ó'])
+        self.assertEqual((analysis['segments'], analysis['per_segment']), (1, 70))
+        self.assertEqual(analysis['remaining'], 70 - analysis['length'])
+
+        analysis = sms_encoding.analyze('Precio: 5€')
+        self.assertEqual((analysis['encoding'], analysis['length'], analysis['non_gsm']), (sms_encoding.GSM7, 11, []))
+
+    def test_transliterate_keeps_gsm7_characters(self):
+        text = sms_encoding.transliterate('¡Canción “niña” — Ç ç 😀!')
+        self.assertEqual(text, '¡Cancion "niña" - Ç c !')
+        self.assertTrue(sms_encoding.is_gsm7(text))
+
+    def test_template_segments_reserve_room_for_placeholders(self):
+        self.assertEqual(sms_encoding.template_segments('Hola {nombre}'), 1)
+        self.assertEqual(sms_encoding.template_segments('a' * 150 + '{nombre}'), 2)
+
+    def test_personalize_adapts_values_to_template_encoding(self):
+        values = {'name': ' Ángela ', 'last_name': 'Núñez'}
+        self.assertEqual(sms_encoding.personalize('Hola {nombre} {apellidos}', values), 'Hola Angela Nuñez')
+        self.assertEqual(sms_encoding.personalize('Hola “{nombre}”', values), 'Hola “Ángela”')
+
+    def test_personalize_trims_values_to_fit_segments(self):
+        template = 'a' * 150 + ' {nombre}'
+        text = sms_encoding.personalize(template, {'name': 'Bartolomeo'}, max_segments=1)
+        self.assertEqual(text, 'a' * 150 + ' Bartolome')
+        self.assertEqual(sms_encoding.count_segments(text), 1)
+
+
+@override_settings(QUERY_PROFILING=True)
+class QueryProfilingMiddlewareTests(TestCase):
+    """Perfilado de consultas para usuarios staff (QueryProfilingMiddleware)"""
+
+    def setUp(self):
+        self.staff = User.objects.create_user('staff', is_staff=True)
+
+    def server_timing(self, response):
+        return dict(
+            (entry.split(';')[0], float(entry.split('dur=')[1].split(';')[0]))
+            for entry in response['Server-Timing'].split(', ')
+        )
+
+    def test_staff_html_page_gets_panel_and_template_time(self):
+        self.client.force_login(self.staff)
+        # donation_test usa render(), no TemplateResponse
+        response = self.client.get(reverse('landing:donation_test'))
+        self.assertEqual(response.status_code, 200)
+        timing = self.server_timing(response)
+        self.assertGreater(timing['tpl'], 0)
+        self.assertEqual(response.content.count(b'</body>'), 1)
+        self.assertContains(response, 'consultas')
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+
+    def test_json_response_gets_header_without_panel(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('landing:dashboard-chart-data'))
+        self.assertIn('sql', self.server_timing(response))
+        self.assertNotIn(b'</body>', response.content)
+        response.json()
+
+    def test_not_profiled_for_anonymous_or_non_staff_users(self):
+        anonymous = self.client.get(reverse('landing:donation_test'))
+        self.client.force_login(User.objects.create_user('persona'))
+        user = self.client.get(reverse('landing:donation_test'))
+        for response in (anonymous, user):
+            self.assertFalse(response.has_header('Server-Timing'))
+            self.assertEqual(response.content, anonymous.content)
+
+    @override_settings(QUERY_PROFILING=False)
+    def test_disabled_setting_skips_staff(self):
+        self.client.force_login(self.staff)
+        self.assertFalse(self.client.get(reverse('landing:donation_test')).has_header('Server-Timing'))
+
+
+class SegmentMembershipTests(TestCase):
+    """Membresía materializada de los segmentos guardados"""
+
+    def setUp(self):
+        self.doctor = make_registration(1, is_doctor=True)
+        self.other = make_registration(2, is_doctor=False)
+        self.segment = segments.create_segment('Médicos', {'is_doctor': 'true'})
+
+    def members(self):
+        return set(SegmentMembership.objects.filter(segment=self.segment).values_list('registration_id', flat=True))
+
+    def member_count(self):
+        return Segment.objects.get(pk=self.segment.pk).member_count
+
+    def test_create_materializes_matching_registrations(self):
+        self.assertEqual(self.members(), {self.doctor.pk})
+        self.assertEqual(self.member_count(), 1)
+
+    def test_saving_a_registration_updates_membership(self):
+        new_doctor = make_registration(3, is_doctor=True)
+        self.assertEqual(self.members(), {self.doctor.pk, new_doctor.pk})
+
+        self.doctor.is_doctor = False
+        self.doctor.save()
+        self.other.is_doctor = True
+        self.other.save()
+        self.assertEqual(self.members(), {self.other.pk, new_doctor.pk})
+        self.assertEqual(self.member_count(), 2)
+
+    def test_deleting_a_registration_updates_count(self):
+        self.doctor.delete()
+        self.assertEqual(self.members(), set())
+        self.assertEqual(self.member_count(), 0)
+
+    def test_bulk_import_needs_rebuild(self):
+        Registration.objects.bulk_create([
+            Registration(name='Importado', last_name='Bulk', postal_address='PR 00901', phone_number='7870000001',
+                         email='importado@example.com', is_doctor=True, unique_id='900001'),
+        ])
+        self.assertEqual(self.member_count(), 1)
+        self.assertEqual(segments.rebuild_segment(self.segment), 2)
+        self.assertEqual(self.member_count(), 2)
+
+    def test_segment_filter_uses_stored_membership(self):
+        queryset = RegistrationFilter({'segment': str(self.segment.pk)}, queryset=Registration.objects.all()).qs
+        self.assertEqual(list(queryset), [self.doctor])
+        self.assertEqual(list(segments.restrict(Registration.objects.all(), 'Médicos')), [self.doctor])
+
+
+class LiveUpdatesTests(TestCase):
+    """Stream SSE del dashboard y su hilo de consulta"""
+
+    @override_settings(LIVE_STREAM_SECONDS=0.2, LIVE_KEEPALIVE_SECONDS=0.05)
+    def test_stream_closes_after_max_lifetime(self):
+        subscriber = queue.Queue()
+        subscriber.put((1, '{}'))
+        with mock.patch.object(live.broadcaster, 'subscribe', return_value=subscriber), \
+                mock.patch.object(live.broadcaster, 'unsubscribe') as unsubscribe:
+            chunks = list(live.event_stream())
+        self.assertTrue(chunks[0].startswith('retry: '))
+        self.assertIn('id: 1\nevent: update\ndata: {}\n\n', chunks)
+        self.assertIn(': keepalive\n\n', chunks)
+        unsubscribe.assert_called_once_with(subscriber)
+
+    @override_settings(LIVE_POLL_SECONDS=0.01, LIVE_ERROR_BACKOFF_SECONDS=0.02)
+    def test_poll_errors_are_logged_and_backed_off(self):
+        broadcaster = live.Broadcaster()
+        broadcaster.subscribers.add(queue.Queue())
+        calls = []
+
+        def failing_poll():
+            calls.append(broadcaster.failures)
+            if len(calls) == 3:
+                broadcaster.subscribers.clear()
+            raise RuntimeError('consulta rota')
+
+        with mock.patch.object(broadcaster, 'poll', side_effect=failing_poll), \
+                self.assertLogs('landing.live', 'ERROR') as logs:
+            broadcaster.run()
+        self.assertEqual(calls, [0, 1, 2])
+        self.assertEqual(len(logs.records), 3)
+        self.assertIn('consulta rota', logs.output[0])
+
+
+class AggregateVersionTests(TestCase):
+    """Versión de los agregados: un contador en la base de datos"""
+
+    def setUp(self):
+        self.first = make_registration(1)
+        make_registration(2)
+
+    def assertVersionChanges(self, change):
+        before = registrations_version()
+        change()
+        cache.clear()  # Otro proceso no comparte la caché local: la versión no puede depender de ella
+        self.assertNotEqual(registrations_version(), before)
+
+    def test_version_is_one_query_and_stable_without_changes(self):
+        before = registrations_version()
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(registrations_version(), before)
+
+    def test_save_changes_version(self):
+        self.first.name = 'Otro nombre'
+        self.assertVersionChanges(self.first.save)
+
+    def test_delete_changes_version(self):
+        self.assertVersionChanges(self.first.delete)
+
+    def test_queryset_delete_changes_version(self):
+        self.assertVersionChanges(lambda: Registration.objects.filter(pk=self.first.pk).delete())
+
+    def test_specialty_rename_changes_version(self):
+        specialty = Specialty.objects.create(name='Especialidad de prueba')
+        specialty.name = 'Especialidad renombrada'
+        self.assertVersionChanges(specialty.save)
+
+    def test_segment_rebuild_changes_version(self):
+        segment = segments.create_segment('Médicos', {'is_doctor': 'true'})
+        self.assertVersionChanges(lambda: segments.rebuild_segment(segment))
+
+    def test_bulk_changes_are_closed_by_rebuild_all(self):
+        Registration.objects.filter(pk=self.first.pk).update(municipality='Ponce')
+        self.assertVersionChanges(segments.rebuild_all)
+
+    def test_cached_aggregate_recomputes_after_delete(self):
+        def count():
+            return Registration.objects.count()
+
+        self.assertEqual(cached_aggregate('total', {}, count), 2)
+        Registration.objects.filter(pk=self.first.pk).delete()
+        self.assertEqual(cached_aggregate('total', {}, count), 1)
+
+
+def segment_members(segment):
+    return set(SegmentMembership.objects.filter(segment=segment).values_list('registration_id', flat=True))
+
+
+class GeoParsingTests(TestCase):
+    """Código postal y municipio a partir de la dirección postal"""
+
+    def test_parse_address(self):
+        self.assertEqual(geo.parse_address('Urb. Villa Borinquen buzón 349 Lares PR 00669'), ('00669', 'Lares'))
+        self.assertEqual(geo.parse_address('Calle Bayamón 5, MAYAGUEZ PR 00680-1234'), ('00680', 'Mayagüez'))
+        # Gana el último municipio (el de la línea de ciudad), también si es un barrio
+        self.assertEqual(geo.parse_address('Ave. Ponce de León 100, Santurce, PR 00907'), ('00907', 'San Juan'))
+        self.assertEqual(geo.parse_address('Calle 3, Toa Baja, PR 00949'), ('00949', 'Toa Baja'))
+        self.assertEqual(geo.parse_address('Apartado 12345, Miami FL 33101'), ('', ''))
+        self.assertEqual(geo.parse_address(''), ('', ''))
+
+    def test_registration_is_parsed_on_save(self):
+        registration = make_registration(1, postal_address='HC 2 Box 100, Lares PR 00669')
+        self.assertEqual((registration.zip_code, registration.municipality), ('00669', 'Lares'))
+
+        registration.postal_address = 'Calle 1, Ponce PR 00716'
+        registration.save(update_fields=['postal_address'])
+        registration.refresh_from_db()
+        self.assertEqual((registration.zip_code, registration.municipality), ('00716', 'Ponce'))
+
+    def test_backfill_updates_existing_rows_and_segments(self):
+        registration = make_registration(1, postal_address='HC 2 Box 100, Lares PR 00669')
+        make_registration(2, postal_address='Sin dirección reconocible')
+        Registration.objects.update(zip_code='', municipality='')
+        segment = segments.create_segment('Lares', {'municipality': 'Lares'})
+        self.assertEqual(segment_members(segment), set())
+
+        out = io.StringIO()
+        call_command('backfill_geo', chunk_size=1, stdout=out)
+        self.assertIn('1 de 2 registros actualizados', out.getvalue())
+        registration.refresh_from_db()
+        self.assertEqual((registration.zip_code, registration.municipality), ('00669', 'Lares'))
+        self.assertEqual(segment_members(segment), {registration.pk})
+
+
+class SpecialtyNormalizationTests(TestCase):
+    """Especialidad canónica a partir del texto libre (specialties)"""
+
+    def setUp(self):
+        specialties.clear_alias_table()
+        self.addCleanup(specialties.clear_alias_table)
+
+    def specialty(self, name):
+        return Specialty.objects.get(name=name)
+
+    def test_specialty_key(self):
+        self.assertEqual(specialties.specialty_key('  Medicina  GENERAL.'), 'medicina general')
+        self.assertEqual(specialties.specialty_key('Ginecología/Obstetricia'), 'ginecologia obstetricia')
+        self.assertEqual(specialties.specialty_key(None), '')
+
+    def test_resolve_exact_and_fuzzy(self):
+        self.assertEqual(specialties.resolve('Pediatra'), self.specialty('Pediatría').pk)
+        self.assertEqual(specialties.resolve('Médico de Familia'), self.specialty('Medicina de Familia').pk)
+        # Errores de escritura
+        self.assertEqual(specialties.resolve('cardiolgia'), self.specialty('Cardiología').pk)
+        self.assertIsNone(specialties.resolve('astronauta'))
+        self.assertIsNone(specialties.resolve('  '))
+
+    def test_new_alias_applies_without_waiting_for_ttl(self):
+        self.assertIsNone(specialties.resolve('MFG'))
+        SpecialtyAlias.objects.create(key='mfg', specialty=self.specialty('Medicina de Familia'))
+        registration = make_registration(1, is_doctor=True, specialty='MFG')
+        self.assertEqual(registration.canonical_specialty, self.specialty('Medicina de Familia'))
+
+    def test_normalize_all_updates_in_bulk_and_reports_unresolved(self):
+        make_registration(1, is_doctor=True, specialty='pediatra')
+        make_registration(2, is_doctor=True, specialty='Pediatra ')
+        make_registration(3, is_doctor=True, specialty='astronauta')
+        Registration.objects.update(canonical_specialty=None)
+
+        updated, unresolved = specialties.normalize_all()
+        self.assertEqual((updated, unresolved), (2, [('astronauta', 1)]))
+        self.assertEqual(
+            Registration.objects.filter(canonical_specialty=self.specialty('Pediatría')).count(), 2
+        )
+        self.assertEqual(specialties.normalize_all(only_missing=True), (0, [('astronauta', 1)]))
+
+    def test_command_rebuilds_segments(self):
+        pediatrics = self.specialty('Pediatría')
+        registration = make_registration(1, is_doctor=True, specialty='pediatra')
+        Registration.objects.update(canonical_specialty=None)
+        segment = segments.create_segment('Pediatras', {'canonical_specialty': str(pediatrics.pk)})
+        self.assertEqual(segment_members(segment), set())
+
+        call_command('normalize_specialties', stdout=io.StringIO())
+        self.assertEqual(segment_members(segment), {registration.pk})
+
+
+class FacetCountsTests(TestCase):
+    """Conteos por opción de los filtros y estadísticas del dashboard (una consulta)"""
+
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        make_registration(1, is_doctor=True, is_licensed=True)
+        make_registration(2, is_doctor=True)
+        make_registration(3)
+        old = registered_on(self.today - timedelta(days=facets.RECENT_DAYS), 4)
+        Registration.objects.filter(pk=old.pk).update(is_doctor=True)
+        registered_on(self.today - timedelta(days=facets.RECENT_DAYS - 1), 5)
+
+    def test_each_facet_ignores_its_own_filter(self):
+        with self.assertNumQueries(2):  # versión de los datos + el agregado
+            counts = facets.facet_counts({'is_doctor': 'true'})
+        self.assertEqual(counts['stats']['total_registros'], 3)
+        self.assertEqual(counts['stats']['total_colegiados'], 1)
+        self.assertEqual(counts['facets']['is_doctor'], {True: 3, False: 2})
+        self.assertEqual(counts['facets']['is_licensed'], {True: 1, False: 2})
+
+        with self.assertNumQueries(1):
+            self.assertEqual(facets.facet_counts({'is_doctor': 'true'}), counts)
+
+    def test_recent_registrations_are_the_last_seven_calendar_days(self):
+        counts = facets.facet_counts({})
+        self.assertEqual(counts['stats']['total_registros'], 5)
+        self.assertEqual(counts['stats']['registros_recientes'], 4)
+
+    def test_cached_recent_count_follows_the_date(self):
+        self.assertEqual(facets.facet_counts({})['stats']['registros_recientes'], 4)
+        later = self.today + timedelta(days=3)
+        with mock.patch.object(facets.timezone, 'localdate', return_value=later):
+            self.assertEqual(facets.facet_counts({})['stats']['registros_recientes'], 3)
+
+    @override_settings(DASHBOARD_ITEMS_PER_PAGE=2)
+    def test_dashboard_paginator_uses_the_facet_total(self):
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        response = self.client.get(reverse('landing:dashboard'), {'is_doctor': 'true', 'page': 2})
+        self.assertEqual(response.status_code, 200)
+        page = response.context['registrations']
+        self.assertEqual((page.paginator.count, page.paginator.num_pages), (3, 2))
+        self.assertEqual(len(page.object_list), 1)
+        self.assertContains(response, 'Sí (3)')
+
+
+class RecordingTransport(Transport):
+    """Transporte de prueba: guarda las direcciones enviadas y falla con los errores de `failures`"""
+
+    name = 'test'
+
+    def __init__(self, failures=None):
+        self.failures = failures or {}
+        self.sent = []
+
+    def send(self, message):
+        address = message.to[0]
+        error = self.failures.get(address)
+        if error is not None:
+            raise error
+        self.sent.append(address)
+
+
+def email_campaign(**options):
+    return campaigns.create_campaign(
+        Campaign.CHANNEL_EMAIL, '<p>Hola {{ nombre_completo }}</p>', subject='Prueba', **options
+    )
+
+
+class CampaignEngineTests(TestCase):
+    """Audiencia, deduplicación y reanudación de las campañas de email"""
+
+    def setUp(self):
+        for number in range(1, 5):
+            make_registration(number)
+        make_registration(5, email='PERSONA1@example.com')  # Misma dirección que el registro 1
+        make_registration(6, accepts_promotions=False)
+        make_registration(7, email='')
+
+    def test_materialize_dedups_addresses_and_runs_once(self):
+        campaign = email_campaign()
+        campaigns.materialize_recipients(campaign)
+        addresses = sorted(campaign.recipients.values_list('address', flat=True))
+        self.assertEqual(addresses, [f'persona{number}@example.com' for number in range(1, 5)])
+
+        make_registration(8)
+        campaigns.materialize_recipients(campaign)
+        self.assertEqual(campaign.recipients.count(), 4)
+
+    def test_dashboard_campaigns_require_promotions_consent(self):
+        campaign = email_campaign()
+        self.assertNotIn('persona6@example.com', campaign_addresses(campaign))
+
+    def test_preset_campaigns_keep_the_whole_audience(self):
+        campaign = email_campaign(promotions_only=False)
+        self.assertIn('persona6@example.com', campaign_addresses(campaign))
+        self.assertEqual(campaign.recipients.count(), 5)
+
+    def test_interrupted_campaign_resumes_at_first_pending(self):
+        campaign = email_campaign()
+        first = RecordingTransport()
+        campaign = campaigns.run_campaign(campaign, transport=first, limit=2)
+        self.assertEqual(campaign.status, Campaign.STATUS_PAUSED)
+        self.assertEqual(len(first.sent), 2)
+
+        second = RecordingTransport()
+        campaign = campaigns.run_campaign(campaign, transport=second)
+        self.assertEqual(campaign.status, Campaign.STATUS_DONE)
+        self.assertEqual(set(first.sent) | set(second.sent), set(campaign_addresses(campaign)))
+        self.assertFalse(set(first.sent) & set(second.sent))
+        self.assertEqual((campaign.sent, campaign.failed, campaign.total), (4, 0, 4))
+        self.assertEqual(SendAttempt.objects.filter(recipient__campaign=campaign).count(), 4)
+
+
+def campaign_addresses(campaign):
+    campaigns.materialize_recipients(campaign)
+    return list(campaign.recipients.values_list('address', flat=True))
+
+
+class RetryScriptTests(TestCase):
+    """Los scripts de reintento ignoran las simulaciones (--dry-run)"""
+
+    def setUp(self):
+        make_registration(1)
+
+    def test_dry_run_does_not_hide_the_real_campaign(self):
+        subject, html, text = email_templates.load_preset('transparencia')
+        real = campaigns.create_campaign(
+            Campaign.CHANNEL_EMAIL, html, subject=subject, text_message=text, promotions_only=False
+        )
+        campaigns.materialize_recipients(real)
+        real.recipients.update(status=CampaignRecipient.STATUS_FAILED)
+
+        with mock.patch('sys.stdout', new_callable=io.StringIO):
+            call_command('send_campaign', preset='transparencia', transport='console', interactive=False)
+        dry_run = Campaign.objects.exclude(pk=real.pk).get()
+        self.assertEqual(dry_run.transport, Campaign.TRANSPORT_CONSOLE)
+        self.assertFalse(dry_run.promotions_only)
+        self.assertEqual(campaigns.latest_email_campaign(subject), real)
+
+        import retry_failed
+        with mock.patch.object(retry_failed, 'call_command') as command, \
+                mock.patch.object(sys, 'argv', ['retry_failed.py']):
+            retry_failed.main()
+        command.assert_called_once_with('send_campaign', campaign=real.pk, retry_failed=True)
+
+
+class RecordingHandler:
+    """Servidor SMTP de prueba (aiosmtpd): guarda el sobre de cada mensaje"""
+
+    def __init__(self):
+        self.envelopes = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.envelopes.append((envelope.mail_from, envelope.rcpt_tos))
+        return '250 OK'
+
+
+@unittest.skipIf(Controller is None, 'Las pruebas de SMTP necesitan aiosmtpd')
+class SmtpTransportTests(TestCase):
+    """SmtpTransport contra un servidor SMTP local"""
+
+    def setUp(self):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        self.handler = RecordingHandler()
+        controller = Controller(self.handler, hostname='127.0.0.1', port=port)
+        controller.start()
+        self.addCleanup(controller.stop)
+        settings = override_settings(
+            EMAIL_HOST='127.0.0.1', EMAIL_PORT=port,
+            EMAIL_USE_TLS=False, EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='',
+            CAMPAIGN_FROM_EMAIL='Campaña <campanas@correo.españa.com>',
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        make_registration(1)
+        make_registration(2, email='jose@correo.españa.com')
+        make_registration(3, email='persona3@example.com\nBcc: otra@example.com')
+
+    def run_campaign(self):
+        campaign = campaigns.run_campaign(email_campaign(), transport=SmtpTransport(pool_size=1))
+        return campaign, dict(campaign.recipients.values_list('address', 'status'))
+
+    def check_delivery(self):
+        campaign, statuses = self.run_campaign()
+        self.assertEqual(campaign.status, Campaign.STATUS_DONE)
+        self.assertEqual(statuses['jose@correo.españa.com'], CampaignRecipient.STATUS_SENT)
+        # La dirección que no se puede codificar falla sola, sin tumbar la campaña
+        self.assertEqual(statuses['persona3@example.com\nBcc: otra@example.com'], CampaignRecipient.STATUS_DEAD)
+        self.assertEqual(self.handler.envelopes[0][0], 'campanas@correo.xn--espaa-rta.com')
+        recipients = sorted(to for mail_from, rcpt_tos in self.handler.envelopes for to in rcpt_tos)
+        self.assertEqual(recipients, [
+            'jose@correo.xn--espaa-rta.com', 'persona1@example.com',
+        ])
+
+    def test_non_ascii_domains_are_sent_in_punycode(self):
+        self.check_delivery()
+
+    def test_non_ascii_domains_are_sent_in_punycode_when_pipelining(self):
+        with mock.patch.object(smtplib.SMTP, 'has_extn', lambda smtp, name: name.lower() == 'pipelining'):
+            self.check_delivery()
+
+
+class FakeClock:
+    """Sustituye al módulo time en ratelimit: sleep() solo avanza el reloj"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class RateLimitTests(TestCase):
+    """TokenBucket y control de tasa AIMD"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(ratelimit, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    # Tasas potencia de dos: las esperas son exactas en coma flotante
+
+    def test_bucket_spaces_sends_evenly(self):
+        bucket = ratelimit.TokenBucket(8)
+        self.assertEqual(bucket.acquire(), 0)
+        self.assertEqual([bucket.acquire() for _ in range(4)], [0.125] * 4)
+        self.assertEqual(self.clock.now, 1000.5)
+
+    def test_bucket_grants_more_than_capacity_as_debt(self):
+        bucket = ratelimit.TokenBucket(8)
+        self.assertEqual(bucket.acquire(3), 0)
+        self.assertEqual(bucket.acquire(), 0.375)
+
+    def test_set_rate_keeps_accumulated_tokens(self):
+        bucket = ratelimit.TokenBucket(1, capacity=4)
+        bucket.acquire(4)
+        self.clock.now += 2
+        bucket.set_rate(8)
+        self.assertEqual(bucket.tokens, 2)
+        self.assertEqual(bucket.acquire(3), 0.125)
+
+    def test_aimd_increases_additively_and_decreases_multiplicatively(self):
+        controller = ratelimit.AimdRateController(10, min_rate=1, max_rate=14, increase=1.0, decrease=0.5, cooldown=1.0)
+        controller.success()
+        self.assertAlmostEqual(controller.rate, 10.1)
+        controller.throttled()
+        self.assertAlmostEqual(controller.rate, 5.05)
+        # Los avisos de los mensajes ya en vuelo no vuelven a recortar
+        controller.throttled()
+        self.assertAlmostEqual(controller.rate, 5.05)
+        self.clock.now += 1
+        controller.throttled()
+        self.assertAlmostEqual(controller.rate, 2.525)
+        self.assertEqual(controller.throttles, 3)
+
+    def test_aimd_rate_stays_within_limits(self):
+        controller = ratelimit.AimdRateController(2, min_rate=1.5, max_rate=2.05, cooldown=0)
+        for _ in range(5):
+            controller.success()
+        self.assertEqual(controller.rate, 2.05)
+        for _ in range(5):
+            controller.throttled()
+        self.assertEqual(controller.rate, 1.5)
+
+        controller.limit(1)
+        self.assertEqual((controller.rate, controller.min_rate, controller.max_rate), (1, 1, 1))
+
+    def test_achieved_rate(self):
+        controller = ratelimit.AimdRateController(4, min_rate=4, max_rate=4)
+        self.assertEqual(controller.achieved_rate, 0.0)
+        for _ in range(5):
+            controller.acquire()
+            controller.success()
+        self.assertAlmostEqual(controller.achieved_rate, 5 / 1.0)
+
+
+class CompiledTemplateTests(TestCase):
+    """Plantillas de email compiladas en trozos fijos y huecos"""
+
+    source = 'Hola {{ nombre_completo }}, <{{email_destinatario}}> {{ nombre_completo }} {{ otro }}'
+
+    def test_render_fills_known_placeholders_only(self):
+        template = email_templates.CompiledTemplate(self.source)
+        context = {'nombre_completo': 'José Núñez', 'email_destinatario': 'jose@example.com'}
+        expected = 'Hola José Núñez, <jose@example.com> José Núñez {{ otro }}'
+        self.assertEqual(template.render(context), expected)
+        self.assertEqual(template.render_bytes(context), expected.encode('utf-8'))
+        self.assertEqual(template.render_bytes(context, 'latin-1'), expected.encode('latin-1'))
+        # Renderizar no modifica la plantilla compilada
+        self.assertEqual(template.render({}), self.source)
+
+    def test_compiled_once_per_source(self):
+        self.assertIs(email_templates.compile_template(self.source), email_templates.compile_template(self.source))
+        self.assertEqual(email_templates.render('{{ a }}{{ b }}', {'b': 2}), '{{ a }}2')
+
+    def test_preset_only_keeps_recipient_placeholders(self):
+        subject, html, text = email_templates.load_preset('encuesta')
+        recipient = {'nombre_completo', 'email_destinatario'}
+        self.assertTrue(subject)
+        self.assertLessEqual(set(email_templates.PLACEHOLDER_RE.findall(html)), recipient)
+        self.assertLessEqual(set(email_templates.PLACEHOLDER_RE.findall(text)), recipient)
+
+    def test_recipient_context_defaults_the_name(self):
+        context = email_templates.recipient_context('  ', 'jose@example.com')
+        self.assertEqual(context['nombre_completo'], email_templates.DEFAULT_NAME)
+
+
+class MessageSkeletonTests(TestCase):
+    """Mensajes MIME pre-codificados (mime.MessageSkeleton)"""
+
+    def setUp(self):
+        self.html = '<p>Hola {{ nombre_completo }}</p>\n<p>' + 'á' * 120 + '</p>\n<p>{{ otro }}</p>'
+        self.text = 'Hola {{ nombre_completo }}\nEnviado a {{ email_destinatario }}\n'
+        self.skeleton = mime.MessageSkeleton(
+            'Campaña de ñandúes', 'Campaña <campanas@example.com>', self.html, self.text
+        )
+        self.context = {'nombre_completo': 'José Núñez', 'email_destinatario': 'jose@example.com'}
+
+    def test_build_decodes_to_the_rendered_templates(self):
+        message = self.skeleton.build('jose@example.com', self.context)
+        self.assertEqual((message.to, message.subject), (['jose@example.com'], 'Campaña de ñandúes'))
+
+        parsed = email.message_from_bytes(message.data, policy=email.policy.default)
+        self.assertEqual(parsed['Subject'], 'Campaña de ñandúes')
+        self.assertEqual(parsed['From'], 'Campaña <campanas@example.com>')
+        self.assertEqual(parsed['To'], 'jose@example.com')
+        text, html = [part.get_content().replace('\r\n', '\n') for part in parsed.iter_parts()]
+        self.assertEqual(text, 'Hola José Núñez\nEnviado a jose@example.com\n')
+        self.assertEqual(html, email_templates.render(self.html, self.context))
+
+    def test_body_lines_are_short_and_crlf_terminated(self):
+        data = self.skeleton.build('jose@example.com', self.context).data
+        lines = data.split(b'\r\n\r\n', 1)[1].split(b'\r\n')
+        self.assertNotIn(b'\n', b''.join(lines))
+        self.assertLessEqual(max(len(line) for line in lines), 76)
+
+    def test_each_message_has_its_own_headers(self):
+        first = email.message_from_bytes(self.skeleton.build('a@example.com', {}).data)
+        second = email.message_from_bytes(self.skeleton.build('b@example.com', {}).data)
+        self.assertNotEqual(first['Message-ID'], second['Message-ID'])
+        self.assertEqual((first['To'], second['To']), ('a@example.com', 'b@example.com'))
+        self.assertIn('{{ nombre_completo }}', first.get_payload(0).get_payload(decode=True).decode())
+
+
+@unittest.skipIf(mock_aws is None, 'Las pruebas de SES necesitan boto3 y moto')
+@override_settings(AWS_SES_REGION='us-east-1', CAMPAIGN_FROM_EMAIL='Campaña <campanas@example.com>')
+class SesBulkTransportTests(TestCase):
+    """SesBulkTransport contra SES simulado con moto"""
+
+    def setUp(self):
+        environment = mock.patch.dict('os.environ', {
+            'AWS_ACCESS_KEY_ID': 'testing',
+            'AWS_SECRET_ACCESS_KEY': 'testing',
+            'AWS_DEFAULT_REGION': 'us-east-1',
+        })
+        environment.start()
+        self.addCleanup(environment.stop)
+        ses = mock_aws()
+        ses.start()
+        self.addCleanup(ses.stop)
+        self.ses = boto3.client('ses', region_name='us-east-1')
+        self.ses.verify_domain_identity(Domain='example.com')
+        self.campaign = Campaign(subject='Hola', message='<p>Hola {{ nombre_completo }}</p>', text_message='')
+
+    def transport(self):
+        transport = SesBulkTransport()
+        transport.open()
+        transport.rate_controller = None  # Sin esperar a la tasa de la cuenta simulada (1 email/s)
+        self.addCleanup(transport.close)
+        return transport
+
+    def messages(self, count, campaign=None):
+        return [
+            campaigns.build_templated_email(campaign or self.campaign, f'Persona {i}', f'persona{i}@example.org')
+            for i in range(count)
+        ]
+
+    def templates(self):
+        return {
+            item['Name']: self.ses.get_template(TemplateName=item['Name'])['Template']
+            for item in self.ses.list_templates()['TemplatesMetadata']
+        }
+
+    def test_sends_50_destinations_per_call(self):
+        transport = self.transport()
+        with mock.patch.object(
+            transport.client, 'send_bulk_templated_email', wraps=transport.client.send_bulk_templated_email
+        ) as send_bulk:
+            results = dict(transport.send_many(self.messages(120)))
+
+        self.assertEqual([len(c.kwargs['Destinations']) for c in send_bulk.call_args_list], [50, 50, 20])
+        self.assertEqual(sorted(results), list(range(120)))
+        self.assertTrue(all(error is None for error in results.values()))
+        destination = send_bulk.call_args_list[0].kwargs['Destinations'][1]
+        self.assertEqual(destination['Destination']['ToAddresses'], ['persona1@example.org'])
+        self.assertIn('"nombre_completo": "Persona 1"', destination['ReplacementTemplateData'])
+
+    def test_template_is_created_once_per_content(self):
+        list(self.transport().send_many(self.messages(3)))
+        templates = self.templates()
+        self.assertEqual(len(templates), 1)
+        template = next(iter(templates.values()))
+        self.assertEqual(template['SubjectPart'], 'Hola')
+        self.assertEqual(template['HtmlPart'], '<p>Hola {{nombre_completo}}</p>')
+
+        # Otro envío de la misma campaña reutiliza la plantilla
+        list(self.transport().send_many(self.messages(3)))
+        self.assertEqual(len(self.templates()), 1)
+
+        # Editar la campaña registra la nueva versión
+        edited = Campaign(subject='Hola de nuevo', message=self.campaign.message, text_message='')
+        list(self.transport().send_many(self.messages(3, edited)))
+        self.assertEqual(
+            sorted(t['SubjectPart'] for t in self.templates().values()), ['Hola', 'Hola de nuevo']
+        )
+
+    def test_template_changed_in_ses_is_updated(self):
+        list(self.transport().send_many(self.messages(1)))
+        name, template = next(iter(self.templates().items()))
+        self.ses.update_template(Template={**template, 'SubjectPart': 'Editada a mano'})
+
+        list(self.transport().send_many(self.messages(1)))
+        self.assertEqual(self.templates()[name]['SubjectPart'], 'Hola')
+
+    @override_settings(CAMPAIGN_SES_BULK_RETRIES=1)
+    def test_destination_statuses_map_to_sent_retry_and_dead(self):
+        for number in range(3):
+            make_registration(number)
+        campaign = email_campaign(transport=Campaign.TRANSPORT_SES_BULK)
+        transport = self.transport()
+        statuses = {
+            'persona0@example.com': {'Status': 'Success', 'MessageId': 'id-0'},
+            'persona1@example.com': {'Status': 'MessageRejected', 'Error': 'Email address is not verified'},
+            'persona2@example.com': {'Status': 'TransientFailure'},
+        }
+
+        def send_bulk(**request):
+            return {'Status': [statuses[d['Destination']['ToAddresses'][0]] for d in request['Destinations']]}
+
+        with mock.patch.object(transport.client, 'send_bulk_templated_email', side_effect=send_bulk) as call, \
+                mock.patch('landing.transports.time.sleep'):
+            campaign = campaigns.run_campaign(campaign, transport=transport)
+
+        # El fallo transitorio se reintenta una vez dentro del lote
+        self.assertEqual(call.call_count, 2)
+        self.assertEqual(dict(campaign.recipients.values_list('address', 'status')), {
+            'persona0@example.com': CampaignRecipient.STATUS_SENT,
+            'persona1@example.com': CampaignRecipient.STATUS_DEAD,
+            'persona2@example.com': CampaignRecipient.STATUS_RETRY,
+        })
+        self.assertEqual(campaign.status, Campaign.STATUS_RETRYING)
+        self.assertEqual((campaign.sent, campaign.failed), (1, 1))
+
+    def test_account_statuses_stop_the_campaign(self):
+        for number in range(3):
+            make_registration(number)
+        campaign = email_campaign(transport=Campaign.TRANSPORT_SES_BULK)
+        transport = self.transport()
+        response = {'Status': [{'Status': 'AccountSendingPaused'}] * 3}
+
+        with mock.patch.object(transport.client, 'send_bulk_templated_email', return_value=response):
+            campaign = campaigns.run_campaign(campaign, transport=transport)
+
+        self.assertEqual(campaign.status, Campaign.STATUS_FAILED)
+        self.assertEqual(set(campaign.recipients.values_list('status', flat=True)), {CampaignRecipient.STATUS_PENDING})
+
+
+class QuotaSesTransport(SesTransport):
+    """SesTransport con la cuota ya leída; send() solo guarda la dirección"""
+
+    def __init__(self, remaining):
+        super().__init__()
+        self.client = object()
+        self.quota = {'Max24HourSend': 200.0, 'SentLast24Hours': 200.0 - remaining, 'MaxSendRate': 14.0}
+        self.remaining = remaining
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message.to[0])
+
+
+class SesQuotaTests(TestCase):
+    """Reserva de la cuota de 24 horas de SES antes de cada bloque"""
+
+    def test_reserve_discounts_what_fits(self):
+        transport = QuotaSesTransport(remaining=3)
+        self.assertEqual([transport.reserve(2), transport.reserve(2), transport.reserve(1)], [2, 1, 0])
+        self.assertEqual(transport.remaining, 0)
+
+        transport.remaining = None  # Max24HourSend = -1: sin límite
+        self.assertEqual(transport.reserve(1000), 1000)
+
+    def test_send_many_sends_what_fits_and_raises(self):
+        transport = QuotaSesTransport(remaining=2)
+        messages = [mock.Mock(to=[f'persona{number}@example.com']) for number in range(3)]
+        results = []
+        with self.assertRaises(QuotaExhausted):
+            for result in transport.send_many(messages):
+                results.append(result)
+        transport.close()
+        self.assertEqual(sorted(index for index, error in results), [0, 1])
+        self.assertEqual(len(transport.sent), 2)
+
+    def test_exhausted_quota_pauses_campaign_with_the_rest_pending(self):
+        for number in range(1, 4):
+            make_registration(number)
+        transport = QuotaSesTransport(remaining=2)
+        campaign = campaigns.run_campaign(email_campaign(), transport=transport)
+        self.assertEqual((campaign.status, campaign.sent), (Campaign.STATUS_PAUSED, 2))
+        self.assertIn('Cuota de 24 horas', campaign.error)
+        self.assertEqual(campaign.recipients.filter(status=CampaignRecipient.STATUS_PENDING).count(), 1)
+
+        transport.remaining = 10
+        campaign = campaigns.run_campaign(campaign, transport=transport)
+        self.assertEqual((campaign.status, campaign.sent), (Campaign.STATUS_DONE, 3))
+        self.assertEqual(len(set(transport.sent)), 3)
+
+
+class KeysetChunksTests(TestCase):
+    """Recorrido de la audiencia por clave (campaigns.keyset_chunks)"""
+
+    def setUp(self):
+        self.ids = [make_registration(number).pk for number in range(1, 6)]
+
+    def test_chunks_by_primary_key_without_offset(self):
+        with CaptureQueriesContext(connection) as queries:
+            chunks = list(campaigns.keyset_chunks(Registration.objects.all(), ['email'], size=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual([row['id'] for chunk in chunks for row in chunk], self.ids)
+        self.assertEqual(set(chunks[0][0]), {'id', 'email'})
+        self.assertEqual(len(queries), 3)
+        self.assertFalse(any('OFFSET' in query['sql'].upper() for query in queries))
+
+    def test_rows_removed_or_added_while_sending_do_not_shift_chunks(self):
+        bound = campaigns.upper_bound(Registration.objects.all())
+        seen = []
+        for chunk in campaigns.keyset_chunks(Registration.objects.all(), ['email'], size=2, upper_bound=bound):
+            seen.extend(row['id'] for row in chunk)
+            if len(seen) == 2:
+                Registration.objects.filter(pk=self.ids[0]).delete()
+                make_registration(6)
+        self.assertEqual(seen, self.ids)
+
+    def test_exact_multiple_of_size(self):
+        chunks = list(campaigns.keyset_chunks(Registration.objects.filter(pk__lte=self.ids[3]), ['email'], size=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2])
+
+
+class RecordDeliveriesTests(TestCase):
+    """Escritura en bloque del estado de los destinatarios (record_deliveries)"""
+
+    def setUp(self):
+        for number in range(1, 4):
+            make_registration(number)
+        self.campaign = email_campaign()
+        campaigns.materialize_recipients(self.campaign)
+        campaigns.refresh_counters(self.campaign)
+        self.rows = list(self.campaign.recipients.values('id', 'address', 'name', 'attempts'))
+
+    def test_upserts_recipients_and_increments_counters(self):
+        error = SendError('550 No such user', 550)
+        campaigns.record_deliveries(self.campaign, RecordingTransport(), [
+            (self.rows[0], None),
+            (self.rows[1], error),
+        ])
+
+        self.campaign.refresh_from_db()
+        self.assertEqual((self.campaign.total, self.campaign.sent, self.campaign.failed), (3, 1, 1))
+        statuses = dict(self.campaign.recipients.values_list('address', 'status'))
+        self.assertEqual(statuses, {
+            'persona1@example.com': CampaignRecipient.STATUS_SENT,
+            'persona2@example.com': CampaignRecipient.STATUS_DEAD,
+            'persona3@example.com': CampaignRecipient.STATUS_PENDING,
+        })
+        failed = CampaignRecipient.objects.get(pk=self.rows[1]['id'])
+        self.assertEqual((failed.attempts, failed.error), (1, '550 No such user'))
+        # El upsert no crea filas nuevas
+        self.assertEqual(CampaignRecipient.objects.count(), 3)
+        attempts = SendAttempt.objects.order_by('recipient_id')
+        self.assertEqual(
+            [(a.recipient_id, a.number, a.status, a.transport) for a in attempts],
+            [(self.rows[0]['id'], 1, 'sent', 'test'), (self.rows[1]['id'], 1, 'failed', 'test')],
+        )
+
+    def test_counters_match_recount(self):
+        campaigns.record_deliveries(self.campaign, RecordingTransport(), [
+            (row, None if index % 2 == 0 else SendError('554 Rechazado', 554)) for index, row in enumerate(self.rows)
+        ])
+        self.campaign.refresh_from_db()
+        incremental = (self.campaign.sent, self.campaign.failed)
+        campaigns.refresh_counters(self.campaign)
+        self.campaign.refresh_from_db()
+        self.assertEqual(incremental, (self.campaign.sent, self.campaign.failed))
+        self.assertEqual(incremental, (2, 1))
+
+    def test_empty_batch_does_nothing(self):
+        with self.assertNumQueries(0):
+            campaigns.record_deliveries(self.campaign, RecordingTransport(), [])
+
+    def test_send_loop_writes_state_in_batches(self):
+        for number in range(4, 26):
+            make_registration(number)
+        campaign = email_campaign()
+        with override_settings(CAMPAIGN_EMAIL_STATE_BATCH=10), \
+                mock.patch.object(campaigns, 'record_deliveries', wraps=campaigns.record_deliveries) as record:
+            campaign = campaigns.run_campaign(campaign, transport=RecordingTransport())
+        self.assertEqual([len(c.args[2]) for c in record.call_args_list], [10, 10, 5])
+        self.assertEqual((campaign.status, campaign.sent, campaign.total), (Campaign.STATUS_DONE, 25, 25))
+
+
+class RetryQueueTests(TestCase):
+    """Cola de reintentos: clases de fallo, esperas y fallos de la cuenta del proveedor"""
+
+    def setUp(self):
+        for number in range(1, 4):
+            make_registration(number)
+        self.campaign = email_campaign()
+
+    def statuses(self):
+        return dict(self.campaign.recipients.values_list('address', 'status'))
+
+    def test_transient_failure_is_retried_until_dead(self):
+        transport = RecordingTransport({'persona1@example.com': SendError('451 Inténtalo luego', 451)})
+        policy = {'transient': {'retries': 1, 'base': 60, 'cap': 3600}}
+        with override_settings(CAMPAIGN_RETRY_POLICY=policy):
+            campaign = campaigns.run_campaign(self.campaign, transport=transport)
+            self.assertEqual(campaign.status, Campaign.STATUS_RETRYING)
+            retry = campaign.recipients.get(address='persona1@example.com')
+            self.assertEqual(retry.status, CampaignRecipient.STATUS_RETRY)
+            self.assertLessEqual(retry.next_attempt_at, timezone.now() + timedelta(seconds=60))
+
+            # Aún no vence: el worker no tiene nada que hacer
+            campaign.recipients.filter(pk=retry.pk).update(next_attempt_at=timezone.now() + timedelta(minutes=5))
+            with mock.patch.object(campaigns, 'get_transport', return_value=transport):
+                self.assertFalse(campaigns.process_retries())
+
+                campaign.recipients.filter(pk=retry.pk).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+                self.assertTrue(campaigns.process_retries())
+
+        campaign.refresh_from_db()
+        retry.refresh_from_db()
+        self.assertEqual((retry.status, retry.attempts), (CampaignRecipient.STATUS_DEAD, 2))
+        self.assertEqual(campaign.status, Campaign.STATUS_DONE)
+        self.assertEqual((campaign.sent, campaign.failed), (2, 1))
+
+    def test_retried_recipient_is_sent(self):
+        transport = RecordingTransport({'persona1@example.com': SendError('Conexión reiniciada')})
+        campaign = campaigns.run_campaign(self.campaign, transport=transport)
+        self.assertEqual(self.statuses()['persona1@example.com'], CampaignRecipient.STATUS_RETRY)
+
+        campaign.recipients.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        transport.failures = {}
+        with mock.patch.object(campaigns, 'get_transport', return_value=transport):
+            self.assertTrue(campaigns.process_retries())
+        campaign.refresh_from_db()
+        self.assertEqual(campaign.status, Campaign.STATUS_DONE)
+        self.assertEqual(self.statuses()['persona1@example.com'], CampaignRecipient.STATUS_SENT)
+        self.assertEqual(transport.sent.count('persona1@example.com'), 1)
+
+    def test_permanent_failure_is_dead_at_once(self):
+        transport = RecordingTransport({'persona1@example.com': SendError('550 No existe', 550)})
+        campaign = campaigns.run_campaign(self.campaign, transport=transport)
+        self.assertEqual(campaign.status, Campaign.STATUS_DONE)
+        self.assertEqual(self.statuses()['persona1@example.com'], CampaignRecipient.STATUS_DEAD)
+
+    def test_retry_delay_has_jitter_and_tolerates_partial_policy(self):
+        with override_settings(CAMPAIGN_RETRY_POLICY={'transient': {'retries': 3}}):
+            delays = [campaigns.retry_delay('transient', 3) for _ in range(50)]
+            self.assertIsNone(campaigns.retry_delay('transient', 4))
+        self.assertTrue(all(0 <= delay <= campaigns.RETRY_BASE_SECONDS * 4 for delay in delays))
+        self.assertGreater(len(set(delays)), 1)
+        self.assertIsNone(campaigns.retry_delay('permanent', 1))
+
+    def test_provider_failure_fails_campaign_and_keeps_recipients_pending(self):
+        error = SendError('No se pudo conectar: (535, bad credentials)', 535, provider=True)
+        transport = RecordingTransport({'persona2@example.com': error})
+        campaign = campaigns.run_campaign(self.campaign, transport=transport)
+
+        self.assertEqual(campaign.status, Campaign.STATUS_FAILED)
+        self.assertIn('535', campaign.error)
+        self.assertEqual(self.statuses()['persona2@example.com'], CampaignRecipient.STATUS_PENDING)
+        self.assertNotIn(CampaignRecipient.STATUS_DEAD, self.statuses().values())
+        self.assertEqual(campaign.failed, 0)
+
+        transport.failures = {}
+        campaign = campaigns.run_campaign(campaign, transport=transport)
+        self.assertEqual((campaign.status, campaign.sent), (Campaign.STATUS_DONE, 3))
+
+    def test_account_quota_pauses_campaign(self):
+        error = SendError('AccountDailyQuotaExceeded', 'AccountDailyQuotaExceeded')
+        transport = RecordingTransport({'persona2@example.com': error})
+        campaign = campaigns.run_campaign(self.campaign, transport=transport)
+        self.assertEqual(campaign.status, Campaign.STATUS_PAUSED)
+        self.assertEqual(campaign.error, 'AccountDailyQuotaExceeded')
+        self.assertEqual(self.statuses()['persona2@example.com'], CampaignRecipient.STATUS_PENDING)
+
+    def test_unexpected_error_fails_only_that_recipient(self):
+        error = UnicodeEncodeError('ascii', 'ñ', 0, 1, 'ordinal not in range(128)')
+        transport = RecordingTransport({'persona2@example.com': error})
+        campaign = campaigns.run_campaign(self.campaign, transport=transport)
+        self.assertEqual((campaign.status, campaign.sent, campaign.failed), (Campaign.STATUS_DONE, 2, 1))
+        recipient = campaign.recipients.get(address='persona2@example.com')
+        self.assertEqual(recipient.status, CampaignRecipient.STATUS_DEAD)
+        self.assertTrue(recipient.error.startswith('UnicodeEncodeError'))
+
+    def test_error_kinds(self):
+        self.assertEqual(SendError('451', 451).kind, 'transient')
+        self.assertEqual(SendError('554', 554).kind, 'permanent')
+        self.assertEqual(SendError('Timeout').kind, 'connection')
+        self.assertEqual(SendError('554 al conectar', 554, provider=True).kind, 'provider')
+        self.assertEqual(SendError('AccountSendingPaused', 'AccountSendingPaused').kind, 'provider')
+        self.assertEqual(SendError('ConfigurationSetDoesNotExist', 'ConfigurationSetDoesNotExist').kind, 'provider')
+        self.assertEqual(SendError('AccountThrottled', 'AccountThrottled').kind, 'transient')
+        self.assertEqual(SendError('MessageRejected', 'MessageRejected').kind, 'permanent')
+
+    @override_settings(EMAIL_HOST_USER='usuario', EMAIL_HOST_PASSWORD='clave', CAMPAIGN_SMTP_POOL_SIZE=2)
+    def test_smtp_login_failure_stops_without_dead_letters(self):
+        for number in range(4, 31):
+            make_registration(number)
+        campaign = email_campaign()
+        with mock.patch('landing.transports.smtplib.SMTP') as smtp:
+            smtp.return_value.login.side_effect = smtplib.SMTPAuthenticationError(535, b'bad credentials')
+            campaign = campaigns.run_campaign(campaign, transport=SmtpTransport())
+
+        self.assertEqual(campaign.status, Campaign.STATUS_FAILED)
+        self.assertEqual(set(campaign.recipients.values_list('status', flat=True)), {CampaignRecipient.STATUS_PENDING})
+        # Los mensajes que aún no salieron se cancelan en lugar de autenticarse uno a uno
+        self.assertLess(smtp.return_value.login.call_count, 30)
@@ -0,0 +1,749 @@
+"""
+Transportes de email para las campañas.
+
+Un transporte entrega un mensaje ya construido (un BulkMessage de mime.py o
+un EmailMessage de Django) y lanza
+SendError si no se pudo entregar. El motor de campañas (campaigns.py) no
+sabe nada del proveedor: el mismo envío, con su estado y reanudación, sirve
+para SMTP, Amazon SES o la consola (simulación). Con `rate_controller`
+los envíos siguen la tasa adaptativa del proveedor (ratelimit.py).
+
+    with get_transport('smtp') as transport:
+        transport.send(message)
+"""
+
+import hashlib
+import json
+import math
+import re
+import smtplib
+import ssl
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parseaddr
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.core.mail.message import sanitize_address
+
+from .email_templates import compile_template
+from .ratelimit import AimdRateController, backoff_delay
+
+
+# Códigos de error de AWS que indican que se superó la tasa de envío
+THROTTLING_CODES = {'Throttling', 'ThrottlingException', 'TooManyRequestsException', 'AccountThrottled'}
+
+# Duración aproximada de una llamada a la API de SES (s), para calcular los hilos
+SES_CALL_SECONDS = 0.2
+
+# Errores de SendBulkTemplatedEmail (de la llamada o de un destino) que se reintentan
+SES_RETRYABLE_CODES = THROTTLING_CODES | {'TransientFailure', 'Failed', 'ServiceUnavailable', 'InternalFailure'}
+
+# Errores de SES que son de la cuenta o de la configuración, no del destinatario:
+# fallarían igual con cualquier dirección
+SES_PROVIDER_CODES = {
+    'AccountSuspended', 'AccountSendingPaused', 'AccountSendingPausedException',
+    'ConfigurationSetDoesNotExist', 'ConfigurationSetDoesNotExistException',
+    'ConfigurationSetSendingPaused', 'ConfigurationSetSendingPausedException',
+    'MailFromDomainNotVerified', 'MailFromDomainNotVerifiedException',
+    'TemplateDoesNotExist', 'InvalidSendingPoolName',
+    'AccessDenied', 'AccessDeniedException', 'InvalidClientTokenId', 'SignatureDoesNotMatch',
+    'UnrecognizedClientException', 'ExpiredToken',
+}
+# Cuota de 24 horas agotada: la campaña se pausa como con QuotaExhausted
+SES_QUOTA_CODES = {'AccountDailyQuotaExceeded'}
+
+# Respuestas SMTP de autenticación (530 se requiere, 535 credenciales incorrectas)
+SMTP_AUTH_CODES = {530, 535}
+
+
+class SendError(Exception):
+    """
+    El proveedor no aceptó el mensaje; `code` es el código SMTP o el código
+    de error de AWS si lo hay. `provider` indica que el fallo no depende del
+    destinatario (no se pudo conectar o autenticar con el proveedor).
+    """
+
+    def __init__(self, message, code=None, provider=False):
+        super().__init__(message)
+        self.code = code
+        self.provider = provider
+
+    @property
+    def throttled(self):
+        """True si el proveedor pide bajar el ritmo (4xx de SMTP o Throttling de SES)"""
+        if isinstance(self.code, int):
+            return 400 <= self.code < 500
+        return self.code in THROTTLING_CODES
+
+    @property
+    def kind(self):
+        """
+        Clase del fallo. Los del destinatario van a la cola de reintentos
+        (CAMPAIGN_RETRY_POLICY): 'transient' (4xx de SMTP, throttling o fallo
+        temporal de SES), 'connection' (la conexión se cortó a mitad del
+        envío, timeout) o 'permanent' (5xx de SMTP, mensaje rechazado por
+        SES). Los de la cuenta detienen la campaña sin tocar a los
+        destinatarios: 'quota' (cuota diaria agotada) o 'provider' (no se
+        pudo conectar o autenticar, cuenta pausada, configuración inválida).
+        """
+        if self.code in SES_QUOTA_CODES:
+            return 'quota'
+        if self.provider or self.code in SES_PROVIDER_CODES:
+            return 'provider'
+        if self.code is None:
+            return 'connection'
+        if isinstance(self.code, int):
+            return 'transient' if 400 <= self.code < 500 else 'permanent'
+        return 'transient' if self.code in SES_RETRYABLE_CODES else 'permanent'
+
+
+class QuotaExhausted(Exception):
+    """
+    El proveedor no admite más envíos por ahora (cuota de 24 horas). Los
+    mensajes que no se llegaron a enviar deben quedar pendientes.
+    """
+
+
+class TemplatedMessage:
+    """
+    Un destinatario de un envío con la plantilla registrada en el proveedor:
+    la plantilla sin personalizar y los valores de los marcadores, en lugar
+    del mensaje ya construido.
+    """
+
+    __slots__ = ('from_email', 'to', 'subject', 'html', 'text', 'context')
+
+    def __init__(self, from_email, to, subject, html, text, context):
+        self.from_email = from_email
+        self.to = to
+        self.subject = subject
+        self.html = html
+        self.text = text
+        self.context = context
+
+    def recipients(self):
+        return self.to
+
+
+class Transport:
+    name = ''
+    # True si espera TemplatedMessage (el proveedor personaliza) en vez de mensajes construidos
+    templated = False
+    # AimdRateController que marca el ritmo de deliver(); None = sin límite
+    rate_controller = None
+
+    @property
+    def provider(self):
+        """Clave del proveedor para recordar su tasa de envío; None si no se limita"""
+        return None
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send(self, message):
+        raise NotImplementedError
+
+    def deliver(self, message):
+        """
+        send() al ritmo de rate_controller, informándole del resultado. Un
+        error inesperado con un mensaje (p. ej. una dirección que no se puede
+        codificar) se lanza como SendError permanente de ese destinatario.
+        """
+        controller = self.rate_controller
+        if controller is not None:
+            controller.acquire()
+        try:
+            self.send(message)
+        except SendError as e:
+            if controller is not None and e.throttled:
+                controller.throttled()
+            raise
+        except Exception as e:
+            raise SendError(f'{type(e).__name__}: {e}', type(e).__name__) from e
+        if controller is not None:
+            controller.success()
+
+    def throttled(self):
+        """El proveedor pidió bajar el ritmo aunque el mensaje acabó saliendo"""
+        if self.rate_controller is not None:
+            self.rate_controller.throttled()
+
+    def send_many(self, messages):
+        """
+        Envía una lista de mensajes y genera (índice, error) a medida que
+        terminan; error es None si el mensaje se entregó.
+        """
+        for index, message in enumerate(messages):
+            try:
+                self.deliver(message)
+                yield index, None
+            except SendError as e:
+                yield index, e
+
+    def send_pooled(self, messages):
+        """
+        send_many() repartiendo los mensajes entre los hilos de self.executor.
+
+        Tras un fallo de la cuenta ('provider') se cancelan los mensajes que
+        aún no salieron: fallarían igual y se devuelven con ese mismo error.
+        """
+        futures = {self.executor.submit(self.deliver, message): index for index, message in enumerate(messages)}
+        stop = None
+        for future in as_completed(futures):
+            if future.cancelled():
+                yield futures[future], stop
+                continue
+            error = future.exception()
+            if error is not None and not isinstance(error, SendError):
+                raise error
+            if error is not None and stop is None and error.kind == 'provider':
+                stop = error
+                for other in futures:
+                    other.cancel()
+            yield futures[future], error
+
+    def stats(self):
+        """Mensajes y tasa por conexión (para el informe del comando)"""
+        return []
+
+    def limits(self):
+        """Límites de la cuenta del proveedor (para el informe del comando); None si no hay"""
+        return None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def reply_text(text):
+    return text.decode(errors='replace') if isinstance(text, bytes) else str(text)
+
+
+def message_bytes(message):
+    """Bytes del mensaje: los de un BulkMessage ya serializado o los de un EmailMessage"""
+    if isinstance(message, EmailMessage):
+        return message.message().as_bytes(linesep='\r\n')
+    return message.data
+
+
+def envelope_address(address):
+    """
+    Dirección sola para el sobre (MAIL FROM, RCPT TO, Destinations de SES),
+    en ASCII como las envía el backend SMTP de Django: sanitize_address pasa
+    el dominio a punycode (jose@correo.españa.com).
+    """
+    return parseaddr(sanitize_address(address, settings.DEFAULT_CHARSET))[1]
+
+
+def envelope(message):
+    """(remitente, destinatarios, bytes del mensaje) para el diálogo SMTP"""
+    return (
+        envelope_address(message.from_email),
+        [envelope_address(address) for address in message.recipients()],
+        message_bytes(message),
+    )
+
+
+class SmtpConnection:
+    """
+    Una conexión SMTP autenticada que envía muchos mensajes seguidos.
+
+    Si el servidor anuncia PIPELINING (RFC 2920), MAIL FROM, RCPT TO y DATA
+    van en una sola escritura y las respuestas se leen después: una ida y
+    vuelta por mensaje más la del cuerpo, en lugar de una por comando. Tras
+    un 421 o una desconexión se abre una conexión nueva y el mensaje se
+    reintenta una vez; `on_throttle()` se llama con cada 421.
+    """
+
+    def __init__(self, on_throttle=None):
+        self.on_throttle = on_throttle
+        self.smtp = None
+        self.sent = 0
+        self.busy = 0.0
+        self.reconnects = 0
+        self.since_open = 0
+
+    def open(self):
+        if settings.EMAIL_USE_SSL:
+            self.smtp = smtplib.SMTP_SSL(
+                settings.EMAIL_HOST, settings.EMAIL_PORT,
+                timeout=settings.EMAIL_TIMEOUT, context=ssl.create_default_context()
+            )
+        else:
+            self.smtp = smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT, timeout=settings.EMAIL_TIMEOUT)
+        self.smtp.ehlo()
+        if settings.EMAIL_USE_TLS:
+            self.smtp.starttls(context=ssl.create_default_context())
+            self.smtp.ehlo()
+        if settings.EMAIL_HOST_USER and settings.EMAIL_HOST_PASSWORD:
+            self.smtp.login(settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
+        self.since_open = 0
+
+    def close(self):
+        if self.smtp is None:
+            return
+        try:
+            self.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self.smtp.close()
+        self.smtp = None
+
+    def send(self, from_addr, to_addrs, data):
+        for attempt in (1, 2):
+            if self.smtp is None or self.since_open >= settings.CAMPAIGN_SMTP_MESSAGES_PER_CONNECTION:
+                self.close()
+                try:
+                    self.open()
+                except (smtplib.SMTPException, OSError) as e:
+                    self.close()
+                    raise SendError(f'No se pudo conectar: {e}', getattr(e, 'smtp_code', None), provider=True) from e
+
+            started = time.perf_counter()
+            try:
+                if self.smtp.has_extn('pipelining'):
+                    self._send_pipelined(from_addr, to_addrs, data)
+                else:
+                    self.smtp.sendmail(from_addr, to_addrs, data)
+            except smtplib.SMTPResponseException as e:
+                text = reply_text(e.smtp_error)
+                if e.smtp_code == 421:
+                    self.close()
+                    self.reconnects += 1
+                    if self.on_throttle:
+                        self.on_throttle()
+                    if attempt == 1:
+                        continue
+                # Un remitente rechazado o sin autenticar falla igual con cualquier destinatario
+                provider = e.smtp_code in SMTP_AUTH_CODES or (
+                    isinstance(e, smtplib.SMTPSenderRefused) and e.smtp_code >= 500
+                )
+                raise SendError(f'{e.smtp_code} {text}', e.smtp_code, provider=provider) from e
+            except smtplib.SMTPRecipientsRefused as e:
+                code, text = next(iter(e.recipients.values()))
+                raise SendError(f'{code} {reply_text(text)}', code) from e
+            except OSError as e:
+                # SMTPServerDisconnected, conexión reiniciada, timeout...
+                self.close()
+                self.reconnects += 1
+                if attempt == 1:
+                    continue
+                raise SendError(str(e)) from e
+            finally:
+                self.busy += time.perf_counter() - started
+
+            self.sent += 1
+            self.since_open += 1
+            return
+
+    def _send_pipelined(self, from_addr, to_addrs, data):
+        smtp = self.smtp
+        commands = [f'MAIL FROM:<{from_addr}>'] + [f'RCPT TO:<{to}>' for to in to_addrs] + ['DATA']
+        smtp.send(''.join(command + '\r\n' for command in commands))
+        replies = [smtp.getreply() for _ in commands]
+
+        (mail_code, mail_text), rcpt_replies, (data_code, data_text) = replies[0], replies[1:-1], replies[-1]
+        accepted = [code for code, text in rcpt_replies if code in (250, 251)]
+        if data_code == 354 and (mail_code != 250 or not accepted):
+            # El servidor aceptó DATA sin remitente o destinatarios válidos: cerrar el DATA vacío
+            smtp.send(b'.\r\n')
+            smtp.getreply()
+        if mail_code != 250:
+            smtp.rset()
+            raise smtplib.SMTPSenderRefused(mail_code, mail_text, from_addr)
+        if not accepted:
+            smtp.rset()
+            raise smtplib.SMTPRecipientsRefused(dict(zip(to_addrs, rcpt_replies)))
+        if data_code != 354:
+            smtp.rset()
+            raise smtplib.SMTPDataError(data_code, data_text)
+
+        data = re.sub(br'(?:\r\n|\n|\r(?!\n))', b'\r\n', data)
+        data = re.sub(br'(?m)^\.', b'..', data)
+        if not data.endswith(b'\r\n'):
+            data += b'\r\n'
+        smtp.send(data + b'.\r\n')
+        code, text = smtp.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, text)
+
+    @property
+    def rate(self):
+        return self.sent / self.busy if self.busy else 0.0
+
+
+class SmtpTransport(Transport):
+    """
+    SMTP con un pool de conexiones autenticadas (EMAIL_HOST, EMAIL_PORT...).
+
+    send_many() reparte los mensajes entre CAMPAIGN_SMTP_POOL_SIZE hilos;
+    cada hilo tiene su propia conexión abierta y la reutiliza para todos sus
+    mensajes (renovándola cada CAMPAIGN_SMTP_MESSAGES_PER_CONNECTION), en
+    lugar de conectar, negociar TLS y autenticarse en cada envío.
+    """
+
+    name = 'smtp'
+
+    def __init__(self, pool_size=None):
+        self.pool_size = pool_size or settings.CAMPAIGN_SMTP_POOL_SIZE
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = []
+        self.executor = None
+
+    @property
+    def provider(self):
+        return f'smtp:{settings.EMAIL_HOST}'
+
+    def open(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='smtp')
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        with self.lock:
+            for connection in self.connections:
+                connection.close()
+
+    def connection(self):
+        """La conexión del hilo actual"""
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = SmtpConnection(on_throttle=self.throttled)
+            with self.lock:
+                self.connections.append(connection)
+        return connection
+
+    def send(self, message):
+        self.connection().send(*envelope(message))
+
+    def send_many(self, messages):
+        self.open()
+        yield from self.send_pooled(messages)
+
+    def stats(self):
+        with self.lock:
+            return [
+                {
+                    'sent': connection.sent,
+                    'seconds': connection.busy,
+                    'rate': connection.rate,
+                    'reconnects': connection.reconnects,
+                }
+                for connection in self.connections
+            ]
+
+
+class SesTransport(Transport):
+    """
+    Amazon SES (send_raw_email); necesita boto3 y credenciales de AWS.
+
+    Al abrirse lee la cuota de la cuenta (get_send_quota). MaxSendRate es el
+    techo del control de tasa y decide cuántos hilos envían a la vez, todos
+    con el mismo cliente de boto3 y su pool de conexiones HTTP. Antes de
+    cada bloque se descuenta de lo que queda de Max24HourSend; si no alcanza,
+    send_many() envía lo que cabe y lanza QuotaExhausted.
+    """
+
+    name = 'ses'
+
+    def __init__(self):
+        self.client = None
+        self.executor = None
+        self.quota = None
+        self.remaining = None
+        self.workers = 1
+
+    @property
+    def provider(self):
+        return f'ses:{settings.AWS_SES_REGION}'
+
+    def open(self):
+        if self.client is None:
+            import boto3
+            from botocore.config import Config
+            from botocore.exceptions import BotoCoreError, ClientError
+
+            client = boto3.client(
+                'ses',
+                region_name=settings.AWS_SES_REGION,
+                config=Config(max_pool_connections=settings.CAMPAIGN_SES_MAX_WORKERS),
+            )
+            try:
+                self.quota = client.get_send_quota()
+            except (BotoCoreError, ClientError) as e:
+                raise SendError(f'No se pudo leer la cuota de SES: {e}', provider=True) from e
+            self.client = client
+
+            max_rate = self.quota['MaxSendRate']
+            # Max24HourSend = -1: sin límite diario
+            if self.quota['Max24HourSend'] >= 0:
+                self.remaining = max(0, int(self.quota['Max24HourSend'] - self.quota['SentLast24Hours']))
+            # Llamadas en curso para sostener MaxSendRate: tasa × duración de cada llamada
+            self.workers = max(1, min(settings.CAMPAIGN_SES_MAX_WORKERS, math.ceil(max_rate * SES_CALL_SECONDS)))
+            if self.rate_controller is None:
+                self.rate_controller = AimdRateController(max_rate, min_rate=max_rate, max_rate=max_rate)
+            else:
+                self.rate_controller.limit(max_rate)
+
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ses')
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def reserve(self, count):
+        """Cuántos de `count` mensajes caben en la cuota de 24 horas (y los descuenta)"""
+        if self.remaining is None:
+            return count
+        allowed = min(count, self.remaining)
+        self.remaining -= allowed
+        return allowed
+
+    def quota_exhausted(self):
+        return QuotaExhausted(
+            f"Cuota de 24 horas de SES agotada ({self.quota['Max24HourSend']:.0f} emails); "
+            f"reanuda la campaña cuando se libere"
+        )
+
+    def send_many(self, messages):
+        self.open()
+        allowed = self.reserve(len(messages))
+        yield from self.send_pooled(messages[:allowed])
+        if allowed < len(messages):
+            raise self.quota_exhausted()
+
+    def limits(self):
+        if self.quota is None:
+            return None
+        return {
+            'allowed_rate': self.quota['MaxSendRate'],
+            'max_24h': self.quota['Max24HourSend'],
+            'sent_24h': self.quota['SentLast24Hours'],
+            'remaining': self.remaining,
+            'workers': self.workers,
+        }
+
+    def send(self, message):
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        self.open()
+        from_addr, to_addrs, data = envelope(message)
+        try:
+            self.client.send_raw_email(Source=from_addr, Destinations=to_addrs, RawMessage={'Data': data})
+        except ClientError as e:
+            code = ses_error_code(e)
+            raise SendError(code, code) from e
+        except BotoCoreError as e:
+            raise SendError(str(e)) from e
+
+
+def ses_error_code(error):
+    """Código de un ClientError de SES; la cuota diaria llega como Throttling"""
+    code = error.response['Error']['Code']
+    if 'daily message quota exceeded' in error.response['Error'].get('Message', '').lower():
+        return 'AccountDailyQuotaExceeded'
+    return code
+
+
+def ses_template_source(source):
+    """La plantilla con los marcadores en la sintaxis de SES: {{ nombre }} -> {{nombre}}"""
+    template = compile_template(source)
+    return template.render({name: f'{{{{{name}}}}}' for index, name in template.slots})
+
+
+class SesBulkTransport(SesTransport):
+    """
+    Amazon SES con plantilla: registra la plantilla de la campaña en SES una
+    vez y envía con SendBulkTemplatedEmail, CAMPAIGN_SES_BULK_SIZE destinos
+    por llamada, cada uno con los valores de sus marcadores.
+
+    SES devuelve un estado por destino, en el mismo orden; los que fallan
+    por un error transitorio (o toda la llamada, si falla entera) se
+    reintentan con espera exponencial hasta CAMPAIGN_SES_BULK_RETRIES veces.
+    send() de un mensaje ya construido (p. ej. el email de prueba) usa
+    send_raw_email como SesTransport. Los lotes salen uno tras otro (cada
+    llamada ya lleva 50 destinos), con la misma tasa y cuota de la cuenta.
+    """
+
+    name = 'ses_bulk'
+    templated = True
+
+    def __init__(self):
+        super().__init__()
+        self.templates = set()
+
+    def template_name(self, message):
+        """
+        Nombre de la plantilla en SES (por contenido); la crea si hace falta.
+        Editar la campaña cambia el contenido y por tanto el nombre. Si ya
+        existe una plantilla con ese nombre pero con otro contenido (p. ej.
+        editada a mano en la consola de SES), se actualiza.
+        """
+        content = '\0'.join([message.subject, message.html, message.text])
+        name = f"campana-{hashlib.sha1(content.encode('utf-8')).hexdigest()[:20]}"
+        if name in self.templates:
+            return name
+
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        template = {
+            'TemplateName': name,
+            'SubjectPart': message.subject,
+            'HtmlPart': ses_template_source(message.html),
+            'TextPart': ses_template_source(message.text),
+        }
+        try:
+            try:
+                self.client.create_template(Template=template)
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'AlreadyExists':
+                    raise
+                if self.client.get_template(TemplateName=name)['Template'] != template:
+                    self.client.update_template(Template=template)
+        except ClientError as e:
+            code = ses_error_code(e)
+            raise SendError(f'No se pudo registrar la plantilla: {code}', code,
+                            provider=code not in SES_RETRYABLE_CODES) from e
+        except BotoCoreError as e:
+            raise SendError(f'No se pudo registrar la plantilla: {e}', provider=True) from e
+        self.templates.add(name)
+        return name
+
+    def send(self, message):
+        if not isinstance(message, TemplatedMessage):
+            return super().send(message)
+        for index, error in self.send_many([message]):
+            if error is not None:
+                raise error
+
+    def send_many(self, messages):
+        self.open()
+        allowed = self.reserve(len(messages))
+        batches = {}
+        for index, message in enumerate(messages[:allowed]):
+            batches.setdefault((message.from_email, message.subject, message.html, message.text), []).append(index)
+
+        size = settings.CAMPAIGN_SES_BULK_SIZE
+        for indexes in batches.values():
+            try:
+                template = self.template_name(messages[indexes[0]])
+            except SendError as e:
+                for index in indexes:
+                    yield index, e
+                continue
+            for start in range(0, len(indexes), size):
+                yield from self.send_batch(template, messages, indexes[start:start + size])
+        if allowed < len(messages):
+            raise self.quota_exhausted()
+
+    def send_batch(self, template, messages, indexes):
+        """Envía un lote con reintentos de los destinos con fallos transitorios"""
+        pending = indexes
+        for attempt in range(settings.CAMPAIGN_SES_BULK_RETRIES + 1):
+            if attempt:
+                time.sleep(backoff_delay(attempt - 1))
+            retry = []
+            last_attempt = attempt == settings.CAMPAIGN_SES_BULK_RETRIES
+            for index, error in self.send_bulk(template, messages, pending):
+                if error is not None and not last_attempt and (error.code is None or error.code in SES_RETRYABLE_CODES):
+                    retry.append(index)
+                else:
+                    yield index, error
+            pending = retry
+            if not pending:
+                return
+
+    def send_bulk(self, template, messages, indexes):
+        """Una llamada a SendBulkTemplatedEmail; genera (índice, error) por destino"""
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        destinations = {}
+        for index in indexes:
+            try:
+                to = [envelope_address(address) for address in messages[index].to]
+            except ValueError as e:
+                # Una dirección que no se puede codificar falla sola, sin el resto del lote
+                yield index, SendError(f'ValueError: {e}', 'ValueError')
+                continue
+            destinations[index] = {
+                'Destination': {'ToAddresses': to},
+                'ReplacementTemplateData': json.dumps(messages[index].context),
+            }
+        if not destinations:
+            return
+        indexes = list(destinations)
+
+        controller = self.rate_controller
+        if controller is not None:
+            controller.acquire(len(indexes))
+        try:
+            response = self.client.send_bulk_templated_email(
+                Source=sanitize_address(messages[indexes[0]].from_email, settings.DEFAULT_CHARSET),
+                Template=template,
+                DefaultTemplateData='{}',
+                Destinations=list(destinations.values()),
+            )
+        except (ClientError, BotoCoreError) as e:
+            if isinstance(e, ClientError):
+                code = ses_error_code(e)
+                error = SendError(code, code)
+            else:
+                error = SendError(str(e))
+            if controller is not None and error.throttled:
+                controller.throttled()
+            for index in indexes:
+                yield index, error
+            return
+
+        for index, result in zip(indexes, response['Status']):
+            # Un destino aceptado trae MessageId; el estado se da por Success si no viene
+            status = result.get('Status') or ('Success' if result.get('MessageId') else 'Failed')
+            if status == 'Success':
+                if controller is not None:
+                    controller.success()
+                yield index, None
+                continue
+            error = SendError(f"{status}: {result['Error']}" if result.get('Error') else status, status)
+            if controller is not None and error.throttled:
+                controller.throttled()
+            yield index, error
+
+
+class ConsoleTransport(Transport):
+    """No envía nada: escribe una línea por mensaje (simulación / dry run)"""
+
+    name = 'console'
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, message):
+        self.stream.write(f"[{self.name}] {', '.join(message.to)}: {message.subject}\n")
+
+
+TRANSPORTS = {
+    SmtpTransport.name: SmtpTransport,
+    SesTransport.name: SesTransport,
+    SesBulkTransport.name: SesBulkTransport,
+    ConsoleTransport.name: ConsoleTransport,
+}
+
+
+def get_transport(name, **options):
+    try:
+        return TRANSPORTS[name](**options)
+    except KeyError:
+        raise ValueError(f'Transporte desconocido: {name}')
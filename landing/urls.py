@@ -3,9 +3,17 @@ from . import views
 from .dashboard_views import (
     DashboardView,
     DashboardChartDataView,
+    DashboardLiveView,
+    DashboardRegionsView,
     SendEmailView,
     SendSMSView,
-    ExportCSVView
+    SmsAnalyzeView,
+    SegmentCreateView,
+    CampaignStatusView,
+    ExportCSVView,
+    ExportJobCreateView,
+    ExportJobStatusView,
+    ExportJobDownloadView,
 )
 
 app_name = 'landing'
@@ -30,13 +38,22 @@ urlpatterns = [
     # API endpoints
     path('api/countdown/', views.CountdownAPIView.as_view(), name='countdown-api'),
     path('api/register/', views.RegisterAPIView.as_view(), name='register-api'),
+    path('api/twilio/status/', views.TwilioStatusCallbackView.as_view(), name='twilio-status'),
     
     # ===== DASHBOARD URLS =====
     path('dashboard/', DashboardView.as_view(), name='dashboard'),
     path('dashboard/chart-data/', DashboardChartDataView.as_view(), name='dashboard-chart-data'),
+    path('dashboard/regions/', DashboardRegionsView.as_view(), name='dashboard-regions'),
+    path('dashboard/live/', DashboardLiveView.as_view(), name='dashboard-live'),
     path('dashboard/send-email/', SendEmailView.as_view(), name='send-email'),
     path('dashboard/send-sms/', SendSMSView.as_view(), name='send-sms'),
+    path('dashboard/sms/analyze/', SmsAnalyzeView.as_view(), name='sms-analyze'),
+    path('dashboard/segments/', SegmentCreateView.as_view(), name='segment-create'),
+    path('dashboard/campaigns/<int:pk>/', CampaignStatusView.as_view(), name='campaign-status'),
     path('dashboard/export-csv/', ExportCSVView.as_view(), name='export-csv'),
+    path('dashboard/export-jobs/', ExportJobCreateView.as_view(), name='export-job-create'),
+    path('dashboard/export-jobs/<int:pk>/', ExportJobStatusView.as_view(), name='export-job-status'),
+    path('dashboard/export-jobs/<int:pk>/download/', ExportJobDownloadView.as_view(), name='export-job-download'),
 
     path('donation-test/', views.donation_test, name='donation_test'),
 ]
\ No newline at end of file
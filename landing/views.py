@@ -6,7 +6,7 @@ from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.utils.safestring import mark_safe
 from django.conf import settings
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.conf import settings
@@ -16,7 +16,9 @@ from datetime import datetime, timedelta
 import traceback
 import threading
 import requests
+from twilio.request_validator import RequestValidator
 from .models import PlanEstrategico
+from .sms import status_buffer
 
 def send_email_async(registration):
     """Enviar email - versión síncrona confiable"""
@@ -693,6 +695,40 @@ class SaveDonationView(View):
 
 
 
+@method_decorator(csrf_exempt, name='dispatch')
+class TwilioStatusCallbackView(View):
+    """
+    Webhook para los StatusCallback de Twilio.
+
+    Valida la firma X-Twilio-Signature y agrega el evento al buffer de
+    estados, que se escribe en bloque en SmsMessage. Sin TWILIO_AUTH_TOKEN
+    no hay firma que comprobar, así que se rechazan todos los callbacks.
+    """
+
+    def post(self, request):
+        if not settings.TWILIO_AUTH_TOKEN:
+            return HttpResponse(status=403)
+        validator = RequestValidator(settings.TWILIO_AUTH_TOKEN)
+        signature = request.META.get('HTTP_X_TWILIO_SIGNATURE', '')
+        if not validator.validate(settings.TWILIO_STATUS_CALLBACK_URL, request.POST.dict(), signature):
+            return HttpResponse(status=403)
+
+        sid = request.POST.get('MessageSid')
+        status = request.POST.get('MessageStatus')
+        if not sid or not status:
+            return HttpResponse(status=400)
+
+        status_buffer.add(
+            sid,
+            status,
+            to=request.POST.get('To', ''),
+            from_number=request.POST.get('From', ''),
+            error_code=request.POST.get('ErrorCode'),
+            error_message=request.POST.get('ErrorMessage', ''),
+        )
+        return HttpResponse(status=204)
+
+
 class TeamView(TemplateView):
     """Vista detallada del equipo"""
     template_name = 'landing/team.html'
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+"""
+Servidor local que imita la API de mensajes de Twilio.
+
+Sirve para medir y probar el envío de SMS sin gastar mensajes reales:
+    python twilio_standin.py --port 8765
+y luego TWILIO_API_BASE_URL=http://127.0.0.1:8765
+
+Simula latencia, el límite de mensajes por segundo (responde 429 como
+Twilio) y una tasa configurable de errores 5xx.
+
+También sirve el log de mensajes (GET Messages.json, paginado y filtrado por
+DateSent>) a partir de los mensajes enviados y de un fixture grabado:
+    python twilio_standin.py --fixture mensajes.json
+donde mensajes.json es la lista "messages" de una respuesta real de Twilio.
+"""
+
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+
+class StandinState:
+    """Configuración y contadores compartidos por los hilos del servidor"""
+
+    def __init__(self, latency=0.05, rate_limit=None, error_rate=0.0):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        self.accepted = 0
+        self.throttled = 0
+        self.errors = 0
+        self.list_requests = 0
+        self.messages = []
+
+    def load_fixture(self, path):
+        with open(path, encoding='utf-8') as fixture:
+            self.messages.extend(json.load(fixture))
+
+    def message_log(self, date_sent_after=None):
+        """Mensajes enviados, del más reciente al más antiguo, como los lista Twilio"""
+        with self.lock:
+            messages = [m for m in self.messages if m.get('date_sent')]
+        if date_sent_after:
+            messages = [m for m in messages if parsedate_to_datetime(m['date_sent']) > date_sent_after]
+        return sorted(messages, key=lambda m: parsedate_to_datetime(m['date_sent']), reverse=True)
+
+    def admit(self):
+        """Ventana de un segundo para imitar el límite de MPS de Twilio"""
+        if not self.rate_limit:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            if now - self.window_start >= 1:
+                self.window_start = now
+                self.window_count = 0
+            if self.window_count >= self.rate_limit:
+                self.throttled += 1
+                return False
+            self.window_count += 1
+            return True
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        state = self.server.state
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if not url.path.endswith('/Messages.json'):
+            self.send_json(404, {'code': 20404, 'message': 'Not found'})
+            return
+
+        time.sleep(state.latency)
+        with state.lock:
+            state.list_requests += 1
+
+        date_sent_after = None
+        if query.get('DateSent>'):
+            date_sent_after = datetime.strptime(query['DateSent>'], '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+        page_size = min(int(query.get('PageSize', 50)), 1000)
+        page = int(query.get('Page', 0))
+
+        messages = state.message_log(date_sent_after)
+        items = messages[page * page_size:(page + 1) * page_size]
+        next_page_uri = None
+        if (page + 1) * page_size < len(messages):
+            next_query = dict(query, Page=page + 1, PageToken=f'PA{page + 1}')
+            next_page_uri = f'{url.path}?{urlencode(next_query)}'
+
+        self.send_json(200, {
+            'messages': items,
+            'page': page,
+            'page_size': page_size,
+            'next_page_uri': next_page_uri,
+        })
+
+    def do_POST(self):
+        state = self.server.state
+        length = int(self.headers.get('Content-Length', 0))
+        data = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+
+        if not self.path.endswith('/Messages.json'):
+            self.send_json(404, {'code': 20404, 'message': 'Not found'})
+            return
+
+        time.sleep(state.latency)
+
+        if not state.admit():
+            self.send_json(429, {'code': 20429, 'message': 'Too Many Requests'}, {'Retry-After': '1'})
+            return
+
+        if random.random() < state.error_rate:
+            with state.lock:
+                state.errors += 1
+            self.send_json(503, {'code': 20503, 'message': 'Service unavailable'})
+            return
+
+        message = {
+            'sid': 'SM' + uuid.uuid4().hex,
+            'to': data.get('To'),
+            'from': data.get('From'),
+            'body': data.get('Body'),
+            'status': 'queued',
+            'direction': 'outbound-api',
+            'date_sent': format_datetime(datetime.now(timezone.utc)),
+            'error_code': None,
+            'error_message': None,
+        }
+        with state.lock:
+            state.accepted += 1
+            state.messages.append(message)
+        self.send_json(201, message)
+
+
+def start_standin(port=0, latency=0.05, rate_limit=None, error_rate=0.0, fixture=None):
+    """Arranca el servidor en un hilo; devuelve (servidor, url_base)"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), StandinHandler)
+    server.daemon_threads = True
+    server.state = StandinState(latency=latency, rate_limit=rate_limit, error_rate=error_rate)
+    if fixture:
+        server.state.load_fixture(fixture)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Servidor local que imita la API de Twilio')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.05, help='Segundos de latencia por petición')
+    parser.add_argument('--rate-limit', type=int, help='Mensajes por segundo antes de responder 429')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fracción de respuestas 503')
+    parser.add_argument('--fixture', help='JSON con mensajes grabados para GET Messages.json')
+    args = parser.parse_args()
+
+    server, url = start_standin(args.port, args.latency, args.rate_limit, args.error_rate, args.fixture)
+    print(f"Twilio stand-in escuchando en {url} (Ctrl+C para terminar)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()